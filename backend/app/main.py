@@ -2,15 +2,23 @@ from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from routers import document_router
-import requests
+from utils.file_utils import FileUtils, UploadSizeLimitMiddleware
+from utils.http_client import get_http_client, close_http_client
+from services.document_cache import DocumentCache, CachedDocument
 import os
 import uuid
+import asyncio
+import weakref
 from typing import List
+from urllib.parse import urlparse
 from pydantic import BaseModel
 
 app = FastAPI()
 app.include_router(document_router.router)
 
+# Reject oversized request bodies while they stream in; bulk uploads get the batch limit
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Enable CORS for frontend access
 app.add_middleware(
     CORSMiddleware,
@@ -20,9 +28,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+async def shutdown():
+    await close_http_client()
+    document_router.close_services()
+
 # Security
 security = HTTPBearer()
 
+# Documents already ingested by /hackrx/run, reused for repeated URLs
+document_cache = DocumentCache(
+    ttl_seconds=float(os.getenv("DOCUMENT_CACHE_TTL_SECONDS", "3600")),
+    revalidate_seconds=float(os.getenv("DOCUMENT_CACHE_REVALIDATE_SECONDS", "300")),
+    max_entries=int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", "64")),
+    max_bytes=int(float(os.getenv("DOCUMENT_CACHE_MAX_MB", "256")) * 1024 * 1024)
+)
+document_locks = weakref.WeakValueDictionary()
+EMBEDDING_DIMENSION = 768
+
+# Gemini calls in flight at once across /hackrx/run requests (HACKRX_ANSWER_CONCURRENCY)
+answer_slots = asyncio.Semaphore(max(1, int(os.getenv("HACKRX_ANSWER_CONCURRENCY", "5"))))
+
 class HackRxRequest(BaseModel):
     documents: str  # URL to PDF
     questions: List[str]
@@ -48,74 +74,148 @@ def health():
     """
     return {"status": "ok", "service": "SDG-MedSense backend"}
 
-@app.post("/hackrx/run", response_model=HackRxResponse)
-async def hackrx_run(request: HackRxRequest, token: str = Depends(verify_token)):
+async def answer_question(llm_service, question: str, similar_chunks) -> str:
     """
-    Accepts a JSON body with 'documents' (URL to PDF) and 'questions' (list of strings).
-    Returns answers for each question in the required format.
+    Answer one question from its retrieved chunks, running the blocking
+    Gemini call on a worker thread. Errors, including a failed retrieval
+    passed in as similar_chunks, become this question's answer only.
     """
-    # Generate unique session ID for this request to isolate documents
-    session_id = f"hackrx_{uuid.uuid4().hex[:8]}"
-    
-    # Download PDF from URL
     try:
-        response = requests.get(request.documents, timeout=30)
-        response.raise_for_status()
-        file_content = response.content
-        filename = request.documents.split("/")[-1]
+        if isinstance(similar_chunks, Exception):
+            raise similar_chunks
+        context = [chunk["text"] for chunk in similar_chunks]
+        document_ids = [chunk.get("document_id") for chunk in similar_chunks]
+        async with answer_slots:
+            llm_response = await asyncio.to_thread(
+                llm_service.generate_answer, question, context, document_ids=document_ids
+            )
+        return llm_response["answer"] if isinstance(llm_response, dict) and "answer" in llm_response else str(llm_response)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+async def load_document(url: str) -> CachedDocument:
+    """
+    Ingested document for url, from the document cache when possible:
+    fresh entries are used as is, stale ones are revalidated with a
+    conditional GET, and new content is downloaded, processed and embedded
+    into a session of its own. The document is acquired from the cache;
+    the caller releases it when done answering.
+    """
+    lock = document_locks.get(url)
+    if lock is None:
+        lock = document_locks[url] = asyncio.Lock()
+    # One download per URL at a time; concurrent repeats wait and hit the cache
+    async with lock:
+        document_cache.expire()
+        cached = document_cache.lookup(url)
+        if cached is not None and document_cache.is_fresh(cached):
+            document_cache.hit(cached)
+            document_cache.acquire(cached)
+            return cached
+
+        filename = urlparse(url).path.split("/")[-1]
         file_extension = filename.split('.')[-1].lower() if '.' in filename else ''
-        from utils.file_utils import FileUtils
         file_type = FileUtils.get_file_type_from_extension(file_extension)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to get document: {str(e)}")
 
-    # Process document
-    try:
-        from services.document_processor import DocumentProcessor
-        from services.embedding_service import EmbeddingService
-        from services.llm_service import LLMService
-        doc_processor = DocumentProcessor()
-        embedding_service = EmbeddingService()
-        llm_service = LLMService()
-        result = doc_processor.process_document(file_content, filename, file_type)
-        chunks = result["chunks"]
-        document_id = result["document_id"]
-        
-        # Store embeddings with session isolation
-        embedding_service.store_embeddings(
-            chunks, 
-            user_id="hackrx", 
-            document_type="unknown",
-            session_id=session_id
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to process document: {str(e)}")
+        async def download(revalidating: CachedDocument = None):
+            # Download the document through the shared HTTP client, spooled to disk
+            try:
+                return await FileUtils.download_to_file(
+                    get_http_client(), url, suffix=f".{file_extension}",
+                    headers=revalidating.conditional_headers() if revalidating is not None else None
+                )
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Failed to get document: {str(e)}")
+
+        document_path, content_hash, headers = await download(cached)
+        if document_path is None:
+            # 304 Not Modified; a request for another URL may have evicted the
+            # entry while we waited, in which case its vectors are going away
+            if document_cache.find(cached.content_hash) is cached:
+                document_cache.hit(cached, revalidated=True)
+                document_cache.acquire(cached)
+                return cached
+            document_path, content_hash, headers = await download()
 
-    # Answer each question
-    answers = []
-    for question in request.questions:
         try:
-            # Search only within the current session to avoid cross-document contamination
-            similar_chunks = embedding_service.search_similar(
-                question, 
-                user_id="hackrx", 
+            document = document_cache.find(content_hash)
+            if document is not None:
+                # Same bytes as a cached document (a re-signed or changed URL)
+                document.etag, document.last_modified = headers.get("etag"), headers.get("last-modified")
+                document_cache.hit(document, revalidated=True)
+            else:
+                # Process document with the long-lived services shared with the router
+                document_id = content_hash[:16]
+                result = await document_router.get_processing_pool().process_file(
+                    document_path, filename, file_type, document_id=document_id
+                )
+                chunks = result["chunks"]
+                # Store embeddings in a session of this ingest's own: an earlier
+                # ingest of the same bytes may still be awaiting its cleanup
+                session_id = f"hackrx_{document_id}_{uuid.uuid4().hex[:8]}"
+                await asyncio.to_thread(
+                    document_router.get_embedding_service().store_embeddings,
+                    chunks,
+                    user_id="hackrx",
+                    document_type="unknown",
+                    session_id=session_id
+                )
+                document = CachedDocument(
+                    content_hash, document_id, session_id, chunks,
+                    etag=headers.get("etag"), last_modified=headers.get("last-modified"),
+                    # Chunk table plus its float32 vectors in the local store
+                    nbytes=chunks.nbytes() + len(chunks) * EMBEDDING_DIMENSION * 4
+                )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to process document: {str(e)}")
+        finally:
+            os.remove(document_path)
+        document_cache.add(url, document)
+        document_cache.acquire(document)
+        return document
+
+@app.post("/hackrx/run", response_model=HackRxResponse)
+async def hackrx_run(request: HackRxRequest, token: str = Depends(verify_token)):
+    """
+    Accepts a JSON body with 'documents' (URL to PDF) and 'questions' (list of strings).
+    Returns answers for each question in the required format.
+    """
+    embedding_service = document_router.get_embedding_service()
+    llm_service = document_router.get_llm_service()
+    document = await load_document(request.documents)
+    try:
+        # Retrieve context for all questions at once, searching only within the
+        # document's session to avoid cross-document contamination
+        try:
+            similar_chunks_per_question = await asyncio.to_thread(
+                embedding_service.search_similar_batch,
+                request.questions,
+                user_id="hackrx",
                 top_k=3,
-                session_id=session_id
+                session_id=document.session_id
             )
-            context = [chunk["text"] for chunk in similar_chunks]
-            llm_response = llm_service.generate_answer(question, context)
-            answer = llm_response["answer"] if isinstance(llm_response, dict) and "answer" in llm_response else str(llm_response)
         except Exception as e:
-            answer = f"Error: {str(e)}"
-        answers.append(answer)
+            similar_chunks_per_question = [e] * len(request.questions)
+
+        # Answer the questions concurrently; gather keeps the question order
+        answers = await asyncio.gather(*(
+            answer_question(llm_service, question, similar_chunks)
+            for question, similar_chunks in zip(request.questions, similar_chunks_per_question)
+        ))
+    finally:
+        stale_documents = document_cache.release(document)
     
-    # Clean up session vectors after processing
-    try:
-        embedding_service.delete_session_vectors(session_id, "hackrx")
-    except Exception as e:
-        print(f"Warning: Could not clean up session vectors: {e}")
+    # Drop the vectors of evicted documents no request is answering from
+    for stale in stale_documents:
+        llm_service.answer_cache.invalidate_document(stale.document_id)
+        try:
+            await asyncio.to_thread(embedding_service.delete_session_vectors, stale.session_id, "hackrx")
+        except Exception as e:
+            print(f"Warning: Could not clean up session vectors: {e}")
     
-    return HackRxResponse(answers=answers)
+    return HackRxResponse(answers=list(answers))
 
 # --- Webhook endpoint for Railway ---
 from fastapi import Request
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Recall-vs-memory report for the LocalVectorStore codecs.
+
+Builds one store per codec over the same synthetic clustered corpus and
+compares recall@k against exact float32 search, resident vector bytes,
+bytes in memory-mapped spill files (PQ's exact vectors) and mean query
+latency. Usage:
+
+    python benchmark_vector_codecs.py [num_vectors] [num_queries]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from services.vector_store import LocalVectorStore
+
+DIMENSION = 768
+TOP_K = 10
+# A vector stored as a Python list of 768 floats: list header + pointers + float objects
+PYTHON_LIST_BYTES = sys.getsizeof([0.0] * DIMENSION) + DIMENSION * sys.getsizeof(1.0)
+
+
+def _synthetic_corpus(count: int, queries: int, seed: int = 0):
+    """Clustered vectors, which is closer to real embedding spaces than pure noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, count // 200), DIMENSION)).astype(np.float32)
+    vectors = centers[rng.integers(0, centers.shape[0], count)]
+    vectors = vectors + 0.6 * rng.standard_normal((count, DIMENSION)).astype(np.float32)
+    probes = centers[rng.integers(0, centers.shape[0], queries)]
+    probes = probes + 0.6 * rng.standard_normal((queries, DIMENSION)).astype(np.float32)
+    return vectors, probes
+
+
+def _build_store(vectors: np.ndarray, codec: str) -> LocalVectorStore:
+    options = {"train_size": min(10000, vectors.shape[0])} if codec == "pq" else {}
+    store = LocalVectorStore(dimension=DIMENSION, initial_capacity=vectors.shape[0], codec=codec, codec_options=options)
+    for start in range(0, vectors.shape[0], 5000):
+        store.upsert([
+            {"id": str(i), "values": vectors[i], "metadata": {}}
+            for i in range(start, min(start + 5000, vectors.shape[0]))
+        ])
+    return store
+
+
+def run_report(count: int = 50000, queries: int = 100):
+    vectors, probes = _synthetic_corpus(count, queries)
+    print(f"📊 Vector codec report: {count} vectors x {DIMENSION} dims, {queries} queries, recall@{TOP_K}")
+    print(f"   Python list baseline: {PYTHON_LIST_BYTES} bytes/vector")
+    print("=" * 90)
+    print(f"{'codec':<10}{'bytes/vector':>14}{'spill/vector':>14}{'vs lists':>12}{'vs float32':>12}"
+          f"{'recall':>10}{'query ms':>12}")
+
+    reference = None
+    float32_bytes = None
+    for codec in ("float32", "float16", "int8", "pq"):
+        store = _build_store(vectors, codec)
+        results = []
+        started = time.perf_counter()
+        for probe in probes:
+            results.append([m.id for m in store.query(vector=probe, top_k=TOP_K).matches])
+        elapsed = (time.perf_counter() - started) * 1000 / queries
+
+        if reference is None:
+            reference = results
+        recall = np.mean([len(set(r) & set(e)) / TOP_K for r, e in zip(results, reference)])
+        usage = store.memory_usage()
+        bytes_per_vector = usage["bytes_per_vector"]
+        float32_bytes = float32_bytes or bytes_per_vector
+        print(f"{codec:<10}{bytes_per_vector:>14.0f}{usage['spill_bytes_per_vector']:>14.0f}"
+              f"{PYTHON_LIST_BYTES / bytes_per_vector:>11.1f}x"
+              f"{float32_bytes / bytes_per_vector:>11.1f}x{recall:>10.3f}{elapsed:>12.2f}")
+    print("=" * 90)
+    print("spill/vector: float32 vectors pq keeps in a memory-mapped file for re-ranking. They are not")
+    print("resident but still take that much disk and page cache for the rows re-ranking touches.")
+
+
+if __name__ == "__main__":
+    run_report(*(int(arg) for arg in sys.argv[1:3]))
@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from routers import document_router
+from utils.file_utils import UploadSizeLimitMiddleware
 from fastapi.responses import JSONResponse
 
 app = FastAPI()
@@ -7,6 +8,13 @@ app = FastAPI()
 # Register your router
 app.include_router(document_router.router)
 
+# Reject oversized request bodies while they stream in; bulk uploads get the batch limit
+app.add_middleware(UploadSizeLimitMiddleware)
+
+@app.on_event("shutdown")
+def shutdown():
+    document_router.close_services()
+
 # Webhook route (matches what HackRx or Railway expects)
 @app.post("/api/v1/hackrx/run")
 def webhook():
@@ -1,10 +1,12 @@
 # app/routers/document_router.py
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form
 import os
 import uuid
+import time
+import asyncio
 from dotenv import load_dotenv
+from functools import lru_cache
 from typing import List
 
 # Import models
@@ -19,13 +21,17 @@ from models.schemas import (
 )
 
 # Import services
-from services.document_processor import DocumentProcessor
 from services.embedding_service import EmbeddingService
 from services.llm_service import LLMService
-from services.scoring_service import ScoringService
+from services.processing_pool import DocumentProcessingPool, ProcessingQueueFull
+from services.document_processor import DocumentProcessor
+from services.pdf_extractor import ParallelPDFExtractor
+from services.ingest_pipeline import StreamingIngestPipeline
+from services.ingest_jobs import IngestJob, IngestJobQueue, IngestQueueFull
+from services.semantic_cache import SemanticAnswerCache
 
 # Import utils
-from utils.file_utils import FileUtils
+from utils.file_utils import FileUtils, MAX_BATCH_FILES
 
 # Load environment variables
 load_dotenv()
@@ -35,11 +41,53 @@ router = APIRouter(
     tags=["documents"]
 )
 
-# Initialize services
-document_processor = DocumentProcessor()
-embedding_service = EmbeddingService()
-llm_service = LLMService()
-scoring_service = ScoringService()
+# Shared services, built on first use so importing the router stays cheap
+@lru_cache(maxsize=None)
+def get_embedding_service() -> EmbeddingService:
+    return EmbeddingService()
+
+@lru_cache(maxsize=None)
+def get_llm_service() -> LLMService:
+    return LLMService()
+
+@lru_cache(maxsize=None)
+def get_processing_pool() -> DocumentProcessingPool:
+    """Extraction and chunking run in worker processes, off the event loop"""
+    return DocumentProcessingPool(
+        max_workers=int(os.getenv("DOCUMENT_PROCESS_WORKERS", "0")) or None,
+        max_queue=int(os.getenv("DOCUMENT_PROCESS_MAX_QUEUE", "0")) or None
+    )
+
+@lru_cache(maxsize=None)
+def get_ingest_pipeline() -> StreamingIngestPipeline:
+    """upload-and-embed streams pages from the same worker processes into embedding"""
+    processing_pool = get_processing_pool()
+    return StreamingIngestPipeline(
+        get_embedding_service(),
+        DocumentProcessor(pdf_extractor=ParallelPDFExtractor(
+            max_workers=processing_pool.max_workers,
+            get_executor=processing_pool.get_executor
+        ))
+    )
+
+@lru_cache(maxsize=None)
+def get_ingest_jobs() -> IngestJobQueue:
+    """Background ingestion for /jobs/: uploads return a job ID, workers run the pipeline"""
+    return IngestJobQueue(
+        max_workers=int(os.getenv("INGEST_JOB_WORKERS", "2")),
+        max_pending=int(os.getenv("INGEST_JOB_MAX_PENDING", "0")) or None,
+        history=int(os.getenv("INGEST_JOB_HISTORY", "1000"))
+    )
+
+@lru_cache(maxsize=None)
+def get_semantic_cache() -> SemanticAnswerCache:
+    """Paraphrased /query/ questions within a session or document reuse earlier answers"""
+    return SemanticAnswerCache(
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9")),
+        max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "4096")),
+        max_entries_per_scope=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES_PER_SCOPE", "256")),
+        ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+    )
 
 # In-memory storage for document metadata (in production, use a database)
 document_store = {}
@@ -47,6 +95,81 @@ document_store = {}
 document_chunks = {}
 # In-memory storage for sessions (in production, use a database)
 sessions = {}
+# Content-hash index: (sha256 of the uploaded bytes, session_id) -> document_id
+document_hashes = {}
+
+def _find_duplicate(content_hash: str, session_id: str):
+    """Previously processed document with the same bytes in the same session scope"""
+    document_id = document_hashes.get((content_hash, session_id))
+    return document_id if document_id in document_store else None
+
+def _register_document(result: dict, session_id: str, content_hash: str, embedded: bool, version: int = 1):
+    """Record a processed document in the in-memory stores and the hash index"""
+    document_store[result["document_id"]] = {
+        "filename": result["filename"],
+        "file_type": result["file_type"],
+        "document_type": result["document_type"],  # Use detected document type
+        "total_chunks": result["total_chunks"],
+        "upload_time": result["upload_time"].isoformat(),
+        "session_id": session_id,
+        "content_hash": content_hash,
+        "embedded": embedded,
+        "version": version
+    }
+    document_chunks[result["document_id"]] = result["chunks"]
+    document_hashes[(content_hash, session_id)] = result["document_id"]
+    if session_id and session_id in sessions and result["document_id"] not in sessions[session_id]["documents"]:
+        sessions[session_id]["documents"].append(result["document_id"])
+    # Questions answered in this session before the document arrived may now retrieve it
+    get_semantic_cache().invalidate_session(session_id)
+
+def _forget_document(document_id: str):
+    """Drop a document from the in-memory stores, the hash index and the answer caches"""
+    info = document_store.pop(document_id, None)
+    document_chunks.pop(document_id, None)
+    get_llm_service().answer_cache.invalidate_document(document_id)
+    get_semantic_cache().invalidate_document(document_id)
+    if info is not None:
+        document_hashes.pop((info.get("content_hash"), info.get("session_id")), None)
+
+async def _reuse_duplicate(duplicate_id: str, session_id: str) -> dict:
+    """
+    Upload response for bytes already processed: embed them only if never
+    embedded. Embedding runs on a thread; the stores are updated on the loop.
+    """
+    info = document_store[duplicate_id]
+    if not info["embedded"]:
+        await asyncio.to_thread(
+            get_embedding_service().store_embeddings,
+            document_chunks[duplicate_id],
+            user_id="default_user",
+            document_type=info["document_type"],
+            session_id=session_id
+        )
+        info["embedded"] = True
+        get_semantic_cache().invalidate_session(session_id)
+    return {
+        "status": "success",
+        "document_id": duplicate_id,
+        "filename": info["filename"],
+        "document_type": info["document_type"],
+        "chunks_processed": info["total_chunks"],
+        "session_id": session_id,
+        "duplicate": True
+    }
+
+def _ingest_summary(result: dict, session_id: str) -> dict:
+    """Upload response for a document ingested by the streaming pipeline"""
+    return {
+        "status": "success",
+        "document_id": result["document_id"],
+        "filename": result["filename"],
+        "document_type": result["document_type"],
+        "chunks_processed": result["vectors_stored"],
+        "session_id": session_id,
+        "duplicate": False,
+        "ingest_stats": result["ingest_stats"]
+    }
 
 @router.post("/session/create", response_model=SessionResponse)
 async def create_session(request: SessionRequest):
@@ -73,7 +196,13 @@ async def delete_session(session_id: str):
             raise HTTPException(status_code=404, detail="Session not found")
         
         # Delete session documents from vector store
-        embedding_service.delete_session_vectors(session_id, "default_user")
+        get_embedding_service().delete_session_vectors(session_id, "default_user")
+        
+        # Its documents no longer have vectors, so they cannot be reused
+        for document_id in [d for d, info in document_store.items() if info.get("session_id") == session_id]:
+            _forget_document(document_id)
+        
+        get_semantic_cache().invalidate_session(session_id)
         
         # Delete session metadata
         del sessions[session_id]
@@ -90,87 +219,333 @@ async def upload_document(file: UploadFile = File(...), session_id: str = None):
         file_extension = FileUtils.validate_file(file)
         file_type = FileUtils.get_file_type_from_extension(file_extension)
         
-        # Read file content
-        file_content = await FileUtils.read_file_content(file)
-        
-        # Process document
-        result = document_processor.process_document(
-            file_content=file_content,
-            filename=file.filename,
-            file_type=file_type
-        )
-        
-        # Store document metadata with session info and detected document type
-        document_store[result["document_id"]] = {
-            "filename": result["filename"],
-            "file_type": result["file_type"],
-            "document_type": result["document_type"],  # Use detected document type
-            "total_chunks": result["total_chunks"],
-            "upload_time": result["upload_time"].isoformat(),
-            "session_id": session_id
-        }
-        
-        # Store document chunks
-        document_chunks[result["document_id"]] = result["chunks"]
+        # Spool the upload to disk, hashing it on the way
+        async with FileUtils.spooled_upload(file) as (upload_path, content_hash):
+            # Same bytes already processed in this session: reuse that document
+            duplicate_id = _find_duplicate(content_hash, session_id)
+            if duplicate_id:
+                return DocumentUploadResponse(
+                    filename=file.filename,
+                    document_id=duplicate_id,
+                    status="success",
+                    message=f"Duplicate upload; reusing previously processed document {duplicate_id}. Detected type: {document_store[duplicate_id]['document_type']}"
+                )
+        
+            # Process document
+            result = await get_processing_pool().process_file(
+                upload_path,
+                filename=file.filename,
+                file_type=file_type
+            )
         
-        # Add document to session if session_id provided
-        if session_id and session_id in sessions:
-            sessions[session_id]["documents"].append(result["document_id"])
+            # Store document metadata and chunks with session info
+            _register_document(result, session_id, content_hash, embedded=False)
         
-        return DocumentUploadResponse(
-            filename=result["filename"],
-            document_id=result["document_id"],
-            status="success",
-            message=f"Document processed successfully. {result['total_chunks']} chunks created. Detected type: {result['document_type']}"
-        )
+            return DocumentUploadResponse(
+                filename=result["filename"],
+                document_id=result["document_id"],
+                status="success",
+                message=f"Document processed successfully. {result['total_chunks']} chunks created. Detected type: {result['document_type']}"
+            )
         
+    except HTTPException:
+        raise
+    except ProcessingQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/upload-and-embed/")
-async def upload_and_embed(file: UploadFile = File(...), session_id: str = Form(None)):
-    """Upload, process, and embed in one call; returns document_id and counts"""
+async def upload_and_embed(file: UploadFile = File(...), session_id: str = Form(None),
+                           previous_document_id: str = Form(None)):
+    """
+    Upload, process, and embed in one call; returns document_id and counts.
+    With previous_document_id the upload becomes a new version of that
+    document: only chunks whose text changed are embedded.
+    """
     try:
+        if previous_document_id:
+            previous = document_store.get(previous_document_id)
+            if previous is None:
+                raise HTTPException(status_code=404, detail="Previous document not found")
+            if previous.get("session_id") != session_id:
+                raise HTTPException(status_code=400, detail="Previous document belongs to a different session")
+
         file_extension = FileUtils.validate_file(file)
         file_type = FileUtils.get_file_type_from_extension(file_extension)
-        file_content = await FileUtils.read_file_content(file)
+        async with FileUtils.spooled_upload(file) as (upload_path, content_hash):
+            # Same bytes already processed in this session: no re-extraction, and
+            # only embed if the earlier upload was never embedded
+            duplicate_id = _find_duplicate(content_hash, session_id)
+            if duplicate_id:
+                return await _reuse_duplicate(duplicate_id, session_id)
 
-        result = document_processor.process_document(
-            file_content=file_content,
-            filename=file.filename,
-            file_type=file_type
-        )
+            if previous_document_id:
+                # New version under the same ID; diff chunk keys against the old one
+                result = await get_processing_pool().process_file(
+                    upload_path,
+                    filename=file.filename,
+                    file_type=file_type,
+                    document_id=previous_document_id
+                )
+                update = await asyncio.to_thread(
+                    get_embedding_service().update_document_embeddings,
+                    result["chunks"],
+                    user_id="default_user",
+                    document_type=result["document_type"],
+                    session_id=session_id,
+                    previous_chunks=document_chunks[previous_document_id] if previous["embedded"] else None,
+                    previous_document_type=previous["document_type"]
+                )
+                _forget_document(previous_document_id)
+                _register_document(result, session_id, content_hash, embedded=True,
+                                   version=previous.get("version", 1) + 1)
+                return {
+                    "status": "success",
+                    "document_id": result["document_id"],
+                    "filename": result["filename"],
+                    "document_type": result["document_type"],
+                    "chunks_processed": update["vectors_stored"],
+                    "vectors_unchanged": update["vectors_unchanged"],
+                    "vectors_deleted": update["vectors_deleted"],
+                    "vectors_moved": update["vectors_moved"],
+                    "version": document_store[result["document_id"]]["version"],
+                    "session_id": session_id,
+                    "duplicate": False
+                }
 
-        document_store[result["document_id"]] = {
-            "filename": result["filename"],
-            "file_type": result["file_type"],
-            "document_type": result["document_type"],
-            "total_chunks": result["total_chunks"],
-            "upload_time": result["upload_time"].isoformat(),
-            "session_id": session_id
-        }
-        document_chunks[result["document_id"]] = result["chunks"]
-        if session_id and session_id in sessions:
-            sessions[session_id]["documents"].append(result["document_id"])
+            # Extract, chunk, embed and upsert as one overlapping stream
+            async with get_processing_pool().admit():
+                result = await asyncio.to_thread(
+                    get_ingest_pipeline().run_file,
+                    upload_path,
+                    file.filename,
+                    file_type,
+                    user_id="default_user",
+                    session_id=session_id
+                )
+            _register_document(result, session_id, content_hash, embedded=True)
 
-        # Auto-embed using detected type
-        store_result = embedding_service.store_embeddings(
-            result["chunks"],
+            return _ingest_summary(result, session_id)
+    except HTTPException:
+        raise
+    except ProcessingQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _ingest_job(job: IngestJob, upload_path: str, file_type: str, content_hash: str) -> dict:
+    """
+    Body of a background ingestion job. Runs on the event loop like a request:
+    lookups and registration touch the in-memory stores on the loop, the
+    pipeline runs on a thread, and the document counts against the
+    processing pool's admission bound while it is ingested.
+    """
+    duplicate_id = _find_duplicate(content_hash, job.session_id)
+    if duplicate_id:
+        return await _reuse_duplicate(duplicate_id, job.session_id)
+    async with get_processing_pool().admit():
+        result = await asyncio.to_thread(
+            get_ingest_pipeline().run_file,
+            upload_path,
+            job.filename,
+            file_type,
             user_id="default_user",
-            document_type=result["document_type"],
-            session_id=session_id
+            session_id=job.session_id,
+            progress=job.report
         )
+    _register_document(result, job.session_id, content_hash, embedded=True)
+    return _ingest_summary(result, job.session_id)
+
+def _run_ingest_job(job: IngestJob, upload_path: str, file_type: str, content_hash: str,
+                    loop: asyncio.AbstractEventLoop) -> dict:
+    """Job worker entry point: run _ingest_job on loop and wait; owns (and removes) the spooled upload"""
+    try:
+        return asyncio.run_coroutine_threadsafe(_ingest_job(job, upload_path, file_type, content_hash), loop).result()
+    finally:
+        os.remove(upload_path)
+
+@router.post("/jobs/", status_code=202)
+async def submit_ingest_job(file: UploadFile = File(...), session_id: str = Form(None)):
+    """
+    Queue a document for background upload-and-embed and return its job at
+    once; poll GET /documents/jobs/{job_id} for stage, progress and the
+    final document_id.
+    """
+    try:
+        file_extension = FileUtils.validate_file(file)
+        file_type = FileUtils.get_file_type_from_extension(file_extension)
+        upload_path, content_hash = await FileUtils.spool_upload(file)
+        job = IngestJob(file.filename, session_id)
+        loop = asyncio.get_running_loop()
+        try:
+            get_ingest_jobs().submit(job, lambda job: _run_ingest_job(job, upload_path, file_type, content_hash, loop))
+        except IngestQueueFull:
+            os.remove(upload_path)
+            raise
+        return {**job.to_dict(), "status_url": f"/documents/jobs/{job.job_id}"}
+    except HTTPException:
+        raise
+    except IngestQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    """Stage, progress (chunks embedded / total), timings and result of an ingestion job"""
+    job = get_ingest_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+async def _spool_batch(files: List[UploadFile], entries: list) -> list:
+    """
+    Spool every upload (expanding zip archives) and append one result entry
+    per document to entries. Returns (entry, path, file_type, content_hash)
+    for each document that was spooled; rejected ones get their error set.
+    """
+    spooled = []
+
+    def add(filename, path=None, content_hash=None, error=None):
+        entry = {"filename": filename, "status": "error" if error else "pending", "document_id": None,
+                 "document_type": None, "chunks_processed": 0, "duplicate": False, "error": error}
+        entries.append(entry)
+        if path is not None:
+            extension = filename.rsplit(".", 1)[-1].lower()
+            spooled.append((entry, path, FileUtils.get_file_type_from_extension(extension), content_hash))
+
+    for file in files:
+        extension = file.filename.rsplit(".", 1)[-1].lower() if "." in file.filename else ""
+        try:
+            if extension == "zip":
+                archive_path, _ = await FileUtils.spool_upload(file)
+                try:
+                    members = await asyncio.to_thread(
+                        FileUtils.extract_zip, archive_path, max_files=MAX_BATCH_FILES - len(spooled)
+                    )
+                finally:
+                    os.remove(archive_path)
+                for name, path, content_hash, error in members:
+                    add(f"{file.filename}/{name}", path, content_hash, error)
+            elif len(spooled) >= MAX_BATCH_FILES:
+                add(file.filename, error=f"Too many files; at most {MAX_BATCH_FILES} per batch")
+            else:
+                FileUtils.validate_file(file)
+                path, content_hash = await FileUtils.spool_upload(file)
+                add(file.filename, path, content_hash)
+        except HTTPException as e:
+            add(file.filename, error=e.detail)
+        except Exception as e:
+            add(file.filename, error=str(e))
+    return spooled
+
+@router.post("/upload-batch/")
+async def upload_batch(files: List[UploadFile] = File(...), session_id: str = Form(None)):
+    """
+    Upload many documents, or zip archives of them, into one session. Files
+    are extracted and chunked in parallel on the processing pool, then all
+    their chunks are embedded in shared batches and written in one upsert.
+    Returns a result per document; one bad file does not fail the others.
+    """
+    started = time.perf_counter()
+    entries = []
+    spooled = []
+    try:
+        spooled = await _spool_batch(files, entries)
+        spool_ms = round((time.perf_counter() - started) * 1000, 1)
 
+        # Skip documents already processed in this session or earlier in the batch
+        to_process, duplicates, first_by_hash = [], [], {}
+        for entry, path, file_type, content_hash in spooled:
+            duplicate_id = _find_duplicate(content_hash, session_id)
+            if duplicate_id or content_hash in first_by_hash:
+                duplicates.append((entry, duplicate_id, content_hash))
+            else:
+                first_by_hash[content_hash] = entry
+                to_process.append((entry, path, file_type, content_hash))
+
+        # At most one document per worker at a time, so the batch cannot fill the queue alone
+        slots = asyncio.Semaphore(get_processing_pool().max_workers)
+
+        async def process(path, filename, file_type):
+            async with slots:
+                return await get_processing_pool().process_file(path, filename=filename, file_type=file_type)
+
+        outcomes = await asyncio.gather(
+            *(process(path, entry["filename"], file_type) for entry, path, file_type, _ in to_process),
+            return_exceptions=True
+        )
+        processing_ms = round((time.perf_counter() - started) * 1000 - spool_ms, 1)
+
+        # Pool the chunks of every new document, and of never-embedded duplicates, into one store call
+        processed = []
+        for (entry, _, _, content_hash), outcome in zip(to_process, outcomes):
+            if isinstance(outcome, BaseException):
+                entry["error"] = str(outcome)
+                entry["status"] = "error"
+            else:
+                processed.append((entry, outcome, content_hash))
+        unembedded = list(dict.fromkeys(
+            duplicate_id for _, duplicate_id, _ in duplicates
+            if duplicate_id and not document_store[duplicate_id]["embedded"]
+        ))
+        to_store = [(result["chunks"], result["document_type"]) for _, result, _ in processed]
+        to_store += [(document_chunks[d], document_store[d]["document_type"]) for d in unembedded]
+        embed_started = time.perf_counter()
+        try:
+            stored = await asyncio.to_thread(
+                get_embedding_service().store_embeddings_bulk, to_store, "default_user", session_id
+            ) if to_store else []
+        except Exception as e:
+            for entry, _, _ in processed:
+                entry["error"] = str(e)
+                entry["status"] = "error"
+            processed, unembedded = [], []
+        embedding_ms = round((time.perf_counter() - embed_started) * 1000, 1)
+
+        for (entry, result, content_hash), vectors_stored in zip(processed, stored):
+            _register_document(result, session_id, content_hash, embedded=True)
+            entry.update(status="success", document_id=result["document_id"],
+                         document_type=result["document_type"], chunks_processed=vectors_stored)
+        for duplicate_id in unembedded:
+            document_store[duplicate_id]["embedded"] = True
+        if unembedded:
+            # Newly embedded duplicates are retrievable now, even if nothing was registered
+            get_semantic_cache().invalidate_session(session_id)
+        for entry, duplicate_id, content_hash in duplicates:
+            duplicate_id = duplicate_id or first_by_hash[content_hash]["document_id"]
+            if duplicate_id is None or not document_store[duplicate_id]["embedded"]:
+                entry.update(status="error", error="Duplicate of a document that failed to ingest")
+                continue
+            info = document_store[duplicate_id]
+            entry.update(status="success", document_id=duplicate_id, document_type=info["document_type"],
+                         chunks_processed=info["total_chunks"], duplicate=True)
+
+        succeeded = sum(1 for entry in entries if entry["status"] == "success")
         return {
-            "status": "success",
-            "document_id": result["document_id"],
-            "filename": result["filename"],
-            "document_type": result["document_type"],
-            "chunks_processed": store_result["vectors_stored"],
-            "session_id": session_id
+            "status": "success" if succeeded == len(entries) else "partial" if succeeded else "error",
+            "session_id": session_id,
+            "files": entries,
+            "documents_processed": len(processed),
+            "duplicates": sum(1 for entry in entries if entry["duplicate"]),
+            "failed": len(entries) - succeeded,
+            "chunks_processed": sum(entry["chunks_processed"] for entry in entries if not entry["duplicate"]),
+            "timings": {
+                "spool_ms": spool_ms,
+                "processing_ms": processing_ms,
+                "embedding_ms": embedding_ms,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for _, path, _, _ in spooled:
+            os.remove(path)
 
 @router.post("/embed/", response_model=EmbeddingResponse)
 async def embed_document(request: EmbeddingRequest):
@@ -191,13 +566,20 @@ async def embed_document(request: EmbeddingRequest):
         document_type = request.document_type if request.document_type != "unknown" else document_info["document_type"]
         
         # Store embeddings in Pinecone with session isolation
-        result = embedding_service.store_embeddings(
+        result = get_embedding_service().store_embeddings(
             chunks, 
             user_id="default_user", 
             document_type=document_type,
             session_id=request.session_id
         )
         
+        if request.session_id == document_info.get("session_id"):
+            document_info["embedded"] = True
+        # Answers cached over the old vectors (e.g. another document type) are stale
+        get_llm_service().answer_cache.invalidate_document(request.document_id)
+        get_semantic_cache().invalidate_document(request.document_id)
+        get_semantic_cache().invalidate_session(request.session_id)
+        
         return EmbeddingResponse(
             document_id=request.document_id,
             status="success",
@@ -240,6 +622,27 @@ async def query_document(request: QueryRequest):
         if document_type and document_type != "unknown":
             search_params["document_type"] = document_type
         
+        # Paraphrases of a question already answered in this session/document
+        # are served from the semantic cache, skipping retrieval and the LLM.
+        # Placeholder embeddings (no Google API key) are all alike, so skip it then.
+        embedding_service, semantic_cache = get_embedding_service(), get_semantic_cache()
+        scope = None
+        if (request.document_id or request.session_id) and embedding_service.google_api_available:
+            scope = SemanticAnswerCache.scope(
+                None if request.document_id else request.session_id, request.document_id, document_type
+            )
+            search_params["query_embedding"] = embedding_service.get_embeddings([request.question])[0]
+            cached = semantic_cache.lookup(scope, search_params["query_embedding"])
+            if cached is not None:
+                return QueryResponse(
+                    answer=cached["answer"],
+                    justification=cached["justification"],
+                    matched_clauses=cached["matched_clauses"],
+                    score_details=cached["score_details"],
+                    confidence=cached["confidence"],
+                    document_id=request.document_id
+                )
+        
         # Search for relevant chunks using embedding service
         search_results = embedding_service.search_similar(**search_params)
         
@@ -263,11 +666,15 @@ async def query_document(request: QueryRequest):
             )
         
         # Generate answer using LLM
-        llm_response = llm_service.generate_answer(
+        document_ids = [result["document_id"] for result in search_results if result["text"]]
+        llm_response = get_llm_service().generate_answer(
             question=request.question,
             context_chunks=context_chunks,
-            document_type=document_type
+            document_type=document_type,
+            document_ids=document_ids
         )
+        if scope is not None and "error" not in llm_response:
+            semantic_cache.add(scope, search_params["query_embedding"], llm_response, document_ids)
         
         # Create response
         return QueryResponse(
@@ -299,7 +706,8 @@ async def list_documents(session_id: str = None):
                 "total_chunks": doc_info["total_chunks"],
                 "upload_time": doc_info["upload_time"],
                 "document_type": doc_info["document_type"],
-                "session_id": doc_info.get("session_id")
+                "session_id": doc_info.get("session_id"),
+                "version": doc_info.get("version", 1)
             })
         
         return {"documents": documents, "total": len(documents)}
@@ -317,20 +725,16 @@ async def delete_document(document_id: str):
         # Get session_id for proper vector deletion
         session_id = document_store[document_id].get("session_id")
         
-        # Delete from document store
-        del document_store[document_id]
+        # Delete from document store (and the content-hash index)
+        _forget_document(document_id)
         
         # Delete embeddings from Pinecone
-        embedding_service.delete_document_vectors(
+        get_embedding_service().delete_document_vectors(
             document_id, 
             "default_user", 
             session_id
         )
         
-        # Delete chunks from memory
-        if document_id in document_chunks:
-            del document_chunks[document_id]
-        
         return {"message": "Document deleted successfully"}
         
     except Exception as e:
@@ -339,11 +743,31 @@ async def delete_document(document_id: str):
 @router.get("/health/")
 async def health_check():
     """Health check endpoint"""
+    embedding_service = get_embedding_service()
+    vector_store = embedding_service.index.memory_usage() if embedding_service.using_local else {"backend": "pinecone"}
     return {
         "status": "healthy",
         "services": {
             "document_processor": "available",
             "embedding_service": "available" if embedding_service.index else "unavailable",
             "llm_service": "available"
-        }
+        },
+        "embedding_cache": embedding_service.embedding_cache.stats(),
+        "answer_cache": get_llm_service().answer_cache.stats(),
+        "semantic_cache": get_semantic_cache().stats(),
+        "vector_store": vector_store,
+        "processing_pool": get_processing_pool().metrics(),
+        "ingest_jobs": get_ingest_jobs().metrics()
     }
+
+def close_services():
+    """Release background resources held by the shared services that have been built"""
+    if get_ingest_jobs.cache_info().currsize:
+        get_ingest_jobs().shutdown()
+    if get_ingest_pipeline.cache_info().currsize:
+        get_ingest_pipeline().shutdown()
+    if get_processing_pool.cache_info().currsize:
+        get_processing_pool().shutdown()
+    # Checkpoint the persistent local vector store, if configured
+    if get_embedding_service.cache_info().currsize:
+        get_embedding_service().close()
@@ -0,0 +1,186 @@
+import math
+from typing import Any, Dict, List, Optional, Callable
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index over vector store rows.
+
+    Rows are clustered around spherical k-means centroids; a query only scores
+    the rows listed under its n_probe closest centroids. Recall/speed knobs:
+    n_lists (more lists = smaller lists, faster but lower recall per probe) and
+    n_probe (more probes = higher recall, slower).
+
+    Inserts are assigned to their nearest centroid incrementally. Deletes only
+    tombstone the row; list entries whose row no longer belongs to that list are
+    skipped at query time and purged when tombstones pile up.
+    """
+
+    def __init__(self, n_lists: Optional[int] = None, n_probe: int = 8, kmeans_iterations: int = 10,
+                 training_sample_per_list: int = 40, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = max(1, n_probe)
+        self.kmeans_iterations = max(1, kmeans_iterations)
+        self.training_sample_per_list = max(1, training_sample_per_list)
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._rng = np.random.default_rng(seed)
+        self._row_list = np.full(0, -1, dtype=np.int32)
+        self._lists: Optional[List[List[int]]] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []
+        self._entries = 0
+        self._tombstones = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def get_state(self) -> Dict[str, Any]:
+        """Trained state for persistence: arrays plus a few counters"""
+        return {
+            "centroids": self.centroids,
+            "row_list": self._row_list,
+            "trained_size": self.trained_size,
+            "entries": self._entries,
+            "tombstones": self._tombstones
+        }
+
+    def set_state(self, state: Dict[str, Any]):
+        """
+        Restore get_state(). Lists are regrouped from row_list with numpy;
+        the Python lists used for incremental adds are only built on the
+        first add.
+        """
+        self.centroids = state.get("centroids")
+        self.trained_size = state.get("trained_size", 0)
+        self._row_list = np.array(state.get("row_list", np.full(0, -1)), dtype=np.int32)
+        self._entries = state.get("entries", 0)
+        self._tombstones = state.get("tombstones", 0)
+        if self.is_trained:
+            self._group_lists()
+
+    def _group_lists(self):
+        """Rebuild every list's row array from _row_list, dropping tombstones"""
+        rows = np.nonzero(self._row_list >= 0)[0]
+        assignments = self._row_list[rows]
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(self.centroids.shape[0] + 1))
+        self._list_arrays = [rows[order[bounds[i]:bounds[i + 1]]] for i in range(self.centroids.shape[0])]
+        self._lists = None
+        self._entries = int(rows.shape[0])
+
+    def _grow(self, rows_needed: int):
+        if rows_needed <= self._row_list.shape[0]:
+            return
+        row_list = np.full(max(rows_needed, self._row_list.shape[0] * 2), -1, dtype=np.int32)
+        row_list[:self._row_list.shape[0]] = self._row_list
+        self._row_list = row_list
+
+    def _assign(self, vectors: np.ndarray, block_size: int = 8192) -> np.ndarray:
+        """Index of the nearest centroid for each (normalized) vector"""
+        assignments = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], block_size):
+            block = vectors[start:start + block_size]
+            assignments[start:start + block_size] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+
+    def _kmeans(self, sample: np.ndarray, n_lists: int) -> np.ndarray:
+        centroids = sample[self._rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            self.centroids = centroids
+            assignments = self._assign(sample)
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=n_lists)
+            occupied = np.nonzero(counts)[0]
+            sums = np.add.reduceat(sample[order], np.concatenate(([0], np.cumsum(counts[occupied])[:-1])))
+            centroids = np.empty_like(centroids)
+            centroids[occupied] = sums
+            empty = np.nonzero(counts == 0)[0]
+            if empty.size:
+                # Re-seed empty clusters from random sample points
+                centroids[empty] = sample[self._rng.choice(sample.shape[0], empty.size, replace=False)]
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids /= norms
+        return centroids.astype(np.float32)
+
+    def train(self, rows: np.ndarray, fetch: Callable[[np.ndarray], np.ndarray], block_size: int = 65536):
+        """
+        (Re)build centroids from a sample of the given live rows and reassign all
+        of them. fetch(rows) returns the normalized float32 vectors for rows, so
+        the full corpus is never copied at once.
+        """
+        count = rows.shape[0]
+        n_lists = self.n_lists or max(1, int(math.sqrt(count)))
+        n_lists = min(n_lists, count)
+        sample_size = min(count, n_lists * self.training_sample_per_list)
+        sample_rows = np.sort(self._rng.choice(rows, sample_size, replace=False)) if sample_size < count else rows
+        self.centroids = self._kmeans(np.asarray(fetch(sample_rows), dtype=np.float32), n_lists)
+        self.trained_size = count
+
+        self._row_list = np.full(0, -1, dtype=np.int32)
+        self._lists = [[] for _ in range(n_lists)]
+        self._list_arrays = [None] * n_lists
+        self._entries = 0
+        self._tombstones = 0
+        for start in range(0, count, block_size):
+            block = rows[start:start + block_size]
+            self.add(block, fetch(block))
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        """Assign new or updated rows to their nearest list"""
+        if not self.is_trained or rows.shape[0] == 0:
+            return
+        if self._lists is None:
+            self._lists = [list_rows.tolist() for list_rows in self._list_arrays]
+        self._grow(int(rows.max()) + 1)
+        stale = int(np.count_nonzero(self._row_list[rows] >= 0))
+        assignments = self._assign(vectors)
+        self._row_list[rows] = assignments
+        for row, list_id in zip(rows.tolist(), assignments.tolist()):
+            self._lists[list_id].append(row)
+            self._list_arrays[list_id] = None
+        self._entries += rows.shape[0]
+        self._tombstones += stale
+        self._maybe_compact()
+
+    def remove(self, rows: List[int]):
+        if not self.is_trained:
+            return
+        for row in rows:
+            if row < self._row_list.shape[0] and self._row_list[row] >= 0:
+                self._row_list[row] = -1
+                self._tombstones += 1
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._tombstones <= max(1024, self._entries // 4):
+            return
+        self._group_lists()
+        self._tombstones = 0
+
+    def _list_rows(self, list_id: int) -> np.ndarray:
+        rows = self._list_arrays[list_id]
+        if rows is None:
+            rows = np.asarray(self._lists[list_id], dtype=np.int64)
+            self._list_arrays[list_id] = rows
+        return rows
+
+    def search_rows(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        """Candidate rows from the lists closest to the (normalized) query"""
+        n_probe = min(n_probe or self.n_probe, self.centroids.shape[0])
+        centroid_scores = self.centroids @ query
+        if n_probe < centroid_scores.shape[0]:
+            probes = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+        else:
+            probes = np.arange(centroid_scores.shape[0])
+        candidates = []
+        for list_id in probes.tolist():
+            rows = self._list_rows(list_id)
+            # Skip tombstoned rows and rows that have since moved to another list
+            candidates.append(rows[self._row_list[rows] == list_id])
+        if not candidates:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(candidates))
@@ -0,0 +1,99 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of generated answers keyed by (model name, normalized
+    question, ordered hashes of the retrieved context chunks, document type).
+
+    The same question over the same retrieved chunks is answered once; a
+    different retrieval (new or changed chunks, another order) is a different
+    key. Entries also remember which documents their context came from, so
+    deleting or re-embedding a document invalidates its answers. Thread-safe.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 3600):
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], Tuple[str, ...]]]" = OrderedDict()
+        self._by_document: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """Case- and whitespace-insensitive form; trailing punctuation is ignored"""
+        return " ".join(question.casefold().split()).rstrip("?!. ")
+
+    def key(self, model: str, question: str, context_chunks: List[str], document_type: str) -> str:
+        digest = hashlib.sha256()
+        for part in [model, self.normalize_question(question), document_type or "unknown"]:
+            digest.update(part.encode("utf-8") + b"\0")
+        for chunk in context_chunks:
+            digest.update(hashlib.sha256(chunk.encode("utf-8")).digest())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] >= self.ttl_seconds:
+                self._remove(key)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key: str, answer: Dict[str, Any], document_ids: Iterable[str] = ()):
+        if self.max_entries == 0:
+            return
+        document_ids = tuple(dict.fromkeys(d for d in document_ids if d))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), dict(answer), document_ids)
+            for document_id in document_ids:
+                self._by_document.setdefault(document_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_document(self, document_id: str) -> int:
+        """Drop every answer whose context came from document_id; returns how many"""
+        with self._lock:
+            keys = self._by_document.pop(document_id, set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def _remove(self, key: str):
+        _, _, document_ids = self._entries.pop(key)
+        for document_id in document_ids:
+            keys = self._by_document.get(document_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_document[document_id]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,121 @@
+import sys
+import hashlib
+from array import array
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from langchain.schema import Document as LangchainDocument
+
+
+class ChunkKeyer:
+    """
+    Assigns content-stable keys to the chunks of one document, in order: a
+    hash of the chunk text, suffixed with the occurrence number when the same
+    text repeats within the document. Unchanged chunks keep their key across
+    document versions wherever they move.
+    """
+
+    def __init__(self):
+        self._occurrences: Dict[str, int] = {}
+
+    def __call__(self, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        occurrence = self._occurrences.get(digest, 0)
+        self._occurrences[digest] = occurrence + 1
+        return f"{digest}-{occurrence}" if occurrence else digest
+
+
+def chunk_keys(texts: Iterable[str]) -> List[str]:
+    keyer = ChunkKeyer()
+    return [keyer(text) for text in texts]
+
+
+class ChunkView:
+    """
+    Lazy view of one chunk in a ChunkTable. Exposes page_content and metadata
+    like a LangChain Document, but the text is only sliced out on access.
+    """
+
+    __slots__ = ("_table", "index")
+
+    def __init__(self, table: "ChunkTable", index: int):
+        self._table = table
+        self.index = index
+
+    @property
+    def page_content(self) -> str:
+        table = self._table
+        return table.text[table.starts[self.index]:table.ends[self.index]]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "document_id": self._table.document_id,
+            "chunk_id": self.index,
+            "chunk_index": self.index,
+            "total_chunks": len(self._table),
+            "chunk_key": self._table.chunk_keys()[self.index]
+        }
+
+    def to_document(self) -> LangchainDocument:
+        return LangchainDocument(page_content=self.page_content, metadata=self.metadata)
+
+
+class ChunkTable:
+    """
+    Compact chunk storage for one document: the document text once, plus the
+    start/end offset of every chunk in it. Chunk i is text[starts[i]:ends[i]];
+    overlapping chunks share the underlying text instead of each holding a
+    copy, and per-chunk metadata is derived rather than stored.
+
+    Indexing and iteration hand out ChunkViews, which duck-type as LangChain
+    Documents; to_documents() materializes real ones where an API needs them.
+    """
+
+    def __init__(self, document_id: str, text: str, starts: Optional[Iterable[int]] = None,
+                 ends: Optional[Iterable[int]] = None):
+        self.document_id = document_id
+        self.text = text
+        self.starts = array("I", starts or [])
+        self.ends = array("I", ends or [])
+        self._keys: Optional[List[str]] = None
+
+    @classmethod
+    def from_chunks(cls, document_id: str, text: str, chunks: Iterable[str]) -> "ChunkTable":
+        """Locate each chunk (in order, as produced by a splitter) in the text"""
+        table = cls(document_id, text)
+        position = 0
+        for chunk in chunks:
+            start = text.find(chunk, position)
+            if start < 0:
+                raise ValueError(f"Chunk {len(table)} not found in document text")
+            table.starts.append(start)
+            table.ends.append(start + len(chunk))
+            position = start + 1
+        return table
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index: int) -> ChunkView:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return ChunkView(self, index)
+
+    def __iter__(self) -> Iterator[ChunkView]:
+        return (ChunkView(self, i) for i in range(len(self)))
+
+    def chunk_keys(self) -> List[str]:
+        """Content-stable key of every chunk (see ChunkKeyer), computed once"""
+        if self._keys is None or len(self._keys) != len(self):
+            self._keys = chunk_keys(self.text[start:end] for start, end in zip(self.starts, self.ends))
+        return self._keys
+
+    def to_documents(self) -> List[LangchainDocument]:
+        return [view.to_document() for view in self]
+
+    def nbytes(self) -> int:
+        """Approximate resident size of the table"""
+        return (sys.getsizeof(self.text) + self.starts.itemsize * len(self.starts)
+                + self.ends.itemsize * len(self.ends))
@@ -0,0 +1,145 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+
+class CachedDocument:
+    """A document ingested once (chunks plus vectors in its own session) and reused by URL"""
+
+    def __init__(self, content_hash: str, document_id: str, session_id: str, chunks,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None, nbytes: int = 0):
+        self.content_hash = content_hash
+        self.document_id = document_id
+        self.session_id = session_id
+        self.chunks = chunks
+        self.etag = etag
+        self.last_modified = last_modified
+        self.nbytes = nbytes
+        self.created_at = time.monotonic()
+        self.validated_at = self.created_at
+        self.hits = 0
+        # Requests currently answering from this document's vectors
+        self.users = 0
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers that let the origin answer 304 if the document is unchanged"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class DocumentCache:
+    """
+    Cache of downloaded-and-ingested documents for repeated URL submissions.
+
+    Documents are stored by content hash, so different URLs serving the same
+    bytes (e.g. re-signed links) share one entry; each URL is an alias. An
+    entry is used without any network request for revalidate_seconds after
+    it was last validated, then revalidated with its ETag/Last-Modified (or
+    by content hash if the origin sends neither). Entries expire ttl_seconds
+    after ingestion, and the least recently used ones are evicted beyond
+    max_entries or max_bytes. Methods that evict return the evicted entries.
+
+    Requests acquire() the document they answer from and release() it when
+    done. Evicted entries are retired rather than dropped: release() returns
+    the retired entries nothing uses any more, and the caller deletes their
+    vectors, so a request never loses its context to another's eviction.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, revalidate_seconds: float = 300,
+                 max_entries: int = 64, max_bytes: int = 256 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.revalidate_seconds = revalidate_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._documents: "OrderedDict[str, CachedDocument]" = OrderedDict()
+        self._urls: Dict[str, str] = {}
+        self._retired: List[CachedDocument] = []
+        self.nbytes = 0
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, url: str) -> Optional[CachedDocument]:
+        """Cached document for url, if any (fresh or in need of revalidation)"""
+        document = self._documents.get(self._urls.get(url))
+        if document is None:
+            self._urls.pop(url, None)
+        return document
+
+    def find(self, content_hash: str) -> Optional[CachedDocument]:
+        return self._documents.get(content_hash)
+
+    def is_fresh(self, document: CachedDocument) -> bool:
+        return time.monotonic() - document.validated_at < self.revalidate_seconds
+
+    def hit(self, document: CachedDocument, revalidated: bool = False):
+        """Record a reuse: refresh LRU order, and the validation time if revalidated"""
+        document.hits += 1
+        if self._documents.get(document.content_hash) is document:
+            self._documents.move_to_end(document.content_hash)
+        if revalidated:
+            document.validated_at = time.monotonic()
+            self.revalidations += 1
+        else:
+            self.hits += 1
+
+    def acquire(self, document: CachedDocument):
+        document.users += 1
+
+    def release(self, document: CachedDocument) -> List[CachedDocument]:
+        """Drop a use of document; returns evicted entries no request uses any more"""
+        document.users -= 1
+        idle = [d for d in self._retired if d.users <= 0]
+        self._retired = [d for d in self._retired if d.users > 0]
+        return idle
+
+    def add(self, url: str, document: CachedDocument) -> List[CachedDocument]:
+        """
+        Cache document under url. If its content is already cached (under
+        another URL), url becomes an alias of that entry instead.
+        """
+        if document.content_hash not in self._documents:
+            self._documents[document.content_hash] = document
+            self.nbytes += document.nbytes
+            self.misses += 1
+        self._urls[url] = document.content_hash
+        self._documents.move_to_end(document.content_hash)
+        evicted = self.expire()
+        while self._documents and (len(self._documents) > self.max_entries or self.nbytes > self.max_bytes):
+            evicted.append(self._remove(next(iter(self._documents))))
+            self.evictions += 1
+        return evicted
+
+    def expire(self) -> List[CachedDocument]:
+        """Remove and return entries older than ttl_seconds"""
+        now = time.monotonic()
+        expired = [h for h, document in self._documents.items() if now - document.created_at >= self.ttl_seconds]
+        self.evictions += len(expired)
+        return [self._remove(content_hash) for content_hash in expired]
+
+    def _remove(self, content_hash: str) -> CachedDocument:
+        document = self._documents.pop(content_hash)
+        self.nbytes -= document.nbytes
+        for url in [u for u, h in self._urls.items() if h == content_hash]:
+            del self._urls[url]
+        self._retired.append(document)
+        return document
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self._documents),
+            "urls": len(self._urls),
+            "bytes": self.nbytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "retired": len(self._retired)
+        }
@@ -1,60 +1,80 @@
 import os
 import uuid
 import io
-from typing import List, Dict, Any
+import mmap
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 import pypdf
-from docx import Document
 import email
 from email import policy
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document as LangchainDocument
+
+from services.chunk_table import ChunkTable
+from services.pdf_extractor import ParallelPDFExtractor
+from services.docx_extractor import StreamingDocxExtractor
+from utils.keyword_matcher import KeywordMatcher
+
+# Content keywords per document type; dict order breaks score ties
+DOCUMENT_TYPE_KEYWORDS = {
+    "Policy Wordings": [
+        'policy', 'coverage', 'premium', 'deductible', 'claim', 'insured', 'insurer',
+        'policyholder', 'endorsement', 'exclusion', 'liability', 'property', 'casualty',
+        'health insurance', 'life insurance', 'auto insurance', 'home insurance'
+    ],
+    "Legal Documents": [
+        'contract', 'agreement', 'terms and conditions', 'clause', 'section', 'article',
+        'party', 'obligation', 'liability', 'breach', 'termination', 'jurisdiction',
+        'legal', 'law', 'statute', 'regulation', 'compliance'
+    ],
+    "Financial Documents": [
+        'financial', 'revenue', 'profit', 'loss', 'income', 'expense', 'budget',
+        'investment', 'portfolio', 'asset', 'liability', 'equity', 'balance sheet',
+        'income statement', 'cash flow', 'audit', 'tax'
+    ],
+    "Technical Documents": [
+        'technical', 'specification', 'requirement', 'system', 'software', 'hardware',
+        'architecture', 'design', 'implementation', 'api', 'database', 'protocol',
+        'algorithm', 'framework', 'development', 'testing'
+    ],
+    "Medical Documents": [
+        'medical', 'health', 'patient', 'diagnosis', 'treatment', 'symptom',
+        'medication', 'prescription', 'doctor', 'physician', 'clinic', 'hospital',
+        'therapy', 'recovery', 'prognosis', 'medical record'
+    ]
+}
+
+# Streaming chunker re-splits its buffer once this much text has arrived
+STREAM_CHUNK_WINDOW = 8000
 
 class DocumentProcessor:
-    def __init__(self):
+    # Compiled once and shared by every processor
+    _type_matcher = KeywordMatcher(DOCUMENT_TYPE_KEYWORDS)
+
+    def __init__(self, pdf_extractor: Optional[ParallelPDFExtractor] = None):
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
+        # Large PDFs are extracted page-parallel across worker processes
+        self.pdf_extractor = pdf_extractor or ParallelPDFExtractor(
+            max_workers=int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or None,
+            min_pages=int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+        )
+        # DOCX text is stream-parsed from the zip instead of loading python-docx's tree
+        self.docx_extractor = StreamingDocxExtractor()
+        # Document type is detected from this many leading characters of the text
+        self.type_sample_chars = int(os.getenv("DOCUMENT_TYPE_SAMPLE_CHARS", "20000"))
     
-    def detect_document_type(self, text: str, filename: str) -> str:
-        """Automatically detect document type based on content and filename"""
-        text_lower = text.lower()
+    def detect_document_type(self, text: str, filename: str, max_chars: Optional[int] = None) -> str:
+        """
+        Automatically detect document type based on content and filename.
+        Pass max_chars to classify from a bounded prefix of the text.
+        """
         filename_lower = filename.lower()
         
-        # Keywords for different document types
-        insurance_keywords = [
-            'policy', 'coverage', 'premium', 'deductible', 'claim', 'insured', 'insurer',
-            'policyholder', 'endorsement', 'exclusion', 'liability', 'property', 'casualty',
-            'health insurance', 'life insurance', 'auto insurance', 'home insurance'
-        ]
-        
-        legal_keywords = [
-            'contract', 'agreement', 'terms and conditions', 'clause', 'section', 'article',
-            'party', 'obligation', 'liability', 'breach', 'termination', 'jurisdiction',
-            'legal', 'law', 'statute', 'regulation', 'compliance'
-        ]
-        
-        financial_keywords = [
-            'financial', 'revenue', 'profit', 'loss', 'income', 'expense', 'budget',
-            'investment', 'portfolio', 'asset', 'liability', 'equity', 'balance sheet',
-            'income statement', 'cash flow', 'audit', 'tax'
-        ]
-        
-        technical_keywords = [
-            'technical', 'specification', 'requirement', 'system', 'software', 'hardware',
-            'architecture', 'design', 'implementation', 'api', 'database', 'protocol',
-            'algorithm', 'framework', 'development', 'testing'
-        ]
-        
-        medical_keywords = [
-            'medical', 'health', 'patient', 'diagnosis', 'treatment', 'symptom',
-            'medication', 'prescription', 'doctor', 'physician', 'clinic', 'hospital',
-            'therapy', 'recovery', 'prognosis', 'medical record'
-        ]
-        
         # Check filename patterns
         if any(keyword in filename_lower for keyword in ['policy', 'insurance', 'coverage']):
             return "Policy Wordings"
@@ -67,21 +87,8 @@ class DocumentProcessor:
         elif any(keyword in filename_lower for keyword in ['medical', 'health', 'patient']):
             return "Medical Documents"
         
-        # Check content patterns
-        insurance_score = sum(1 for keyword in insurance_keywords if keyword in text_lower)
-        legal_score = sum(1 for keyword in legal_keywords if keyword in text_lower)
-        financial_score = sum(1 for keyword in financial_keywords if keyword in text_lower)
-        technical_score = sum(1 for keyword in technical_keywords if keyword in text_lower)
-        medical_score = sum(1 for keyword in medical_keywords if keyword in text_lower)
-        
-        # Determine document type based on highest score
-        scores = {
-            "Policy Wordings": insurance_score,
-            "Legal Documents": legal_score,
-            "Financial Documents": financial_score,
-            "Technical Documents": technical_score,
-            "Medical Documents": medical_score
-        }
+        # Check content patterns (all categories scored in one pass)
+        scores = self._type_matcher.scores(text, max_chars)
         
         max_score = max(scores.values())
         if max_score >= 3:  # Threshold for confident detection
@@ -89,37 +96,58 @@ class DocumentProcessor:
         else:
             return "unknown"
     
-    def process_pdf(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+    @staticmethod
+    def _as_stream(file_content):
+        """Seekable stream over the content: bytes are wrapped, a memory map is read in place"""
+        return io.BytesIO(file_content) if isinstance(file_content, (bytes, bytearray)) else file_content
+
+    @staticmethod
+    @contextmanager
+    def map_file(path: str):
+        """Read-only memory map of a file (b"" for an empty file)"""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def process_pdf(self, file_content: bytes, filename: str, source_path: Optional[str] = None) -> Dict[str, Any]:
         """Process PDF file and extract text"""
         try:
-            # Convert bytes to BytesIO object for pypdf
-            pdf_file = io.BytesIO(file_content)
-            pdf_reader = pypdf.PdfReader(pdf_file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+            pdf_reader = pypdf.PdfReader(self._as_stream(file_content))
+            page_count = len(pdf_reader.pages)
+            if self.pdf_extractor.should_parallelize(page_count):
+                page_texts = self.pdf_extractor.extract_pages(file_content, page_count, path=source_path)
+            else:
+                page_texts = [page.extract_text() for page in pdf_reader.pages]
+
+            # Join once; page i starts at page_offsets[i] in the text
+            page_offsets = []
+            offset = 0
+            for page_text in page_texts:
+                page_offsets.append(offset)
+                offset += len(page_text) + 1
+            text = "\n".join(page_texts) + "\n" if page_texts else ""
             
             return {
                 "text": text,
-                "pages": len(pdf_reader.pages),
+                "pages": page_count,
+                "page_offsets": page_offsets,
                 "filename": filename
             }
         except Exception as e:
             raise Exception(f"Error processing PDF: {str(e)}")
     
-    def process_docx(self, file_content: bytes, filename: str) -> Dict[str, Any]:
-        """Process DOCX file and extract text"""
+    def process_docx(self, file_content: bytes, filename: str, source_path: Optional[str] = None) -> Dict[str, Any]:
+        """Process DOCX file and extract text (paragraphs, table rows, headers and footers)"""
         try:
-            # Convert bytes to BytesIO object for python-docx
-            docx_file = io.BytesIO(file_content)
-            doc = Document(docx_file)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
+            # zipfile needs a real file object, so read a spooled file by path
+            lines = list(self.docx_extractor.iter_text(source_path or self._as_stream(file_content)))
             
             return {
-                "text": text,
-                "paragraphs": len(doc.paragraphs),
+                "text": "".join(lines),
+                "paragraphs": len(lines),
                 "filename": filename
             }
         except Exception as e:
@@ -128,7 +156,7 @@ class DocumentProcessor:
     def process_email(self, file_content: bytes, filename: str) -> Dict[str, Any]:
         """Process email file and extract text"""
         try:
-            msg = email.message_from_bytes(file_content, policy=policy.default)
+            msg = email.message_from_bytes(bytes(file_content), policy=policy.default)
             text = ""
             
             # Extract subject
@@ -152,46 +180,99 @@ class DocumentProcessor:
         except Exception as e:
             raise Exception(f"Error processing email: {str(e)}")
     
-    def chunk_text(self, text: str, document_id: str) -> List[LangchainDocument]:
-        """Split text into chunks using LangChain"""
+    def iter_text(self, file_content: bytes, filename: str, file_type: str,
+                  source_path: Optional[str] = None) -> Iterator[str]:
+        """
+        Yield the document text piece by piece (a PDF page, a DOCX paragraph);
+        the pieces concatenate to the text process_document extracts. Large PDFs
+        are extracted by the pdf_extractor workers and yielded as pages finish;
+        small ones (below its parallel threshold) are extracted inline, as in
+        process_pdf. DOCX lines are stream-parsed out of the zip as the chunker
+        asks for them.
+        """
+        if file_type.lower() == "pdf":
+            try:
+                pdf_reader = pypdf.PdfReader(self._as_stream(file_content))
+                page_count = len(pdf_reader.pages)
+                if self.pdf_extractor.should_parallelize(page_count):
+                    page_texts = self.pdf_extractor.iter_pages(file_content, page_count, path=source_path)
+                else:
+                    page_texts = (page.extract_text() for page in pdf_reader.pages)
+                for page_text in page_texts:
+                    yield page_text + "\n"
+            except Exception as e:
+                raise Exception(f"Error processing PDF: {str(e)}")
+        elif file_type.lower() in ["docx", "doc"]:
+            try:
+                yield from self.docx_extractor.iter_text(source_path or self._as_stream(file_content))
+            except Exception as e:
+                raise Exception(f"Error processing DOCX: {str(e)}")
+        elif file_type.lower() in ["eml", "email"]:
+            yield self.process_email(file_content, filename)["text"]
+        else:
+            raise Exception(f"Unsupported file type: {file_type}")
+
+    def iter_chunk_spans(self, text_pieces: Iterable[str]) -> Iterator[Tuple[int, int, str]]:
+        """
+        Chunk text as it arrives, yielding (start, end, chunk) with offsets into
+        the concatenated pieces. The splitter runs over a rolling buffer; every
+        chunk but the last is final, and the last one is carried into the next
+        round so chunks keep their overlap across piece boundaries.
+        """
+        buffer = ""
+        buffer_start = 0
+        position = 0
+        for piece in text_pieces:
+            buffer += piece
+            if len(buffer) < STREAM_CHUNK_WINDOW:
+                continue
+            chunks = self.text_splitter.split_text(buffer)
+            for chunk in chunks[:-1]:
+                start = buffer.find(chunk, position)
+                yield buffer_start + start, buffer_start + start + len(chunk), chunk
+                position = start + 1
+            if not chunks:
+                buffer_start += len(buffer)
+                buffer, position = "", 0
+                continue
+            carry = buffer.find(chunks[-1], position)
+            buffer_start += carry
+            buffer, position = buffer[carry:], 0
+        for chunk in self.text_splitter.split_text(buffer):
+            start = buffer.find(chunk, position)
+            yield buffer_start + start, buffer_start + start + len(chunk), chunk
+            position = start + 1
+
+    def chunk_text(self, text: str, document_id: str) -> ChunkTable:
+        """Split text into chunks, stored as offsets into text (see ChunkTable)"""
         try:
-            chunks = self.text_splitter.split_text(text)
-            documents = []
-            
-            for i, chunk in enumerate(chunks):
-                doc = LangchainDocument(
-                    page_content=chunk,
-                    metadata={
-                        "document_id": document_id,
-                        "chunk_id": i,
-                        "chunk_index": i,
-                        "total_chunks": len(chunks)
-                    }
-                )
-                documents.append(doc)
-            
-            return documents
+            return ChunkTable.from_chunks(document_id, text, self.text_splitter.split_text(text))
         except Exception as e:
             raise Exception(f"Error chunking text: {str(e)}")
-    
-    def process_document(self, file_content: bytes, filename: str, file_type: str) -> Dict[str, Any]:
-        """Main method to process any document type"""
-        document_id = str(uuid.uuid4())
+
+    def process_document(self, file_content: bytes, filename: str, file_type: str,
+                         document_id: Optional[str] = None, source_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Main method to process any document type. Pass document_id to process
+        a new version of an existing document under the same ID. file_content
+        may also be a memory map of source_path (see process_file).
+        """
+        document_id = document_id or str(uuid.uuid4())
         
         # Process based on file type
         if file_type.lower() == "pdf":
-            result = self.process_pdf(file_content, filename)
+            result = self.process_pdf(file_content, filename, source_path)
         elif file_type.lower() in ["docx", "doc"]:
-            result = self.process_docx(file_content, filename)
+            result = self.process_docx(file_content, filename, source_path)
         elif file_type.lower() in ["eml", "email"]:
             result = self.process_email(file_content, filename)
         else:
             raise Exception(f"Unsupported file type: {file_type}")
         
         # Detect document type automatically
-        detected_type = self.detect_document_type(result["text"], filename)
+        detected_type = self.detect_document_type(result["text"], filename, self.type_sample_chars)
         
-        # Chunk the text
+        # Chunk the text into an offset table over the extracted text
         chunks = self.chunk_text(result["text"], document_id)
         
         return {
@@ -202,5 +283,16 @@ class DocumentProcessor:
             "text": result["text"],
             "chunks": chunks,
             "total_chunks": len(chunks),
+            "page_offsets": result.get("page_offsets"),
             "upload_time": datetime.now()
-        } 
\ No newline at end of file
+        } 
+
+    def process_file(self, path: str, filename: str, file_type: str,
+                     document_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process a document spooled to disk without reading it into memory:
+        parsers read it through a read-only memory map, and parallel PDF
+        extraction reuses the file instead of writing a temp copy.
+        """
+        with self.map_file(path) as mapped:
+            return self.process_document(mapped, filename, file_type, document_id, source_path=path)
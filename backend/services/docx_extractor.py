@@ -0,0 +1,119 @@
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, List, Tuple, Union
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+REL = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+OFFICE_DOCUMENT_REL = "/officeDocument"
+DEFAULT_DOCUMENT_PART = "word/document.xml"
+
+# Run-level elements that stand for characters rather than holding text
+_RUN_CHARACTERS = {f"{W}tab": "\t", f"{W}br": "\n", f"{W}cr": "\n", f"{W}noBreakHyphen": "-"}
+
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> List[Tuple[str, str]]:
+    """(type, target part) of each relationship of a package part, in file order"""
+    folder, name = posixpath.split(part)
+    rels_part = posixpath.join(folder, "_rels", f"{name}.rels")
+    if rels_part not in archive.NameToInfo:
+        return []
+    relationships = []
+    for rel in ET.fromstring(archive.read(rels_part)).iter(REL):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+        relationships.append((rel.get("Type", ""), target))
+    return relationships
+
+
+class StreamingDocxExtractor:
+    """
+    Extracts DOCX text by stream-parsing the WordprocessingML parts straight
+    out of the zip, without building python-docx's object model.
+
+    Each part is decompressed and parsed incrementally with iterparse, and
+    finished elements are dropped as the parser moves on, so memory stays
+    flat however long the document is. Text is yielded one line at a time:
+    one per paragraph and one per table row, with the row's cells joined by
+    " | " so cell values keep their row context. Headers come before the body
+    and footers after it, each part once.
+    """
+
+    CELL_SEPARATOR = " | "
+
+    def iter_text(self, source: Union[str, IO[bytes]]) -> Iterator[str]:
+        """Yield the document's lines (each ending in "\\n"); source is a path or seekable file"""
+        with zipfile.ZipFile(source) as archive:
+            document_part = next(
+                (target for rel_type, target in _relationships(archive, "")
+                 if rel_type.endswith(OFFICE_DOCUMENT_REL)),
+                DEFAULT_DOCUMENT_PART
+            )
+            related = _relationships(archive, document_part)
+            headers = [target for rel_type, target in related if rel_type.endswith("/header")]
+            footers = [target for rel_type, target in related if rel_type.endswith("/footer")]
+            for part in dict.fromkeys(headers + [document_part] + footers):
+                if part in archive.NameToInfo:
+                    with archive.open(part) as stream:
+                        yield from self._iter_part(stream)
+
+    def _iter_part(self, stream: IO[bytes]) -> Iterator[str]:
+        paragraphs: List[List[str]] = []  # text runs of each open paragraph (text boxes nest)
+        cells: List[List[str]] = []       # paragraph texts of each open table cell
+        rows: List[List[str]] = []        # cell texts of each open table row
+        fallback_depth = 0                # inside mc:Fallback, which repeats mc:Choice content
+        stack = []
+
+        for event, element in ET.iterparse(stream, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                stack.append(element)
+                if tag == MC_FALLBACK:
+                    fallback_depth += 1
+                elif fallback_depth:
+                    pass
+                elif tag == f"{W}p":
+                    paragraphs.append([])
+                elif tag == f"{W}tc":
+                    cells.append([])
+                elif tag == f"{W}tr":
+                    rows.append([])
+                continue
+
+            stack.pop()
+            if tag == MC_FALLBACK:
+                fallback_depth -= 1
+            elif fallback_depth:
+                pass
+            elif tag == f"{W}t":
+                if paragraphs and element.text:
+                    paragraphs[-1].append(element.text)
+            elif tag in _RUN_CHARACTERS:
+                # w:tab also defines tab stops in paragraph properties; only runs hold text
+                if paragraphs and stack and stack[-1].tag == f"{W}r":
+                    paragraphs[-1].append(_RUN_CHARACTERS[tag])
+            elif tag == f"{W}p":
+                text = "".join(paragraphs.pop())
+                if cells:
+                    cells[-1].append(text)
+                else:
+                    yield text + "\n"
+            elif tag == f"{W}tc":
+                if rows:
+                    rows[-1].append(" ".join(text for text in cells.pop() if text))
+                else:
+                    cells.pop()
+            elif tag == f"{W}tr":
+                line = self.CELL_SEPARATOR.join(rows.pop())
+                if cells:
+                    # Nested table: the row becomes part of the enclosing cell
+                    cells[-1].append(line)
+                else:
+                    yield line + "\n"
+
+            # Drop finished content once nothing open still needs it
+            if not paragraphs and not cells and stack:
+                stack[-1].clear()
@@ -0,0 +1,147 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed by (model name, sha256 of the text).
+
+    Two tiers: an in-memory LRU of float32 arrays and an optional SQLite file that
+    survives restarts. Both tiers evict least-recently-used entries once they
+    exceed their size limits. Thread-safe.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_items: int = 10000, max_disk_entries: int = 500000):
+        self.memory_items = max(0, memory_items)
+        self.max_disk_entries = max(0, max_disk_entries)
+        self._memory: "OrderedDict[Tuple[str, str], array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+        self._conn = None
+        self._disk_count = 0
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, digest TEXT NOT NULL, vector BLOB NOT NULL, accessed REAL NOT NULL, "
+                "PRIMARY KEY (model, digest))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed)")
+            self._conn.commit()
+            self._disk_count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def text_digest(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: Tuple[str, str], vector: array):
+        if self.memory_items == 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached embedding for each text, or None where it is not cached"""
+        keys = [(model, self.text_digest(text)) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    results[i] = vector.tolist()
+                else:
+                    missing.setdefault(key[1], []).append(i)
+
+            if missing and self._conn is not None:
+                digests = list(missing)
+                found = []
+                # Stay below SQLite's bound-parameter limit
+                for start in range(0, len(digests), 500):
+                    batch = digests[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    found.extend(self._conn.execute(
+                        f"SELECT digest, vector FROM embeddings WHERE model = ? AND digest IN ({placeholders})",
+                        [model, *batch]
+                    ).fetchall())
+                now = time.time()
+                for digest, blob in found:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    self._remember((model, digest), vector)
+                    for i in missing.pop(digest):
+                        results[i] = vector.tolist()
+                        self.disk_hits += 1
+                if found:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET accessed = ? WHERE model = ? AND digest = ?",
+                        [(now, model, digest) for digest, _ in found]
+                    )
+                    self._conn.commit()
+
+            self.misses += sum(len(indices) for indices in missing.values())
+        return results
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]):
+        rows = []
+        now = time.time()
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                key = (model, self.text_digest(text))
+                vector = array("f", embedding)
+                self._remember(key, vector)
+                rows.append((model, key[1], vector.tobytes(), now))
+
+            if self._conn is None or not rows:
+                return
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, digest, vector, accessed) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._disk_count += self._conn.total_changes - before
+            overflow = self._disk_count - self.max_disk_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY accessed LIMIT ?)",
+                    (overflow,)
+                )
+                self._disk_count -= overflow
+                self.disk_evictions += overflow
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_evictions": self.memory_evictions,
+                "disk_evictions": self.disk_evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_count
+            }
@@ -1,82 +1,31 @@
 import os
-import math
-import hashlib
-from typing import List, Dict, Any, Optional
+import re
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from pinecone import Pinecone, ServerlessSpec
+from pinecone.exceptions import PineconeApiException
 from langchain.schema import Document
 
-try:
-    import numpy as np
-except Exception:
-    np = None
-
-
-class LocalVectorStore:
-    """
-    Minimal in-memory vector store with cosine similarity and metadata filtering.
-    Used as a fallback when Pinecone is unavailable.
-    """
-
-    def __init__(self, dimension: int = 768):
-        self.dimension = dimension
-        self.id_to_vector: Dict[str, List[float]] = {}
-        self.id_to_metadata: Dict[str, Dict[str, Any]] = {}
-
-    def upsert(self, vectors: List[Dict[str, Any]]):
-        for v in vectors:
-            self.id_to_vector[v['id']] = v['values']
-            self.id_to_metadata[v['id']] = v.get('metadata', {})
-
-    def _cosine(self, a: List[float], b: List[float]) -> float:
-        if np is not None:
-            va = np.array(a, dtype=float)
-            vb = np.array(b, dtype=float)
-            denom = (np.linalg.norm(va) * np.linalg.norm(vb))
-            if denom == 0:
-                return 0.0
-            return float(np.dot(va, vb) / denom)
-        # Fallback without numpy
-        dot = sum(x*y for x, y in zip(a, b))
-        norm_a = math.sqrt(sum(x*x for x in a))
-        norm_b = math.sqrt(sum(x*x for x in b))
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-        return dot / (norm_a * norm_b)
-
-    def _matches_filter(self, metadata: Dict[str, Any], filter_query: Optional[Dict[str, Any]]) -> bool:
-        if not filter_query:
-            return True
-        for key, cond in filter_query.items():
-            if not isinstance(cond, dict) or "$eq" not in cond:
-                # simple equality
-                if metadata.get(key) != cond:
-                    return False
-            else:
-                if metadata.get(key) != cond["$eq"]:
-                    return False
-        return True
-
-    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = True, filter: Optional[Dict[str, Any]] = None):
-        matches = []
-        for vid, vec in self.id_to_vector.items():
-            md = self.id_to_metadata.get(vid, {})
-            if not self._matches_filter(md, filter):
-                continue
-            score = self._cosine(vector, vec)
-            matches.append({"id": vid, "score": score, "metadata": md})
-        # Sort by score desc
-        matches.sort(key=lambda m: m["score"], reverse=True)
-        class _Result:
-            def __init__(self, matches):
-                self.matches = matches[:top_k]
-        return _Result(matches)
-
-    def delete(self, ids: List[str]):
-        for vid in ids:
-            self.id_to_vector.pop(vid, None)
-            self.id_to_metadata.pop(vid, None)
+from services.vector_store import LocalVectorStore, matches_filter
+from services.persistent_vector_store import PersistentVectorStore
+from services.embedding_cache import EmbeddingCache
+from utils.rate_limiter import TokenBucket
+
+# Pinecone caps fetch requests well below the 1000-ID delete limit
+PINECONE_FETCH_BATCH_SIZE = 100
+PINECONE_DELETE_BATCH_SIZE = 1000
+# Keeps each Pinecone upsert request under its 2MB limit (768-dim vectors plus chunk text)
+PINECONE_UPSERT_BATCH_SIZE = 100
+# Gemini accepts at most 100 texts per embed request; larger batches are split by the client
+GEMINI_EMBED_BATCH_LIMIT = 100
+# Status codes worth retrying: request timeout, rate limit and server errors
+_TRANSIENT_STATUS = re.compile(r"^\W*(408|429|5\d\d)\b")
+
 
 class EmbeddingService:
     def __init__(self):
@@ -87,6 +36,27 @@ class EmbeddingService:
         else:
             self.google_api_available = False
 
+        # Embedding request tuning: texts per batch request, batches in flight,
+        # request rate (Gemini quotas are per minute) and retries per batch
+        self.embedding_model = os.getenv("EMBEDDING_MODEL", "models/embedding-001")
+        self.embedding_batch_size = max(1, int(os.getenv("EMBEDDING_BATCH_SIZE", "100")))
+        self.embedding_concurrency = max(1, int(os.getenv("EMBEDDING_CONCURRENCY", "4")))
+        self.embedding_max_retries = max(0, int(os.getenv("EMBEDDING_MAX_RETRIES", "3")))
+        self.embedding_retry_backoff = float(os.getenv("EMBEDDING_RETRY_BACKOFF", "1.0"))
+        requests_per_minute = float(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "1500"))
+        self.rate_limiter = TokenBucket(rate=requests_per_minute / 60.0, capacity=self.embedding_concurrency)
+        self._request_executor = ThreadPoolExecutor(
+            max_workers=self.embedding_concurrency,
+            thread_name_prefix="embedding-service"
+        )
+
+        # Embedding cache; set EMBEDDING_CACHE_PATH to empty to keep it in memory only
+        self.embedding_cache = EmbeddingCache(
+            path=os.getenv("EMBEDDING_CACHE_PATH", ".cache/embedding_cache.sqlite") or None,
+            memory_items=int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "10000")),
+            max_disk_entries=int(os.getenv("EMBEDDING_CACHE_MAX_DISK_ENTRIES", "500000"))
+        )
+
         pinecone_api_key = os.getenv("PINECONE_API_KEY")
         pinecone_index_name = os.getenv("PINECONE_INDEX", "document-embeddings")
         pinecone_region = os.getenv("PINECONE_REGION", "us-west-2")
@@ -110,25 +80,121 @@ class EmbeddingService:
                 self.using_local = False
             except Exception as e:
                 print(f"⚠️ Warning: Could not initialize Pinecone: {e}")
-                self.index = LocalVectorStore(dimension=768)
+                self.index = self._create_local_store()
                 self.using_local = True
         else:
             # No Pinecone key, use local store
-            self.index = LocalVectorStore(dimension=768)
+            self.index = self._create_local_store()
             self.using_local = True
 
+    def _create_local_store(self) -> LocalVectorStore:
+        """
+        Local fallback store. VECTOR_INDEX_MODE=ivf enables approximate search,
+        VECTOR_CODEC (float32, float16, int8, pq) selects the vector encoding and
+        VECTOR_STORE_PATH makes the store persistent (memory-mapped segment + WAL).
+        """
+        ivf_lists = os.getenv("VECTOR_IVF_LISTS")
+        codec = os.getenv("VECTOR_CODEC", "float32")
+        codec_options = {}
+        if codec == "pq":
+            codec_options = {
+                "subspaces": int(os.getenv("VECTOR_PQ_SUBSPACES", "96")),
+                "train_size": int(os.getenv("VECTOR_PQ_TRAIN_SIZE", "10000")),
+                "rerank_factor": int(os.getenv("VECTOR_PQ_RERANK", "25"))
+            }
+        store_options = dict(
+            index_mode=os.getenv("VECTOR_INDEX_MODE", "flat"),
+            ivf_lists=int(ivf_lists) if ivf_lists else None,
+            ivf_probes=int(os.getenv("VECTOR_IVF_PROBES", "8")),
+            ann_min_train_size=int(os.getenv("VECTOR_ANN_MIN_TRAIN_SIZE", "20000")),
+            exact_search_threshold=int(os.getenv("VECTOR_EXACT_SEARCH_THRESHOLD", "4096")),
+            codec=codec,
+            codec_options=codec_options
+        )
+        store_path = os.getenv("VECTOR_STORE_PATH")
+        if store_path:
+            return PersistentVectorStore(
+                store_path,
+                dimension=768,
+                compact_wal_bytes=int(os.getenv("VECTOR_STORE_COMPACT_MB", "64")) * 1024 * 1024,
+                fsync=os.getenv("VECTOR_STORE_FSYNC", "false").lower() == "true",
+                **store_options
+            )
+        return LocalVectorStore(dimension=768, **store_options)
+
+    def close(self):
+        """Checkpoint a persistent local store; call on application shutdown"""
+        if isinstance(self.index, PersistentVectorStore):
+            self.index.close()
+
+    @staticmethod
+    def _is_transient_error(error: Exception) -> bool:
+        """Rate limits, timeouts and 5xx responses are retried; anything else fails at once"""
+        if isinstance(error, (TimeoutError, ConnectionError)):
+            return True
+        code = getattr(error, "code", None)
+        if isinstance(error, google_exceptions.GoogleAPICallError) and isinstance(code, int):
+            return code in (408, 429) or code >= 500
+        # Errors without a status code: fall back to the message
+        message = str(error)
+        return bool(_TRANSIENT_STATUS.match(message)) or "timed out" in message.lower()
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed one batch in a single request (at most GEMINI_EMBED_BATCH_LIMIT
+        texts, so every request takes a rate limiter token), retrying transient
+        errors with exponential backoff
+        """
+        for attempt in range(self.embedding_max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                result = genai.embed_content(model=self.embedding_model, content=texts)
+                return result['embedding']
+            except Exception as e:
+                if attempt == self.embedding_max_retries or not self._is_transient_error(e):
+                    raise
+                delay = self.embedding_retry_backoff * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay))
+
     def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts, serving repeats from the embedding cache. Cache misses are
+        sent in batch requests of embedding_batch_size texts (capped at
+        GEMINI_EMBED_BATCH_LIMIT), with up to
+        embedding_concurrency batches in flight. Raises if any batch still fails
+        after its retries rather than returning placeholder vectors.
+        """
         if not self.google_api_available:
             return [[0.1] * 768 for _ in texts]
-        try:
-            model = genai.get_model('embedding-001')
-            embeddings = []
-            for text in texts:
-                result = model.embed_content(text)
-                embeddings.append(result['embedding'])
+        if not texts:
+            return []
+        embeddings = self.embedding_cache.get_many(self.embedding_model, texts)
+        # Identical texts within one call are only sent once
+        pending: Dict[str, List[int]] = {}
+        for i, (text, embedding) in enumerate(zip(texts, embeddings)):
+            if embedding is None:
+                pending.setdefault(text, []).append(i)
+        if not pending:
             return embeddings
+
+        misses = list(pending)
+        batch_size = min(self.embedding_batch_size, GEMINI_EMBED_BATCH_LIMIT)
+        batches = [misses[i:i + batch_size] for i in range(0, len(misses), batch_size)]
+        try:
+            if len(batches) == 1:
+                batch_results = [self._embed_batch(batches[0])]
+            else:
+                batch_results = list(self._request_executor.map(self._embed_batch, batches))
         except Exception as e:
-            return [[0.1] * 768 for _ in texts]
+            raise Exception(f"Error generating embeddings: {str(e)}")
+        fresh = []
+        for batch_embeddings in batch_results:
+            fresh.extend(batch_embeddings)
+        self.embedding_cache.put_many(self.embedding_model, misses, fresh)
+        for text, embedding in zip(misses, fresh):
+            for i in pending[text]:
+                embeddings[i] = embedding
+        return embeddings
 
     def store_embeddings(self, documents: List[Document], user_id: str, document_type: str = "unknown", session_id: str = None) -> Dict[str, Any]:
         """
@@ -139,37 +205,9 @@ class EmbeddingService:
         try:
             texts = [doc.page_content for doc in documents]
             embeddings = self.get_embeddings(texts)
-            vectors = []
-            for i, (doc, embedding) in enumerate(zip(documents, embeddings)):
-                vector_id = f"{user_id}_{doc.metadata['document_id']}_{doc.metadata['chunk_id']}"
-                metadata = {
-                    'user_id': user_id,
-                    'document_id': doc.metadata['document_id'],
-                    'chunk_id': doc.metadata['chunk_id'],
-                    'text': doc.page_content,
-                    'document_type': document_type,
-                    'filename': doc.metadata.get('filename', '')
-                }
-                
-                # Add session_id if provided for better isolation
-                if session_id:
-                    metadata['session_id'] = session_id
-                    vector_id = f"{session_id}_{doc.metadata['document_id']}_{doc.metadata['chunk_id']}"
-                
-                vectors.append({
-                    'id': vector_id,
-                    'values': embedding,
-                    'metadata': metadata
-                })
-            # Pinecone vs Local store API compatibility
-            if hasattr(self.index, 'upsert') and 'vectors' in self.index.upsert.__code__.co_varnames:
-                # Likely Pinecone client
-                self.index.upsert(vectors=vectors)
-            else:
-                # Our LocalVectorStore
-                self.index.upsert(vectors)
+            vectors_stored = self.upsert_embeddings(documents, embeddings, user_id, document_type, session_id)
             return {
-                "vectors_stored": len(vectors),
+                "vectors_stored": vectors_stored,
                 "document_id": documents[0].metadata["document_id"],
                 "document_type": document_type,
                 "session_id": session_id
@@ -177,53 +215,262 @@ class EmbeddingService:
         except Exception as e:
             raise Exception(f"Error storing embeddings: {str(e)}")
 
+    def store_embeddings_bulk(self, documents: List[Tuple[List[Document], str]], user_id: str,
+                              session_id: str = None) -> List[int]:
+        """
+        Store the chunks of several documents at once, given as (chunks,
+        document_type) pairs. All texts go through one get_embeddings call, so
+        small documents share embedding batches, and all vectors are written
+        in one upsert. Returns the number of vectors stored per document.
+        """
+        if not self.index:
+            raise Exception("Vector store not initialized")
+        try:
+            documents = [(list(chunks), document_type) for chunks, document_type in documents]
+            embeddings = self.get_embeddings([chunk.page_content for chunks, _ in documents for chunk in chunks])
+            vectors = []
+            position = 0
+            for chunks, document_type in documents:
+                vectors.extend(self._build_vectors(
+                    chunks, embeddings[position:position + len(chunks)], user_id, document_type, session_id
+                ))
+                position += len(chunks)
+            self._upsert_vectors(vectors)
+            return [len(chunks) for chunks, _ in documents]
+        except Exception as e:
+            raise Exception(f"Error storing embeddings: {str(e)}")
+
+    def upsert_embeddings(self, documents: List[Document], embeddings: List[List[float]], user_id: str,
+                          document_type: str = "unknown", session_id: str = None) -> int:
+        """Upsert already-computed chunk embeddings; returns the number of vectors written"""
+        vectors = self._build_vectors(documents, embeddings, user_id, document_type, session_id)
+        self._upsert_vectors(vectors)
+        return len(vectors)
+
+    def _build_vectors(self, documents: List[Document], embeddings: List[List[float]], user_id: str,
+                       document_type: str, session_id: Optional[str]) -> List[Dict[str, Any]]:
+        vectors = []
+        for doc, embedding in zip(documents, embeddings):
+            chunk_ref = doc.metadata.get('chunk_key', doc.metadata['chunk_id'])
+            vector_id = self._vector_id(user_id, session_id, doc.metadata['document_id'], chunk_ref)
+            metadata = {
+                'user_id': user_id,
+                'document_id': doc.metadata['document_id'],
+                'chunk_id': doc.metadata['chunk_id'],
+                'text': doc.page_content,
+                'document_type': document_type,
+                'filename': doc.metadata.get('filename', '')
+            }
+            
+            # Add session_id if provided for better isolation
+            if session_id:
+                metadata['session_id'] = session_id
+            
+            vectors.append({
+                'id': vector_id,
+                'values': embedding,
+                'metadata': metadata
+            })
+        return vectors
+
+    def _upsert_vectors(self, vectors: List[Dict[str, Any]]):
+        if not vectors:
+            return
+        if self.using_local:
+            # One call: a single lock acquisition and, when persistent, one WAL record
+            self.index.upsert(vectors)
+        else:
+            # Split to stay within Pinecone's request size limit
+            for start in range(0, len(vectors), PINECONE_UPSERT_BATCH_SIZE):
+                self.index.upsert(vectors=vectors[start:start + PINECONE_UPSERT_BATCH_SIZE])
+
+    def _vector_id(self, user_id: str, session_id: Optional[str], document_id: str, chunk_ref) -> str:
+        # Chunks are identified by content key (see ChunkKeyer) so that an
+        # unchanged chunk keeps its vector across document versions
+        return f"{session_id or user_id}_{document_id}_{chunk_ref}"
+
+    def update_document_embeddings(self, chunks, user_id: str, document_type: str = "unknown",
+                                   session_id: str = None, previous_chunks=None,
+                                   previous_document_type: str = None) -> Dict[str, Any]:
+        """
+        Store a new version of a document whose previous version (previous_chunks,
+        same document_id) is already embedded. Chunks are matched by content key:
+        only new or changed chunks are embedded and upserted, and vectors of
+        chunks that no longer exist are deleted. Unchanged chunks that moved are
+        upserted again so their stored chunk_id matches the new position, and if
+        the document type changed every chunk is, so the metadata stays
+        filterable; their texts are served from the embedding cache.
+        """
+        if not self.index:
+            raise Exception("Vector store not initialized")
+        try:
+            keys = chunks.chunk_keys()
+            previous_positions = (
+                {key: i for i, key in enumerate(previous_chunks.chunk_keys())} if previous_chunks is not None else {}
+            )
+            previous_keys = set(previous_positions)
+            reusable = previous_keys if document_type == previous_document_type else set()
+            changed, moved = [], []
+            for i, (chunk, key) in enumerate(zip(chunks, keys)):
+                if key not in reusable:
+                    changed.append(chunk)
+                elif previous_positions[key] != i:
+                    moved.append(chunk)
+            stale = previous_keys.difference(keys)
+
+            if changed or moved:
+                embeddings = self.get_embeddings([chunk.page_content for chunk in changed + moved])
+                self.upsert_embeddings(changed + moved, embeddings, user_id, document_type, session_id)
+            stale_ids = [self._vector_id(user_id, session_id, chunks.document_id, key) for key in stale]
+            for start in range(0, len(stale_ids), PINECONE_DELETE_BATCH_SIZE):
+                self.index.delete(ids=stale_ids[start:start + PINECONE_DELETE_BATCH_SIZE])
+            return {
+                "vectors_stored": len(changed),
+                "vectors_deleted": len(stale),
+                "vectors_moved": len(moved),
+                "vectors_unchanged": len(keys) - len(changed),
+                "document_id": chunks.document_id,
+                "document_type": document_type,
+                "session_id": session_id
+            }
+        except Exception as e:
+            raise Exception(f"Error updating embeddings: {str(e)}")
+
+    def _build_filter(self, user_id: str, document_type: str = None, document_id: str = None,
+                      session_id: str = None) -> Dict[str, Any]:
+        """Metadata filter enforcing user, document/session and type isolation"""
+        filter_query = {"user_id": {"$eq": user_id}}
+        
+        if document_id:
+            # Search only within specific document
+            filter_query["document_id"] = {"$eq": document_id}
+        elif session_id:
+            # Search only within specific session
+            filter_query["session_id"] = {"$eq": session_id}
+        
+        if document_type:
+            filter_query["document_type"] = {"$eq": document_type}
+        return filter_query
+
+    def _format_matches(self, matches) -> List[Dict[str, Any]]:
+        results = []
+        for match in matches:
+            results.append({
+                "id": match.id,
+                "score": match.score,
+                "text": match.metadata.get('text', ''),
+                "document_id": match.metadata.get('document_id', ''),
+                "chunk_id": match.metadata.get('chunk_id', ''),
+                "document_type": match.metadata.get('document_type', 'unknown'),
+                "session_id": match.metadata.get('session_id', '')
+            })
+        return results
+
     def search_similar(self, query: str, user_id: str, top_k: int = 5, document_type: str = None, 
-                      document_id: str = None, session_id: str = None) -> List[Dict[str, Any]]:
+                      document_id: str = None, session_id: str = None,
+                      query_embedding: List[float] = None) -> List[Dict[str, Any]]:
         """
         Search for similar vectors with proper document isolation.
         - If document_id is provided, only search within that specific document
         - If session_id is provided, only search within that session
         - Otherwise, search within the user's documents
+        Pass query_embedding when the caller has already embedded the query.
         """
         if not self.index:
             raise Exception("Vector store not initialized")
         try:
-            query_embedding = self.get_embeddings([query])[0]
-            
-            # Build filter query based on provided parameters
-            filter_query = {"user_id": {"$eq": user_id}}
-            
-            if document_id:
-                # Search only within specific document
-                filter_query["document_id"] = {"$eq": document_id}
-            elif session_id:
-                # Search only within specific session
-                filter_query["session_id"] = {"$eq": session_id}
-            
-            if document_type:
-                filter_query["document_type"] = {"$eq": document_type}
-            
+            if query_embedding is None:
+                query_embedding = self.get_embeddings([query])[0]
             search_results = self.index.query(
                 vector=query_embedding,
                 top_k=top_k,
                 include_metadata=True,
-                filter=filter_query
+                filter=self._build_filter(user_id, document_type, document_id, session_id)
             )
-            results = []
-            for match in search_results.matches:
-                results.append({
-                    "id": match.id,
-                    "score": match.score,
-                    "text": match.metadata.get('text', ''),
-                    "document_id": match.metadata.get('document_id', ''),
-                    "chunk_id": match.metadata.get('chunk_id', ''),
-                    "document_type": match.metadata.get('document_type', 'unknown'),
-                    "session_id": match.metadata.get('session_id', '')
-                })
-            return results
+            return self._format_matches(search_results.matches)
+        except Exception as e:
+            raise Exception(f"Error searching embeddings: {str(e)}")
+
+    def search_similar_batch(self, queries: List[str], user_id: str, top_k: int = 5, document_type: str = None,
+                             document_id: str = None, session_id: str = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries within the same isolation scope as search_similar.
+        All queries are embedded in one batched call. The local store scores them
+        together in a single matrix-matrix product; Pinecone has no multi-vector
+        query, so its queries are issued concurrently. Returns one result list
+        per query, in order.
+        """
+        if not self.index:
+            raise Exception("Vector store not initialized")
+        if not queries:
+            return []
+        try:
+            query_embeddings = self.get_embeddings(queries)
+            filter_query = self._build_filter(user_id, document_type, document_id, session_id)
+            if self.using_local:
+                search_results = self.index.query_batch(
+                    vectors=query_embeddings,
+                    top_k=top_k,
+                    include_metadata=True,
+                    filter=filter_query
+                )
+            else:
+                search_results = list(self._request_executor.map(
+                    lambda embedding: self.index.query(
+                        vector=embedding,
+                        top_k=top_k,
+                        include_metadata=True,
+                        filter=filter_query
+                    ),
+                    query_embeddings
+                ))
+            return [self._format_matches(result.matches) for result in search_results]
         except Exception as e:
             raise Exception(f"Error searching embeddings: {str(e)}")
 
+    @staticmethod
+    def _is_filtered_delete_unsupported(error: Exception) -> bool:
+        """Pinecone's 400 for a metadata-filtered delete on a serverless/starter index"""
+        if isinstance(error, PineconeApiException):
+            # Auth, quota and server errors are never the serverless rejection
+            if error.status != 400:
+                return False
+            message = str(error.body or error).lower()
+        else:
+            # Clients that don't raise PineconeApiException (e.g. gRPC): match the message alone
+            message = str(error).lower()
+        return ("not support" in message and "delet" in message
+                and ("metadata filter" in message or "serverless" in message))
+
+    def _delete_by_filter(self, filter_query: Dict[str, Any], id_prefix: str):
+        """
+        Delete every vector matching filter_query without scanning the corpus.
+        The local store resolves the filter through its metadata index. Pinecone
+        pod indexes accept a filtered delete natively; serverless indexes reject
+        it, so we enumerate IDs by prefix and check metadata before deleting.
+        """
+        if self.using_local:
+            self.index.delete(filter=filter_query)
+            return
+        try:
+            self.index.delete(filter=filter_query)
+            return
+        except Exception as e:
+            # Anything but the serverless rejection (auth, network, quota) is a real failure
+            if not self._is_filtered_delete_unsupported(e):
+                raise
+
+        for page_ids in self.index.list(prefix=id_prefix):
+            for start in range(0, len(page_ids), PINECONE_FETCH_BATCH_SIZE):
+                batch = page_ids[start:start + PINECONE_FETCH_BATCH_SIZE]
+                fetched = self.index.fetch(ids=batch).vectors
+                vector_ids = [
+                    vid for vid, vector in fetched.items()
+                    if matches_filter(vector.metadata or {}, filter_query)
+                ]
+                if vector_ids:
+                    self.index.delete(ids=vector_ids)
+
     def delete_document_vectors(self, document_id: str, user_id: str, session_id: str = None) -> bool:
         """
         Delete vectors for a specific document and user.
@@ -238,20 +485,11 @@ class EmbeddingService:
             if session_id:
                 filter_query["session_id"] = {"$eq": session_id}
 
-            results = self.index.query(
-                vector=[0.1] * 768,
-                top_k=10000,
-                include_metadata=True,
-                filter=filter_query
-            )
-            if results.matches:
-                vector_ids = [match.id for match in results.matches]
-                if hasattr(self.index, 'delete') and 'ids' in self.index.delete.__code__.co_varnames:
-                    self.index.delete(ids=vector_ids)
-                else:
-                    self.index.delete(vector_ids)
+            # Vector IDs are "<session_id or user_id>_<document_id>_<chunk_key>"
+            self._delete_by_filter(filter_query, f"{session_id or user_id}_{document_id}_")
             return True
         except Exception as e:
+            print(f"⚠️ Warning: Could not delete vectors for document {document_id}: {e}")
             return False
 
     def delete_session_vectors(self, session_id: str, user_id: str) -> bool:
@@ -261,21 +499,12 @@ class EmbeddingService:
         if not self.index:
             return False
         try:
-            results = self.index.query(
-                vector=[0.1] * 768,
-                top_k=10000,
-                include_metadata=True,
-                filter={
-                    "session_id": {"$eq": session_id},
-                    "user_id": {"$eq": user_id}
-                }
-            )
-            if results.matches:
-                vector_ids = [match.id for match in results.matches]
-                if hasattr(self.index, 'delete') and 'ids' in self.index.delete.__code__.co_varnames:
-                    self.index.delete(ids=vector_ids)
-                else:
-                    self.index.delete(vector_ids)
+            filter_query = {
+                "session_id": {"$eq": session_id},
+                "user_id": {"$eq": user_id}
+            }
+            self._delete_by_filter(filter_query, f"{session_id}_")
             return True
         except Exception as e:
+            print(f"⚠️ Warning: Could not delete vectors for session {session_id}: {e}")
             return False
@@ -0,0 +1,173 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional
+
+
+class IngestQueueFull(Exception):
+    """Raised when the job queue already has max_pending jobs queued or running"""
+
+
+class IngestJob:
+    """
+    State of one background ingestion. The worker running the job updates it
+    through report(); readers take to_dict() snapshots while it runs.
+    """
+
+    def __init__(self, filename: str, session_id: Optional[str] = None):
+        self.job_id = str(uuid.uuid4())
+        self.filename = filename
+        self.session_id = session_id
+        self.status = "queued"  # queued -> running -> completed | failed
+        self.stage = "queued"
+        self.chunks_created = 0
+        self.chunks_embedded = 0
+        self.document_id: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.submitted_at = datetime.now()
+        self._submitted = time.perf_counter()
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def report(self, stage: str, chunks_created: int, chunks_embedded: int):
+        """Progress callback for StreamingIngestPipeline.run"""
+        self.stage = stage
+        self.chunks_created = chunks_created
+        self.chunks_embedded = chunks_embedded
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def _elapsed_ms(self, start: Optional[float], end: Optional[float]) -> Optional[float]:
+        if start is None:
+            return None
+        return round(((end or time.perf_counter()) - start) * 1000, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # chunks_created keeps growing until extraction ends, so the fraction
+        # is only meaningful from the "embedding" stage on
+        total_known = self.stage in ("embedding", "completed")
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "filename": self.filename,
+            "session_id": self.session_id,
+            "document_id": self.document_id,
+            "progress": {
+                "chunks_embedded": self.chunks_embedded,
+                "chunks_total": self.chunks_created if total_known else None,
+                "chunks_created": self.chunks_created,
+                "fraction": (self.chunks_embedded / self.chunks_created if self.chunks_created else 1.0)
+                if total_known else None
+            },
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at.isoformat(),
+            "timings": {
+                "queued_ms": self._elapsed_ms(self._submitted, self._started),
+                "run_ms": self._elapsed_ms(self._started, self._finished),
+                "total_ms": self._elapsed_ms(self._submitted, self._finished)
+            }
+        }
+
+
+class IngestJobQueue:
+    """
+    Runs document ingestion in the background so uploads return at once.
+
+    Jobs run on a fixed pool of worker threads; at most max_pending jobs may
+    be queued or running, and further submissions are rejected with
+    IngestQueueFull rather than queueing without bound. Finished jobs stay
+    readable until more than `history` newer jobs have finished. Worker
+    threads start on the first submission after construction or shutdown().
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: Optional[int] = None, history: int = 1000):
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * 8
+        self.history = history
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, job: IngestJob, work: Callable[[IngestJob], Dict[str, Any]]) -> IngestJob:
+        """
+        Queue work(job) to run in the background. work reports progress through
+        job.report and returns the result summary, which should include the
+        document_id.
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise IngestQueueFull(
+                    f"Ingestion queue is full ({self.max_pending} jobs pending). Please retry shortly."
+                )
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+            self._jobs[job.job_id] = job
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest-job")
+            executor = self._executor
+        executor.submit(self._run, job, work)
+        return job
+
+    def _run(self, job: IngestJob, work: Callable[[IngestJob], Dict[str, Any]]):
+        job._started = time.perf_counter()
+        job.status = "running"
+        job.stage = "extracting"
+        result, error = None, None
+        try:
+            result = work(job)
+        except Exception as e:
+            error = str(e)
+            print(f"❌ Ingestion job {job.job_id} ({job.filename}) failed: {e}")
+        job._finished = time.perf_counter()
+        # Publish the outcome and the counters together
+        with self._lock:
+            job.result, job.error = result, error
+            job.document_id = result.get("document_id") if result else None
+            job.status = job.stage = "failed" if error is not None else "completed"
+            self.pending -= 1
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self._evict_finished()
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "running": min(self.pending, self.max_workers),
+            "queued": max(0, self.pending - self.max_workers),
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
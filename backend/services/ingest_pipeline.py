@@ -0,0 +1,215 @@
+import time
+import uuid
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional
+
+from langchain.schema import Document as LangchainDocument
+
+from services.chunk_table import ChunkTable, ChunkKeyer
+from services.document_processor import DocumentProcessor
+
+
+class _TextSampler:
+    """Passes text pieces through while keeping the first `limit` characters"""
+
+    def __init__(self, pieces: Iterable[str], limit: int):
+        self._pieces = pieces
+        self.limit = limit
+        self._sample: List[str] = []
+        self._length = 0
+        self.exhausted = False
+
+    def __iter__(self) -> Iterator[str]:
+        for piece in self._pieces:
+            if self._length < self.limit:
+                self._sample.append(piece)
+                self._length += len(piece)
+            yield piece
+        self.exhausted = True
+
+    @property
+    def complete(self) -> bool:
+        return self.exhausted or self._length >= self.limit
+
+    @property
+    def text(self) -> str:
+        return "".join(self._sample)[:self.limit]
+
+
+class StreamingIngestPipeline:
+    """
+    Ingests a document as a stream: extract -> chunk -> embed -> upsert.
+
+    Text is pulled piece by piece (PDF pages come from worker processes as
+    they are extracted), chunked incrementally, and grouped into embedding
+    batches. Each batch is embedded on a background thread and upserted as
+    soon as its embeddings arrive, while later pages are still being parsed,
+    so the first chunks become queryable long before the document finishes.
+
+    Work in flight is bounded: at most max_inflight_batches batches are
+    being embedded at once (the pipeline waits on the oldest before
+    submitting more), and the PDF extractor keeps a fixed number of page
+    ranges in flight. The text itself is not: every piece is retained so the
+    returned ChunkTable can hold the document text once, with chunks as
+    offsets into it, so resident memory still grows with the document. The
+    document type is detected from the first type_sample_chars characters;
+    chunks produced before the sample is complete wait for it.
+    """
+
+    def __init__(self, embedding_service, document_processor: Optional[DocumentProcessor] = None,
+                 batch_size: Optional[int] = None, max_inflight_batches: Optional[int] = None,
+                 type_sample_chars: Optional[int] = None):
+        self.embedding_service = embedding_service
+        self.document_processor = document_processor or DocumentProcessor()
+        self.batch_size = batch_size or embedding_service.embedding_batch_size
+        self.max_inflight_batches = max_inflight_batches or embedding_service.embedding_concurrency
+        self.type_sample_chars = type_sample_chars or self.document_processor.type_sample_chars
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Embedding threads, started on first use (and again after shutdown)"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_inflight_batches,
+                    thread_name_prefix="ingest-pipeline"
+                )
+            return self._executor
+
+    def run(self, file_content: bytes, filename: str, file_type: str, user_id: str = "default_user",
+            session_id: str = None, source_path: Optional[str] = None,
+            progress: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Ingest one document. Returns the process_document fields, with chunks
+        as a ChunkTable, plus vectors_stored and ingest timings.
+
+        progress, if given, is called as progress(stage, chunks_created,
+        chunks_embedded): stage is "extracting" while text is still arriving
+        and "embedding" once every chunk is known.
+        """
+        started = time.perf_counter()
+        document_id = str(uuid.uuid4())
+        sampler = _TextSampler(
+            self.document_processor.iter_text(file_content, filename, file_type, source_path),
+            self.type_sample_chars
+        )
+        text_parts: List[str] = []
+        starts, ends = [], []
+        keyer = ChunkKeyer()
+        waiting = []  # chunks not yet batched (held until the type is known)
+        batch = []
+        pending = deque()
+        executor = self._get_executor()
+        document_type = None
+        stats = {"batches": 0, "vectors_stored": 0, "chunks_embedded": 0, "time_to_first_upsert_ms": None}
+        stage = "extracting"
+
+        def report():
+            if progress is not None:
+                progress(stage, len(starts), stats["chunks_embedded"])
+
+        def retain(pieces):
+            # The ChunkTable needs the whole text; join it once at the end
+            for piece in pieces:
+                text_parts.append(piece)
+                yield piece
+
+        def drain_oldest():
+            batch_chunks, future = pending.popleft()
+            embeddings = future.result()
+            stats["vectors_stored"] += self.embedding_service.upsert_embeddings(
+                batch_chunks, embeddings, user_id, document_type, session_id
+            )
+            stats["chunks_embedded"] += len(batch_chunks)
+            if stats["time_to_first_upsert_ms"] is None:
+                stats["time_to_first_upsert_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            report()
+
+        def submit(batch_chunks):
+            if len(pending) >= self.max_inflight_batches:
+                drain_oldest()
+            texts = [chunk.page_content for chunk in batch_chunks]
+            pending.append((batch_chunks, executor.submit(self.embedding_service.get_embeddings, texts)))
+            stats["batches"] += 1
+
+        try:
+            spans = self.document_processor.iter_chunk_spans(retain(sampler))
+            for chunk_id, (start, end, text) in enumerate(spans):
+                starts.append(start)
+                ends.append(end)
+                # Transient Document for embedding/upsert; the table keeps offsets only
+                waiting.append(LangchainDocument(
+                    page_content=text,
+                    metadata={
+                        "document_id": document_id,
+                        "chunk_id": chunk_id,
+                        "chunk_index": chunk_id,
+                        "chunk_key": keyer(text)
+                    }
+                ))
+                report()
+                if document_type is None:
+                    if not sampler.complete:
+                        continue
+                    document_type = self.document_processor.detect_document_type(sampler.text, filename)
+                batch.extend(waiting)
+                waiting.clear()
+                if len(batch) >= self.batch_size:
+                    submit(batch[:self.batch_size])
+                    batch = batch[self.batch_size:]
+
+            stage = "embedding"
+            report()
+            if document_type is None:
+                document_type = self.document_processor.detect_document_type(sampler.text, filename)
+            batch.extend(waiting)
+            while batch:
+                submit(batch[:self.batch_size])
+                batch = batch[self.batch_size:]
+            while pending:
+                drain_oldest()
+        except Exception as e:
+            for _, future in pending:
+                future.cancel()
+            if stats["vectors_stored"]:
+                # Do not leave a partially ingested document searchable
+                try:
+                    self.embedding_service.delete_document_vectors(document_id, user_id, session_id)
+                except Exception as cleanup_error:
+                    print(f"⚠️ Warning: Could not remove partial vectors for {document_id}: {cleanup_error}")
+            raise Exception(f"Error ingesting document: {str(e)}")
+
+        chunks = ChunkTable(document_id, "".join(text_parts), starts, ends)
+        return {
+            "document_id": document_id,
+            "filename": filename,
+            "file_type": file_type,
+            "document_type": document_type,
+            "chunks": chunks,
+            "total_chunks": len(chunks),
+            "upload_time": datetime.now(),
+            "vectors_stored": stats["vectors_stored"],
+            "ingest_stats": {
+                "batches": stats["batches"],
+                "time_to_first_upsert_ms": stats["time_to_first_upsert_ms"],
+                "total_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+        }
+
+    def run_file(self, path: str, filename: str, file_type: str, user_id: str = "default_user",
+                 session_id: str = None, progress: Optional[Callable[[str, int, int], None]] = None
+                 ) -> Dict[str, Any]:
+        """Ingest a document spooled to disk, parsing it through a memory map"""
+        with self.document_processor.map_file(path) as mapped:
+            return self.run(mapped, filename, file_type, user_id, session_id, source_path=path,
+                            progress=progress)
+
+    def shutdown(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -1,18 +1,24 @@
 import os
 import json
 import google.generativeai as genai
-from typing import List, Dict, Any
-from models.schemas import ScoreDetails
+from typing import List, Dict, Any, Optional
+from services.answer_cache import AnswerCache
 
 class LLMService:
     def __init__(self):
         api_key = os.getenv("GOOGLE_API_KEY")
+        self.model_name = 'gemini-2.5-flash'
+        # Answers for repeated (question, retrieved context) pairs
+        self.answer_cache = AnswerCache(
+            max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2048")),
+            ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+        )
         
         # Check if we have a valid API key
         if api_key and api_key != "your_google_api_key_here":
             try:
                 genai.configure(api_key=api_key)
-                self.model = genai.GenerativeModel('gemini-2.5-flash')
+                self.model = genai.GenerativeModel(self.model_name)
                 self.api_available = True
                 print("✅ Gemini API initialized successfully")
             except Exception as e:
@@ -97,13 +103,23 @@ JSON RESPONSE:
 """
         return prompt
     
-    def generate_answer(self, question: str, context_chunks: List[str], document_type: str = "unknown") -> Dict[str, Any]:
-        """Generate an answer using Gemini with structured JSON output"""
+    def generate_answer(self, question: str, context_chunks: List[str], document_type: str = "unknown",
+                        document_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Generate an answer using Gemini with structured JSON output. Answers
+        are cached per (question, context, document type); pass the IDs of the
+        documents the context came from so they can be invalidated.
+        """
         
         # If API is not available, return an error response
         if not self.api_available:
             return self._create_error_response("Gemini API not available", document_type)
         
+        cache_key = self.answer_cache.key(self.model_name, question, context_chunks, document_type)
+        cached = self.answer_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             prompt = self.create_prompt(question, context_chunks, document_type)
             
@@ -130,6 +146,7 @@ JSON RESPONSE:
                 # If JSON parsing fails, create a structured response
                 result = self._create_structured_response(response_text, question, document_type)
             
+            self.answer_cache.put(cache_key, result, document_ids or ())
             return result
             
         except Exception as e:
@@ -179,6 +196,7 @@ JSON RESPONSE:
         return {
             "answer": f"An error occurred while processing your request: {error_message}",
             "justification": "Technical error in the LLM service.",
+            "error": error_message,
             "matched_clauses": [],
             "score_details": {
                 "document_type": document_type,
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Executor
+from typing import Callable, List, Optional, Iterator
+
+import pypdf
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    # Each worker opens its own reader; pypdf parses pages lazily, so only
+    # the objects for this range are read from the shared file
+    reader = pypdf.PdfReader(path)
+    return [reader.pages[i].extract_text() for i in range(start, stop)]
+
+
+class ParallelPDFExtractor:
+    """
+    Extracts PDF page text across worker processes.
+
+    The document bytes are written once to a temp file (or an existing file
+    is passed as `path`) that every worker reads through the OS page cache, the page range is split into
+    contiguous slices (a few per worker, so slow pages even out), and the
+    per-page texts come back in page order. Documents with fewer than
+    min_pages pages are not worth the process overhead; callers should
+    extract those serially.
+
+    To share another pool's workers, pass its accessor as `get_executor`;
+    it is called on each extraction (so the pool can be created lazily or
+    recreated after a shutdown) and that pool is left running on shutdown().
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, min_pages: int = 64, ranges_per_worker: int = 4,
+                 get_executor: Optional[Callable[[], Executor]] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_pages = min_pages
+        self.ranges_per_worker = ranges_per_worker
+        self._executor: Optional[Executor] = None
+        self._get_shared_executor = get_executor
+
+    def should_parallelize(self, page_count: int) -> bool:
+        return self.max_workers > 1 and page_count >= self.min_pages
+
+    def _get_executor(self) -> Executor:
+        if self._get_shared_executor is not None:
+            return self._get_shared_executor()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    @staticmethod
+    def _spill(file_content: bytes) -> str:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(file_content)
+            return f.name
+
+    def extract_pages(self, file_content: bytes, page_count: int, path: Optional[str] = None) -> List[str]:
+        """Text of every page, in page order. Pass path if the PDF is already on disk."""
+        range_size = max(1, -(-page_count // (self.max_workers * self.ranges_per_worker)))
+        starts = range(0, page_count, range_size)
+        owns_path = path is None
+        if owns_path:
+            path = self._spill(file_content)
+        try:
+            page_ranges = self._get_executor().map(
+                _extract_page_range,
+                [path] * len(starts),
+                starts,
+                [min(start + range_size, page_count) for start in starts]
+            )
+            return [text for page_range in page_ranges for text in page_range]
+        finally:
+            if owns_path:
+                os.remove(path)
+
+    def iter_pages(self, file_content: bytes, page_count: int, pages_per_range: int = 8,
+                   path: Optional[str] = None) -> Iterator[str]:
+        """
+        Yield page texts in page order as soon as each range is extracted, with
+        at most two ranges per worker in flight, so callers can start on the
+        first pages while later ones are still being parsed.
+        """
+        owns_path = path is None
+        if owns_path:
+            path = self._spill(file_content)
+        pending = deque()
+        try:
+            executor = self._get_executor()
+            for start in range(0, page_count, pages_per_range):
+                if len(pending) >= 2 * self.max_workers:
+                    yield from pending.popleft().result()
+                pending.append(executor.submit(
+                    _extract_page_range, path, start, min(start + pages_per_range, page_count)
+                ))
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            if owns_path:
+                os.remove(path)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
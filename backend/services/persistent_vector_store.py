@@ -0,0 +1,601 @@
+import os
+import json
+import mmap
+import shutil
+import struct
+import zlib
+import hashlib
+from typing import List, Dict, Any, Optional, Hashable, Iterator, Tuple
+
+import numpy as np
+
+from services.vector_store import LocalVectorStore
+from services.vector_storage import MappedStorage
+
+# WAL record: payload length and CRC32 of the payload, then the payload
+_RECORD_HEADER = struct.Struct("<II")
+_LENGTH = struct.Struct("<I")
+_OP_UPSERT = b"U"
+_OP_DELETE = b"D"
+
+
+def _id_hash(vector_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(vector_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _encode_metadata(metadata: Dict[str, Any]) -> bytes:
+    return json.dumps(metadata, separators=(",", ":")).encode("utf-8")
+
+
+class _Blob:
+    """Read-only memory map of a file of concatenated records"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def read(self, offset: int, length: int) -> bytes:
+        return self._map[offset:offset + length]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+class _Snapshot:
+    """
+    One checkpoint directory. Arrays are memory-mapped .npy files and
+    IDs/metadata are blobs addressed by per-row (offset, length) spans, so
+    opening a snapshot reads nothing but the postings directory.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._blobs = []
+        if path is None:
+            self.id_spans = self.metadata_spans = np.empty((0, 2), dtype=np.int64)
+            self.id_hashes = np.empty(0, dtype=np.uint64)
+            self.id_hash_rows = self.postings = self.free_rows = np.empty(0, dtype=np.int64)
+            self.postings_directory: Dict[str, list] = {}
+            return
+        self.id_spans = self._array("row_ids.npy")
+        self.metadata_spans = self._array("metadata.npy")
+        self.id_hashes = self._array("id_hashes.npy")
+        self.id_hash_rows = self._array("id_hash_rows.npy")
+        self.postings = self._array("postings.npy")
+        self.free_rows = self._array("free_rows.npy")
+        self._ids = self._blob("row_ids.blob")
+        self._metadata = self._blob("metadata.blob")
+        with open(os.path.join(path, "postings.json"), "r", encoding="utf-8") as f:
+            self.postings_directory = json.load(f)
+
+    def _array(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, name), mmap_mode="r", allow_pickle=False)
+
+    def _blob(self, name: str) -> _Blob:
+        blob = _Blob(os.path.join(self.path, name))
+        self._blobs.append(blob)
+        return blob
+
+    @property
+    def rows(self) -> int:
+        return self.id_spans.shape[0]
+
+    def row_id(self, row: int) -> Optional[str]:
+        offset, length = self.id_spans[row].tolist()
+        return None if length < 0 else self._ids.read(offset, length).decode("utf-8")
+
+    def metadata_bytes(self, row: int) -> bytes:
+        offset, length = self.metadata_spans[row].tolist()
+        return self._metadata.read(offset, length)
+
+    def find_row(self, vector_id: str) -> Optional[int]:
+        """Checkpointed row of vector_id: binary search of the sorted ID hashes"""
+        target = np.uint64(_id_hash(vector_id))
+        i = int(np.searchsorted(self.id_hashes, target))
+        while i < self.id_hashes.shape[0] and self.id_hashes[i] == target:
+            row = int(self.id_hash_rows[i])
+            if self.row_id(row) == vector_id:
+                return row
+            i += 1
+        return None
+
+    def close(self):
+        for blob in self._blobs:
+            blob.close()
+
+
+class _RowIds:
+    """Row -> vector ID (None for a free row): the checkpoint plus rows changed since"""
+
+    def __init__(self, snapshot: _Snapshot):
+        self._snapshot = snapshot
+        self.changed: Dict[int, Optional[str]] = {}
+        self._length = snapshot.rows
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        if row in self.changed:
+            return self.changed[row]
+        if not 0 <= row < self._length:
+            raise IndexError(row)
+        return self._snapshot.row_id(row)
+
+    def __setitem__(self, row: int, vector_id: Optional[str]):
+        self.changed[row] = vector_id
+
+    def append(self, vector_id: str):
+        self.changed[self._length] = vector_id
+        self._length += 1
+
+    def live_rows(self) -> np.ndarray:
+        live = self._snapshot.id_spans[:, 1] >= 0
+        if not self.changed:
+            return np.nonzero(live)[0]
+        rows = set(np.nonzero(live)[0].tolist())
+        for row, vector_id in self.changed.items():
+            if vector_id is None:
+                rows.discard(row)
+            else:
+                rows.add(row)
+        return np.fromiter(sorted(rows), dtype=np.int64, count=len(rows))
+
+
+class _IdIndex:
+    """Vector ID -> row: the checkpoint's sorted hash table plus IDs changed since"""
+
+    def __init__(self, snapshot: _Snapshot, row_ids: _RowIds, count: int):
+        self._snapshot = snapshot
+        self._row_ids = row_ids
+        self.changed: Dict[str, Optional[int]] = {}
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, vector_id: str, default=None):
+        row = self.changed[vector_id] if vector_id in self.changed else self._snapshot.find_row(vector_id)
+        return default if row is None else row
+
+    def __contains__(self, vector_id: str) -> bool:
+        return self.get(vector_id) is not None
+
+    def __getitem__(self, vector_id: str) -> int:
+        row = self.get(vector_id)
+        if row is None:
+            raise KeyError(vector_id)
+        return row
+
+    def __setitem__(self, vector_id: str, row: int):
+        if self.get(vector_id) is None:
+            self._count += 1
+        self.changed[vector_id] = row
+
+    def pop(self, vector_id: str, default=None):
+        row = self.get(vector_id)
+        if row is None:
+            return default
+        self.changed[vector_id] = None
+        self._count -= 1
+        return row
+
+    def values(self) -> List[int]:
+        return self._row_ids.live_rows().tolist()
+
+
+class _MetadataView:
+    """Vector ID -> metadata; checkpointed metadata is decoded only when asked for"""
+
+    def __init__(self, snapshot: _Snapshot, row_ids: _RowIds, ids: _IdIndex):
+        self._snapshot = snapshot
+        self._row_ids = row_ids
+        self._ids = ids
+        self.changed: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def get(self, vector_id: str, default=None):
+        if vector_id in self.changed:
+            metadata = self.changed[vector_id]
+            return default if metadata is None else metadata
+        row = self._snapshot.find_row(vector_id)
+        if row is None:
+            return default
+        return json.loads(self._snapshot.metadata_bytes(row))
+
+    def __contains__(self, vector_id: str) -> bool:
+        return self.get(vector_id) is not None
+
+    def __getitem__(self, vector_id: str) -> Dict[str, Any]:
+        metadata = self.get(vector_id)
+        if metadata is None:
+            raise KeyError(vector_id)
+        return metadata
+
+    def __setitem__(self, vector_id: str, metadata: Dict[str, Any]):
+        self.changed[vector_id] = metadata
+
+    def pop(self, vector_id: str, default=None):
+        metadata = self.get(vector_id)
+        if metadata is None:
+            return default
+        self.changed[vector_id] = None
+        return metadata
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for row in self._row_ids.live_rows().tolist():
+            vector_id = self._row_ids[row]
+            yield vector_id, self.get(vector_id)
+
+
+class _Postings(dict):
+    """Value -> rows for one metadata field; a value's rows are read from the checkpoint on first use"""
+
+    def __init__(self, snapshot: _Snapshot, entries: list):
+        super().__init__()
+        self._snapshot = snapshot
+        # JSON has no tuples; list values were tuples when indexed
+        self._unloaded = {
+            tuple(value) if isinstance(value, list) else value: (start, count)
+            for value, start, count in entries
+        }
+
+    def _load(self, value):
+        span = self._unloaded.pop(value, None)
+        if span is not None:
+            start, count = span
+            dict.__setitem__(self, value, set(self._snapshot.postings[start:start + count].tolist()))
+
+    def get(self, value, default=None):
+        self._load(value)
+        return super().get(value, default)
+
+    def setdefault(self, value, default=None):
+        self._load(value)
+        return super().setdefault(value, default)
+
+    def __getitem__(self, value):
+        self._load(value)
+        return super().__getitem__(value)
+
+    def __contains__(self, value) -> bool:
+        return value in self._unloaded or super().__contains__(value)
+
+    def __len__(self) -> int:
+        return len(self._unloaded) + super().__len__()
+
+    def export(self) -> Iterator[Tuple[Hashable, np.ndarray]]:
+        """Every value's rows, without loading the untouched ones into sets"""
+        for value, (start, count) in self._unloaded.items():
+            yield value, self._snapshot.postings[start:start + count]
+        for value, rows in dict.items(self):
+            yield value, np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+
+def _save_state(directory: str, prefix: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    """Write the arrays of a codec/ANN state as .npy files; returns the JSON-able remainder"""
+    saved = {}
+    for key, value in state.items():
+        if isinstance(value, np.ndarray):
+            name = f"{prefix}_{key}.npy"
+            np.save(os.path.join(directory, name), np.asarray(value), allow_pickle=False)
+            saved[key] = {"array": name}
+        elif isinstance(value, np.generic):
+            saved[key] = value.item()
+        else:
+            saved[key] = value
+    return saved
+
+
+def _load_state(directory: str, saved: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: np.load(os.path.join(directory, value["array"]), allow_pickle=False)
+        if isinstance(value, dict) and "array" in value else value
+        for key, value in saved.items()
+    }
+
+
+class PersistentVectorStore(LocalVectorStore):
+    """
+    LocalVectorStore that survives restarts. Everything lives in `directory`:
+
+    - *.bin: the vector segment (codec arrays and live mask) as raw files that
+      are memory-mapped, so reopening never reads the vectors into memory
+    - checkpoint-N/: an immutable checkpoint. Row IDs and metadata (chunk
+      text included) are blobs addressed by per-row spans, vector IDs are
+      found through a sorted hash array, and the metadata index is a postings
+      array with a small JSON directory; all arrays are memory-mapped .npy
+      files. Codec and ANN state are .npy arrays plus JSON.
+    - manifest.json: which checkpoint is current, and the store's shape
+    - wal.log: append-only log of every upsert/delete since the checkpoint,
+      in a plain binary record format with a CRC per record
+
+    Opening maps the checkpoint and only decodes what queries touch: an ID
+    or metadata record when it is returned, a metadata value's rows when it
+    is filtered on. Changes since the checkpoint live in small in-memory
+    overlays. No file is ever unpickled.
+
+    Each write is appended to the WAL before it touches the segment. Once the
+    WAL grows past compact_wal_bytes, compact() flushes the segment, writes a
+    new checkpoint, switches the manifest to it and truncates the WAL. On
+    open, the WAL is replayed over the checkpoint; a torn or corrupt record
+    at the tail is discarded. Metadata must be JSON-serializable, as with
+    Pinecone. Single writer: one process per directory.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+    WAL_FILE = "wal.log"
+    FORMAT_VERSION = 2
+
+    def __init__(self, directory: str, dimension: int = 768, compact_wal_bytes: int = 64 * 1024 * 1024,
+                 fsync: bool = False, **store_options):
+        self.directory = directory
+        self.compact_wal_bytes = compact_wal_bytes
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+
+        manifest = self._read_manifest()
+        codec = store_options.get("codec", "float32")
+        if manifest is not None:
+            if manifest["dimension"] != dimension or manifest["codec"] != codec:
+                raise ValueError(
+                    f"Vector store at {directory} holds {manifest['codec']} vectors of dimension "
+                    f"{manifest['dimension']}; cannot open it as {codec}/{dimension}"
+                )
+            store_options["initial_capacity"] = manifest["capacity"]
+        super().__init__(dimension=dimension, storage=MappedStorage(directory), **store_options)
+        self._snapshot: Optional[_Snapshot] = None
+        self._open_checkpoint(manifest)
+        self._restore(manifest)
+
+        self._wal_path = os.path.join(directory, self.WAL_FILE)
+        self._replay_wal()
+        self._wal = open(self._wal_path, "ab")
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.directory, self.MANIFEST_FILE)
+        if not os.path.exists(path):
+            if os.path.exists(os.path.join(self.directory, "state.pkl")):
+                raise ValueError(
+                    f"Vector store at {self.directory} uses the old pickle checkpoint format; "
+                    "remove the directory and re-ingest to rebuild it"
+                )
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != self.FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector store format in {path}")
+        # Drop checkpoints left behind by a compaction that did not finish
+        for name in os.listdir(self.directory):
+            if name.startswith("checkpoint-") and name != manifest["checkpoint"]:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        return manifest
+
+    def _open_checkpoint(self, manifest: Optional[Dict[str, Any]]):
+        """Point the ID, metadata and index structures at a checkpoint (lazily)"""
+        previous = self._snapshot
+        snapshot = _Snapshot(os.path.join(self.directory, manifest["checkpoint"]) if manifest else None)
+        self._snapshot = snapshot
+        self._row_ids = _RowIds(snapshot)
+        self._id_to_row = _IdIndex(snapshot, self._row_ids, manifest["count"] if manifest else 0)
+        self.id_to_metadata = _MetadataView(snapshot, self._row_ids, self._id_to_row)
+        self._metadata_index = {
+            field: _Postings(snapshot, entries) for field, entries in snapshot.postings_directory.items()
+        }
+        self._free_rows = snapshot.free_rows.tolist()
+        if previous is not None:
+            previous.close()
+
+    def _restore(self, manifest: Optional[Dict[str, Any]]):
+        # The segment may hold rows written after the checkpoint; the WAL
+        # replay rewrites those, so liveness is rebuilt from checkpointed IDs.
+        self._live[:] = False
+        if manifest is None:
+            return
+        self._live[:self._snapshot.rows] = self._snapshot.id_spans[:, 1] >= 0
+        checkpoint = os.path.join(self.directory, manifest["checkpoint"])
+        self._codec.set_state(_load_state(checkpoint, manifest["codec_state"]))
+        if self._ann is not None and manifest["ann"] is not None:
+            self._ann.set_state(_load_state(checkpoint, manifest["ann"]))
+
+    def _replay_wal(self):
+        if not os.path.exists(self._wal_path):
+            return
+        valid_bytes = 0
+        with open(self._wal_path, "rb") as f:
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    break
+                length, checksum = _RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                op, entries = self._decode_record(payload)
+                if op == _OP_UPSERT:
+                    super().upsert([{"id": vid, "values": values, "metadata": md} for vid, md, values in entries])
+                else:
+                    super().delete(entries)
+                valid_bytes = f.tell()
+        if valid_bytes != os.path.getsize(self._wal_path):
+            # Drop a torn record left by a crash mid-append
+            with open(self._wal_path, "r+b") as f:
+                f.truncate(valid_bytes)
+
+    def _encode_upsert(self, vectors: List[Dict[str, Any]]) -> bytes:
+        parts = [_OP_UPSERT, _LENGTH.pack(len(vectors))]
+        for v in vectors:
+            vector_id = v['id'].encode("utf-8")
+            metadata = _encode_metadata(v.get('metadata', {}))
+            parts += [_LENGTH.pack(len(vector_id)), vector_id, _LENGTH.pack(len(metadata)), metadata,
+                      np.asarray(v['values'], dtype="<f4").tobytes()]
+        return b"".join(parts)
+
+    @staticmethod
+    def _encode_delete(ids: List[str]) -> bytes:
+        parts = [_OP_DELETE, _LENGTH.pack(len(ids))]
+        for vector_id in ids:
+            encoded = vector_id.encode("utf-8")
+            parts += [_LENGTH.pack(len(encoded)), encoded]
+        return b"".join(parts)
+
+    def _decode_record(self, payload: bytes):
+        op, offset = payload[:1], 1
+
+        def take(size: int) -> bytes:
+            nonlocal offset
+            chunk = payload[offset:offset + size]
+            offset += size
+            return chunk
+
+        def take_field() -> bytes:
+            return take(_LENGTH.unpack(take(_LENGTH.size))[0])
+
+        count = _LENGTH.unpack(take(_LENGTH.size))[0]
+        if op == _OP_DELETE:
+            return op, [take_field().decode("utf-8") for _ in range(count)]
+        entries = []
+        for _ in range(count):
+            vector_id = take_field().decode("utf-8")
+            metadata = json.loads(take_field())
+            values = np.frombuffer(take(self.dimension * 4), dtype="<f4")
+            entries.append((vector_id, metadata, values))
+        return op, entries
+
+    def _append_wal(self, payload: bytes):
+        self._wal.write(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+
+    def _maybe_compact(self):
+        if self._wal.tell() >= self.compact_wal_bytes:
+            self.compact()
+
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        if not vectors:
+            return
+        with self._lock:
+            self._append_wal(self._encode_upsert(vectors))
+            super().upsert(vectors)
+            self._maybe_compact()
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[Dict[str, Any]] = None):
+        # Log concrete IDs so replay does not depend on the metadata index
+        with self._lock:
+            ids = list(ids or [])
+            if filter:
+                ids.extend(self._row_ids[row] for row in self._candidate_rows(filter))
+            if not ids:
+                return
+            self._append_wal(self._encode_delete(ids))
+            super().delete(ids)
+            self._maybe_compact()
+
+    def compact(self):
+        """Flush the segment, write a checkpoint and truncate the WAL"""
+        with self._lock:
+            self._checkpoint()
+
+    def _write_records(self, path: str) -> None:
+        """Row ID and metadata blobs with their spans, plus the sorted ID hash table"""
+        rows = len(self._row_ids)
+        id_spans = np.full((rows, 2), -1, dtype=np.int64)
+        metadata_spans = np.full((rows, 2), -1, dtype=np.int64)
+        hashes, hash_rows = [], []
+        changed_rows, changed_metadata = self._row_ids.changed, self.id_to_metadata.changed
+        with open(os.path.join(path, "row_ids.blob"), "wb") as ids_out, \
+                open(os.path.join(path, "metadata.blob"), "wb") as metadata_out:
+            for row in range(rows):
+                vector_id = self._row_ids[row]
+                if vector_id is None:
+                    continue
+                encoded = vector_id.encode("utf-8")
+                id_spans[row] = (ids_out.tell(), len(encoded))
+                ids_out.write(encoded)
+                if row in changed_rows or vector_id in changed_metadata:
+                    record = _encode_metadata(self.id_to_metadata[vector_id])
+                else:
+                    # Untouched since the last checkpoint: copy the record as is
+                    record = self._snapshot.metadata_bytes(row)
+                metadata_spans[row] = (metadata_out.tell(), len(record))
+                metadata_out.write(record)
+                hashes.append(_id_hash(vector_id))
+                hash_rows.append(row)
+            for f in (ids_out, metadata_out):
+                f.flush()
+                os.fsync(f.fileno())
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        order = np.argsort(hashes, kind="stable")
+        np.save(os.path.join(path, "row_ids.npy"), id_spans)
+        np.save(os.path.join(path, "metadata.npy"), metadata_spans)
+        np.save(os.path.join(path, "id_hashes.npy"), hashes[order])
+        np.save(os.path.join(path, "id_hash_rows.npy"), np.asarray(hash_rows, dtype=np.int64)[order])
+
+    def _write_postings(self, path: str) -> None:
+        directory, arrays, offset = {}, [], 0
+        for field, values in self._metadata_index.items():
+            if isinstance(values, _Postings):
+                items = values.export()
+            else:
+                items = ((value, np.fromiter(rows, dtype=np.int64, count=len(rows))) for value, rows in values.items())
+            entries = []
+            for value, rows in items:
+                if len(rows) == 0:
+                    continue
+                entries.append([value, offset, len(rows)])
+                arrays.append(np.sort(np.asarray(rows, dtype=np.int64)))
+                offset += len(rows)
+            directory[field] = entries
+        np.save(os.path.join(path, "postings.npy"),
+                np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64))
+        with open(os.path.join(path, "postings.json"), "w", encoding="utf-8") as f:
+            json.dump(directory, f, separators=(",", ":"))
+
+    def _checkpoint(self):
+        self._storage.flush()
+        previous = self._snapshot.path
+        name = f"checkpoint-{int(os.path.basename(previous or 'checkpoint-0').split('-')[1]) + 1:06d}"
+        path = os.path.join(self.directory, name)
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        self._write_records(tmp_path)
+        self._write_postings(tmp_path)
+        np.save(os.path.join(tmp_path, "free_rows.npy"), np.asarray(self._free_rows, dtype=np.int64))
+        manifest = {
+            "version": self.FORMAT_VERSION,
+            "dimension": self.dimension,
+            "codec": self._codec.name,
+            "capacity": self._codec.capacity,
+            "checkpoint": name,
+            "count": len(self._id_to_row),
+            "codec_state": _save_state(tmp_path, "codec", self._codec.get_state()),
+            "ann": _save_state(tmp_path, "ann", self._ann.get_state())
+            if self._ann is not None and self._ann.is_trained else None
+        }
+        os.replace(tmp_path, path)
+
+        manifest_path = os.path.join(self.directory, self.MANIFEST_FILE)
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(manifest_path + ".tmp", manifest_path)
+        self._wal.truncate(0)
+        self._wal.seek(0)
+
+        self._open_checkpoint(manifest)
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+
+    def close(self):
+        self.compact()
+        self._wal.close()
+        self._snapshot.close()
+        self._storage.close()
@@ -0,0 +1,126 @@
+import os
+import asyncio
+import multiprocessing
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional
+
+# Per-process DocumentProcessor, created on first use inside each worker
+_worker_processor = None
+
+
+def _get_worker_processor():
+    global _worker_processor
+    if _worker_processor is None:
+        from services.document_processor import DocumentProcessor
+        from services.pdf_extractor import ParallelPDFExtractor
+        # The worker is already one of a pool: extract serially rather than
+        # spawning a nested pool per worker
+        _worker_processor = DocumentProcessor(pdf_extractor=ParallelPDFExtractor(max_workers=1))
+    return _worker_processor
+
+
+def _process_document_in_worker(file_content: bytes, filename: str, file_type: str,
+                                document_id: Optional[str] = None) -> Dict[str, Any]:
+    return _get_worker_processor().process_document(file_content, filename, file_type, document_id)
+
+
+def _process_file_in_worker(path: str, filename: str, file_type: str,
+                            document_id: Optional[str] = None) -> Dict[str, Any]:
+    return _get_worker_processor().process_file(path, filename, file_type, document_id)
+
+
+class ProcessingQueueFull(Exception):
+    """Raised when the processing pool already has max_queue documents in flight"""
+
+
+class DocumentProcessingPool:
+    """
+    Runs CPU-bound document processing (extraction, type detection, chunking)
+    in worker processes so it never blocks the event loop.
+
+    At most max_queue documents may be in flight (running or waiting for a
+    worker); further submissions are rejected with ProcessingQueueFull instead
+    of queueing without bound. Workers are spawned lazily, and spawned rather
+    than forked so they do not inherit gRPC/thread state from the server.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue or self.max_workers * 4
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """The worker pool, created on first use; callers may submit their own CPU-bound tasks"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Count a document against the queue bound for the duration of the block,
+        raising ProcessingQueueFull if the pool is already at max_queue.
+        """
+        if self.in_flight >= self.max_queue:
+            self.rejected += 1
+            raise ProcessingQueueFull(
+                f"Document processing queue is full ({self.max_queue} documents in flight). Please retry shortly."
+            )
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+            self.completed += 1
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def process_document(self, file_content: bytes, filename: str, file_type: str,
+                               document_id: Optional[str] = None) -> Dict[str, Any]:
+        """Process a document in a worker process; same result as DocumentProcessor.process_document"""
+        async with self.admit():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.get_executor(), _process_document_in_worker, file_content, filename, file_type, document_id
+            )
+
+    async def process_file(self, path: str, filename: str, file_type: str,
+                           document_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process a document spooled to disk. Only the path crosses the process
+        boundary; the worker memory-maps the file instead of unpickling a copy.
+        """
+        async with self.admit():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.get_executor(), _process_file_in_worker, path, filename, file_type, document_id
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "running": min(self.in_flight, self.max_workers),
+            "queued": max(0, self.in_flight - self.max_workers),
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
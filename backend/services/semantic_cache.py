@@ -0,0 +1,186 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class _ScopeIndex:
+    """Question embeddings of one scope: a small matrix scanned with one dot product"""
+
+    def __init__(self):
+        self.vectors: Optional[np.ndarray] = None
+        self.entries: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def search(self, q: np.ndarray) -> Tuple[int, float]:
+        """Best row and its score, or (-1, -inf) when the index is empty"""
+        if not self.entries:
+            return -1, float("-inf")
+        scores = self.vectors[:len(self.entries)] @ q
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+    def expired_rows(self, cutoff: float) -> List[int]:
+        return [row for row, entry in enumerate(self.entries) if entry["created_at"] <= cutoff]
+
+    def add(self, q: np.ndarray, entry: Dict[str, Any]):
+        rows = len(self.entries)
+        if self.vectors is None:
+            self.vectors = np.empty((8, q.shape[0]), dtype=np.float32)
+        elif rows == self.vectors.shape[0]:
+            self.vectors = np.concatenate([self.vectors, np.empty_like(self.vectors)])
+        self.vectors[rows] = q
+        self.entries.append(entry)
+
+    def remove(self, row: int) -> Dict[str, Any]:
+        """Swap-remove: the last row takes the removed row's place"""
+        last = len(self.entries) - 1
+        entry = self.entries[row]
+        self.vectors[row] = self.vectors[last]
+        self.entries[row] = self.entries[last]
+        self.entries.pop()
+        return entry
+
+    def least_recently_used(self) -> int:
+        return min(range(len(self.entries)), key=lambda row: self.entries[row]["used_at"])
+
+
+class SemanticAnswerCache:
+    """
+    Serves a previous answer when a new question is a paraphrase of one
+    already answered in the same scope (session or document, plus document
+    type): the cosine similarity of the question embeddings must reach
+    threshold. Each scope keeps its own small vector index, searched
+    exactly; scopes are evicted least recently used first and the whole
+    cache holds at most max_entries answers (max_entries_per_scope each).
+
+    Unlike the exact AnswerCache this skips retrieval, so anything that
+    changes what a scope would retrieve must invalidate it: new documents
+    in a session (invalidate_session) and deleted or re-embedded documents
+    (invalidate_document). Thread-safe.
+    """
+
+    def __init__(self, threshold: float = 0.9, max_entries: int = 4096,
+                 max_entries_per_scope: int = 256, ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max(0, max_entries)
+        self.max_entries_per_scope = max(1, max_entries_per_scope)
+        self.ttl_seconds = ttl_seconds
+        self._scopes: "OrderedDict[Hashable, _ScopeIndex]" = OrderedDict()
+        self._entries = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def scope(session_id: Optional[str], document_id: Optional[str], document_type: Optional[str]) -> Tuple:
+        return (session_id, document_id, document_type or "unknown")
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+        q = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        return q / norm if norm > 0 else None
+
+    def lookup(self, scope: Tuple, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Answer cached for the most similar question in scope, if similar enough"""
+        q = self._normalize(embedding)
+        with self._lock:
+            index = self._scopes.get(scope)
+            if q is None or not index:
+                self.misses += 1
+                return None
+            now = time.monotonic()
+            # Prune expired answers first so a stale best match cannot hide a fresh one
+            for row in reversed(index.expired_rows(now - self.ttl_seconds)):
+                self._remove(scope, index, row)
+                self.evictions += 1
+            row, similarity = index.search(q)
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+            entry = index.entries[row]
+            entry["used_at"] = now
+            self._scopes.move_to_end(scope)
+            self.hits += 1
+            return dict(entry["answer"])
+
+    def add(self, scope: Tuple, embedding: List[float], answer: Dict[str, Any], document_ids: Iterable[str] = ()):
+        q = self._normalize(embedding)
+        if q is None or self.max_entries == 0:
+            return
+        now = time.monotonic()
+        entry = {
+            "answer": dict(answer),
+            "document_ids": set(d for d in document_ids if d),
+            "created_at": now,
+            "used_at": now
+        }
+        with self._lock:
+            index = self._scopes.setdefault(scope, _ScopeIndex())
+            self._scopes.move_to_end(scope)
+            if len(index) >= self.max_entries_per_scope:
+                self._remove(scope, index, index.least_recently_used())
+                self.evictions += 1
+            index.add(q, entry)
+            self._entries += 1
+            while self._entries > self.max_entries:
+                oldest_scope, oldest = next(iter(self._scopes.items()))
+                self._remove(oldest_scope, oldest, oldest.least_recently_used())
+                self.evictions += 1
+
+    def invalidate_document(self, document_id: str) -> int:
+        """Drop answers whose context came from, or whose scope is, document_id"""
+        with self._lock:
+            removed = 0
+            for scope, index in list(self._scopes.items()):
+                if scope[1] == document_id:
+                    removed += self._drop_scope(scope)
+                    continue
+                for row in reversed(range(len(index))):
+                    if document_id in index.entries[row]["document_ids"]:
+                        self._remove(scope, index, row)
+                        removed += 1
+            self.invalidations += removed
+            return removed
+
+    def invalidate_session(self, session_id: Optional[str]) -> int:
+        """Drop every session-scoped answer for session_id (its documents changed)"""
+        with self._lock:
+            removed = sum(
+                self._drop_scope(scope) for scope in list(self._scopes)
+                if scope[0] == session_id and scope[1] is None
+            )
+            self.invalidations += removed
+            return removed
+
+    def _drop_scope(self, scope: Tuple) -> int:
+        count = len(self._scopes.pop(scope))
+        self._entries -= count
+        return count
+
+    def _remove(self, scope: Tuple, index: _ScopeIndex, row: int):
+        index.remove(row)
+        self._entries -= 1
+        if not index:
+            del self._scopes[scope]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._entries,
+            "scopes": len(self._scopes),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
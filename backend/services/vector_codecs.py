@@ -0,0 +1,326 @@
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any
+
+import numpy as np
+
+from services.vector_storage import MemoryStorage
+
+
+class VectorCodec(ABC):
+    """
+    Row storage for LocalVectorStore. Holds L2-normalized vectors for rows
+    0..capacity-1 in some encoding and scores them against a normalized query.
+    Arrays come from a storage backend (in memory, or memory-mapped files for
+    the persistent store).
+    """
+
+    name = "base"
+    # Candidates kept per requested result for an exact re-rank (0 = no re-rank)
+    rerank_factor = 0
+
+    def __init__(self, dimension: int, capacity: int, storage=None):
+        self.dimension = dimension
+        self.capacity = capacity
+        self.storage = storage or MemoryStorage()
+
+    @abstractmethod
+    def resize(self, capacity: int):
+        """Grow storage to capacity rows, keeping existing rows"""
+
+    @abstractmethod
+    def encode(self, rows: np.ndarray, vectors: np.ndarray):
+        """Store normalized vectors at the given rows"""
+
+    @abstractmethod
+    def decode(self, rows: np.ndarray) -> np.ndarray:
+        """Float32 (approximate, unless the codec is lossless) vectors for rows"""
+
+    @abstractmethod
+    def score(self, query: np.ndarray, rows: Optional[np.ndarray] = None, used: int = 0) -> np.ndarray:
+        """Scores for the given rows, or for rows 0..used-1 when rows is None"""
+
+    def score_many(self, queries: np.ndarray, rows: Optional[np.ndarray] = None, used: int = 0) -> np.ndarray:
+        """Score matrix of shape (candidates, queries)"""
+        return np.stack([self.score(q, rows, used) for q in queries], axis=1)
+
+    def exact_score(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        return self.score(query, rows)
+
+    @property
+    @abstractmethod
+    def nbytes(self) -> int:
+        """Resident bytes of the encoded vectors"""
+
+    @property
+    def spill_nbytes(self) -> int:
+        """Bytes kept in memory-mapped spill files, paged in only on access"""
+        return 0
+
+    def get_state(self) -> Dict[str, Any]:
+        """Small non-array state (e.g. trained codebooks) for persistence"""
+        return {}
+
+    def set_state(self, state: Dict[str, Any]):
+        pass
+
+
+class Float32Codec(VectorCodec):
+    """Lossless float32 matrix; scoring is a single BLAS matrix-vector product"""
+
+    name = "float32"
+
+    def __init__(self, dimension: int, capacity: int, storage=None):
+        super().__init__(dimension, capacity, storage)
+        self.matrix = self.storage.array("float32_matrix", (capacity, dimension), np.float32)
+
+    def resize(self, capacity: int):
+        self.matrix = self.storage.array("float32_matrix", (capacity, self.dimension), np.float32)
+        self.capacity = capacity
+
+    def encode(self, rows: np.ndarray, vectors: np.ndarray):
+        self.matrix[rows] = vectors
+
+    def decode(self, rows: np.ndarray) -> np.ndarray:
+        return self.matrix[rows]
+
+    def score(self, query: np.ndarray, rows: Optional[np.ndarray] = None, used: int = 0) -> np.ndarray:
+        if rows is None:
+            return self.matrix[:used] @ query
+        return self.matrix[rows] @ query
+
+    def score_many(self, queries: np.ndarray, rows: Optional[np.ndarray] = None, used: int = 0) -> np.ndarray:
+        return self.score(queries.T, rows, used)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+
+class _BlockwiseCodec(VectorCodec):
+    """Codecs scored by decoding fixed-size row blocks to float32 on the fly"""
+
+    block_size = 2048
+
+    @abstractmethod
+    def _decode_block(self, rows) -> np.ndarray:
+        """Float32 vectors for a slice or array of rows"""
+
+    def decode(self, rows: np.ndarray) -> np.ndarray:
+        return self._decode_block(rows)
+
+    def score(self, query: np.ndarray, rows: Optional[np.ndarray] = None, used: int = 0) -> np.ndarray:
+        count = used if rows is None else rows.shape[0]
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, self.block_size):
+            stop = min(start + self.block_size, count)
+            block = slice(start, stop) if rows is None else rows[start:stop]
+            scores[start:stop] = self._decode_block(block) @ query
+        return scores
+
+    def score_many(self, queries: np.ndarray, rows: Optional[np.ndarray] = None, used: int = 0) -> np.ndarray:
+        # Decode each block once for all queries
+        count = used if rows is None else rows.shape[0]
+        scores = np.empty((count, queries.shape[0]), dtype=np.float32)
+        for start in range(0, count, self.block_size):
+            stop = min(start + self.block_size, count)
+            block = slice(start, stop) if rows is None else rows[start:stop]
+            scores[start:stop] = self._decode_block(block) @ queries.T
+        return scores
+
+
+class Float16Codec(_BlockwiseCodec):
+    """
+    Half-precision matrix: 2 bytes per dimension, scores within ~1e-3. NumPy has
+    no half-precision BLAS, so scoring converts blocks and is slower than int8.
+    """
+
+    name = "float16"
+
+    def __init__(self, dimension: int, capacity: int, storage=None):
+        super().__init__(dimension, capacity, storage)
+        self.matrix = self.storage.array("float16_matrix", (capacity, dimension), np.float16)
+
+    def resize(self, capacity: int):
+        self.matrix = self.storage.array("float16_matrix", (capacity, self.dimension), np.float16)
+        self.capacity = capacity
+
+    def encode(self, rows: np.ndarray, vectors: np.ndarray):
+        self.matrix[rows] = vectors.astype(np.float16)
+
+    def _decode_block(self, rows) -> np.ndarray:
+        return self.matrix[rows].astype(np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+
+class Int8Codec(_BlockwiseCodec):
+    """Per-vector scaled int8: 1 byte per dimension plus one float32 scale"""
+
+    name = "int8"
+
+    def __init__(self, dimension: int, capacity: int, storage=None):
+        super().__init__(dimension, capacity, storage)
+        self.resize(capacity)
+
+    def resize(self, capacity: int):
+        self.codes = self.storage.array("int8_codes", (capacity, self.dimension), np.int8)
+        self.scales = self.storage.array("int8_scales", (capacity,), np.float32)
+        self.capacity = capacity
+
+    def encode(self, rows: np.ndarray, vectors: np.ndarray):
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        self.codes[rows] = np.rint(vectors / scales[:, None]).astype(np.int8)
+        self.scales[rows] = scales
+
+    def _decode_block(self, rows) -> np.ndarray:
+        return self.codes[rows].astype(np.float32) * self.scales[rows][:, None]
+
+    def score(self, query: np.ndarray, rows: Optional[np.ndarray] = None, used: int = 0) -> np.ndarray:
+        count = used if rows is None else rows.shape[0]
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, self.block_size):
+            stop = min(start + self.block_size, count)
+            block = slice(start, stop) if rows is None else rows[start:stop]
+            # Apply the per-row scale after the dot product instead of per element
+            scores[start:stop] = (self.codes[block].astype(np.float32) @ query) * self.scales[block]
+        return scores
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+
+class PQCodec(VectorCodec):
+    """
+    Product quantization: each vector is split into `subspaces` sub-vectors, each
+    stored as a 1-byte index into a 256-entry codebook trained with k-means.
+    Queries are scored with per-subspace lookup tables, then the best
+    rerank_factor * top_k candidates are re-scored exactly.
+
+    Exact vectors live in a float32 memory-mapped spill file, so only the codes
+    stay resident; the OS pages in just the rows touched by re-ranking. Until
+    train_size vectors have been stored, scoring falls back to the exact vectors.
+    """
+
+    name = "pq"
+    block_size = 65536
+
+    def __init__(self, dimension: int, capacity: int, storage=None, subspaces: int = 96, train_size: int = 10000,
+                 rerank_factor: int = 25, kmeans_iterations: int = 8, seed: int = 0):
+        super().__init__(dimension, capacity, storage)
+        if dimension % subspaces != 0:
+            raise ValueError(f"PQ subspaces ({subspaces}) must divide the dimension ({dimension})")
+        self.subspaces = subspaces
+        self.sub_dimension = dimension // subspaces
+        self.train_size = max(256, train_size)
+        self.rerank_factor = max(1, rerank_factor)
+        self.kmeans_iterations = kmeans_iterations
+        self.codebooks: Optional[np.ndarray] = None  # (subspaces, 256, sub_dimension)
+        self._rng = np.random.default_rng(seed)
+        self._high_water = 0
+        self.resize(capacity)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.codebooks is not None
+
+    def resize(self, capacity: int):
+        self.codes = self.storage.array("pq_codes", (capacity, self.subspaces), np.uint8)
+        self.exact = self.storage.spill_array("pq_exact", (capacity, self.dimension), np.float32)
+        self.capacity = capacity
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"codebooks": self.codebooks, "high_water": self._high_water}
+
+    def set_state(self, state: Dict[str, Any]):
+        self.codebooks = state.get("codebooks")
+        self._high_water = state.get("high_water", 0)
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(vectors.shape[0], self.subspaces, self.sub_dimension)
+
+    def _quantize(self, vectors: np.ndarray) -> np.ndarray:
+        subs = self._split(vectors)
+        codes = np.empty((vectors.shape[0], self.subspaces), dtype=np.uint8)
+        for j in range(self.subspaces):
+            book = self.codebooks[j]
+            # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+            codes[:, j] = np.argmax(subs[:, j] @ book.T - 0.5 * np.einsum("ij,ij->i", book, book), axis=1)
+        return codes
+
+    def _train(self):
+        count = self._high_water
+        sample_rows = np.sort(self._rng.choice(count, min(count, self.train_size), replace=False))
+        subs = self._split(np.asarray(self.exact[sample_rows]))
+        self.codebooks = np.empty((self.subspaces, 256, self.sub_dimension), dtype=np.float32)
+        for j in range(self.subspaces):
+            data = subs[:, j]
+            book = data[self._rng.choice(data.shape[0], 256, replace=False)].copy()
+            for _ in range(self.kmeans_iterations):
+                assignments = np.argmax(data @ book.T - 0.5 * np.einsum("ij,ij->i", book, book), axis=1)
+                counts = np.bincount(assignments, minlength=256).astype(np.float32)
+                sums = np.zeros_like(book)
+                np.add.at(sums, assignments, data)
+                occupied = counts > 0
+                book[occupied] = sums[occupied] / counts[occupied, None]
+            self.codebooks[j] = book
+        for start in range(0, count, self.block_size):
+            stop = min(start + self.block_size, count)
+            self.codes[start:stop] = self._quantize(np.asarray(self.exact[start:stop]))
+
+    def encode(self, rows: np.ndarray, vectors: np.ndarray):
+        self.exact[rows] = vectors
+        self._high_water = max(self._high_water, int(rows.max()) + 1)
+        if self.is_trained:
+            self.codes[rows] = self._quantize(vectors)
+        elif self._high_water >= self.train_size:
+            self._train()
+
+    def decode(self, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(self.exact[rows])
+
+    def score(self, query: np.ndarray, rows: Optional[np.ndarray] = None, used: int = 0) -> np.ndarray:
+        if not self.is_trained:
+            return np.asarray(self.exact[:used] if rows is None else self.exact[rows]) @ query
+        # Lookup table of sub-query . centroid for every subspace and code
+        table = np.einsum("jd,jkd->jk", self._split(query[None, :])[0], self.codebooks)
+        subspace_index = np.arange(self.subspaces)
+        count = used if rows is None else rows.shape[0]
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, self.block_size):
+            stop = min(start + self.block_size, count)
+            codes = self.codes[start:stop] if rows is None else self.codes[rows[start:stop]]
+            scores[start:stop] = table[subspace_index, codes].sum(axis=1)
+        return scores
+
+    def exact_score(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(self.exact[rows]) @ query
+
+    @property
+    def nbytes(self) -> int:
+        codebooks = self.codebooks.nbytes if self.codebooks is not None else 0
+        return self.codes.nbytes + codebooks
+
+    @property
+    def spill_nbytes(self) -> int:
+        return self.exact.nbytes
+
+
+CODECS = {
+    "float32": Float32Codec,
+    "float16": Float16Codec,
+    "int8": Int8Codec,
+    "pq": PQCodec
+}
+
+
+def create_codec(name: str, dimension: int, capacity: int, storage=None, **options) -> VectorCodec:
+    """Instantiate a codec by name; options are only passed to codecs that take them"""
+    if name not in CODECS:
+        raise ValueError(f"Unsupported vector codec: {name}. Choose from: {', '.join(CODECS)}")
+    if name == "pq":
+        return PQCodec(dimension, capacity, storage, **options)
+    return CODECS[name](dimension, capacity, storage)
@@ -0,0 +1,90 @@
+import os
+import tempfile
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+class MemoryStorage:
+    """
+    Named, growable arrays held in process memory. Spill arrays (data that is
+    only read occasionally, like PQ re-rank vectors) go to an anonymous
+    memory-mapped temp file instead.
+    """
+
+    def __init__(self):
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._spill_files = {}
+
+    def array(self, name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        """Array `name` with the given shape, keeping any rows it already held"""
+        existing = self._arrays.get(name)
+        if existing is not None and existing.shape == tuple(shape):
+            return existing
+        array = np.zeros(shape, dtype=dtype)
+        if existing is not None:
+            rows = min(existing.shape[0], array.shape[0])
+            array[:rows] = existing[:rows]
+        self._arrays[name] = array
+        return array
+
+    def spill_array(self, name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        spill = self._spill_files.get(name)
+        if spill is None:
+            spill = tempfile.TemporaryFile()
+            self._spill_files[name] = spill
+        return _map_file(spill, shape, dtype)
+
+    def flush(self):
+        pass
+
+
+class MappedStorage:
+    """
+    Named arrays backed by raw files in `directory`, memory-mapped read/write.
+    Growing an array extends its file in place, so existing rows are never
+    copied and reopening the store does not read the data into memory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._files = {}
+        self._arrays: Dict[str, np.memmap] = {}
+
+    def array(self, name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        existing = self._arrays.get(name)
+        if existing is not None and existing.shape == tuple(shape):
+            return existing
+        if existing is not None:
+            existing.flush()
+        handle = self._files.get(name)
+        if handle is None:
+            path = os.path.join(self.directory, f"{name}.bin")
+            handle = open(path, "r+b" if os.path.exists(path) else "w+b")
+            self._files[name] = handle
+        array = _map_file(handle, shape, dtype)
+        self._arrays[name] = array
+        return array
+
+    spill_array = array
+
+    def flush(self):
+        for array in self._arrays.values():
+            array.flush()
+
+    def close(self):
+        self.flush()
+        self._arrays.clear()
+        for handle in self._files.values():
+            handle.close()
+        self._files.clear()
+
+
+def _map_file(handle, shape: Tuple[int, ...], dtype) -> np.memmap:
+    """Memory-map an open file as an array, extending (never shrinking) the file"""
+    nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    handle.seek(0, os.SEEK_END)
+    if handle.tell() < nbytes:
+        handle.truncate(nbytes)
+    return np.memmap(handle, dtype=dtype, mode="r+", shape=tuple(shape))
@@ -0,0 +1,347 @@
+import threading
+from typing import List, Dict, Any, Optional, Set, Hashable
+
+import numpy as np
+
+from services.ann_index import IVFIndex
+from services.vector_codecs import create_codec
+from services.vector_storage import MemoryStorage
+
+
+def matches_filter(metadata: Dict[str, Any], filter_query: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Pinecone-style equality filter against a metadata dict"""
+    if not filter_query:
+        return True
+    for key, cond in filter_query.items():
+        if not isinstance(cond, dict) or "$eq" not in cond:
+            # simple equality
+            if metadata.get(key) != cond:
+                return False
+        else:
+            if metadata.get(key) != cond["$eq"]:
+                return False
+    return True
+
+
+class VectorMatch:
+    """
+    Single query match. Exposes the same attribute access as Pinecone's
+    ScoredVector (match.id, match.score, match.metadata) plus dict-style access.
+    """
+
+    __slots__ = ("id", "score", "metadata")
+
+    def __init__(self, id: str, score: float, metadata: Dict[str, Any]):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, key)
+
+
+class QueryResult:
+    """Query response container mirroring Pinecone's QueryResponse.matches"""
+
+    def __init__(self, matches: List[VectorMatch]):
+        self.matches = matches
+
+
+class LocalVectorStore:
+    """
+    In-memory vector store with cosine similarity and metadata filtering.
+    Used as a fallback when Pinecone is unavailable.
+
+    Vectors are L2-normalized on insert and kept in a single contiguous matrix,
+    so a query is one matrix-vector product plus an argpartition top-k. The
+    row encoding is chosen by `codec` (float32, float16, int8 or pq, see
+    services/vector_codecs.py). Rows are stable for the lifetime of a vector;
+    deleted rows are recycled.
+
+    Metadata fields are kept in an inverted index (field -> value -> rows), so
+    filtered queries only score the rows matching every equality condition.
+
+    With index_mode="ivf" an IVFIndex is trained once the store holds
+    ann_min_train_size vectors (and retrained whenever it doubles); queries whose
+    candidate set exceeds exact_search_threshold are then answered approximately
+    from the ivf_probes closest clusters. Smaller candidate sets stay exact.
+    """
+
+    # Free-text fields are never filtered on and would only bloat the index
+    NON_INDEXED_FIELDS = {"text"}
+
+    def __init__(self, dimension: int = 768, initial_capacity: int = 1024, index_mode: str = "flat",
+                 ivf_lists: Optional[int] = None, ivf_probes: int = 8, ann_min_train_size: int = 20000,
+                 exact_search_threshold: int = 4096, codec: str = "float32",
+                 codec_options: Optional[Dict[str, Any]] = None, storage=None):
+        if index_mode not in ("flat", "ivf"):
+            raise ValueError(f"Unsupported index mode: {index_mode}")
+        self.dimension = dimension
+        self.index_mode = index_mode
+        self.ann_min_train_size = max(1, ann_min_train_size)
+        self.exact_search_threshold = exact_search_threshold
+        self._ann = IVFIndex(n_lists=ivf_lists, n_probe=ivf_probes) if index_mode == "ivf" else None
+        self._storage = storage or MemoryStorage()
+        self._codec = create_codec(codec, dimension, max(initial_capacity, 1), self._storage, **(codec_options or {}))
+        self._live = self._storage.array("live", (self._codec.capacity,), bool)
+        self._row_ids: List[Optional[str]] = []
+        self._id_to_row: Dict[str, int] = {}
+        self._free_rows: List[int] = []
+        self.id_to_metadata: Dict[str, Dict[str, Any]] = {}
+        self._metadata_index: Dict[str, Dict[Hashable, Set[int]]] = {}
+        # Writes may come from ingest threads while queries run on the event loop
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._id_to_row)
+
+    def __bool__(self) -> bool:
+        # An empty store is still an initialized store (callers test `if not self.index`)
+        return True
+
+    def _ensure_capacity(self, rows_needed: int):
+        capacity = self._codec.capacity
+        if rows_needed <= capacity:
+            return
+        new_capacity = max(rows_needed, capacity * 2)
+        self._codec.resize(new_capacity)
+        self._live = self._storage.array("live", (new_capacity,), bool)
+
+    @property
+    def codec(self) -> str:
+        return self._codec.name
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """
+        Resident bytes held by the vector encoding (metadata excluded), and
+        separately the bytes of memory-mapped spill files (PQ exact vectors)
+        """
+        capacity = max(1, self._codec.capacity)
+        return {
+            "codec": self._codec.name,
+            "vectors": len(self._id_to_row),
+            "vector_bytes": self._codec.nbytes,
+            "bytes_per_vector": self._codec.nbytes / capacity,
+            "spill_bytes": self._codec.spill_nbytes,
+            "spill_bytes_per_vector": self._codec.spill_nbytes / capacity
+        }
+
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _allocate_row(self, vector_id: str) -> int:
+        row = self._id_to_row.get(vector_id)
+        if row is not None:
+            return row
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._row_ids[row] = vector_id
+        else:
+            row = len(self._row_ids)
+            self._ensure_capacity(row + 1)
+            self._row_ids.append(vector_id)
+        self._id_to_row[vector_id] = row
+        return row
+
+    def _index_metadata(self, row: int, metadata: Dict[str, Any]):
+        for key, value in metadata.items():
+            if key in self.NON_INDEXED_FIELDS or not isinstance(value, Hashable):
+                continue
+            self._metadata_index.setdefault(key, {}).setdefault(value, set()).add(row)
+
+    def _unindex_metadata(self, row: int, metadata: Dict[str, Any]):
+        for key, value in metadata.items():
+            values = self._metadata_index.get(key)
+            if values is None or not isinstance(value, Hashable):
+                continue
+            rows = values.get(value)
+            if rows is None:
+                continue
+            rows.discard(row)
+            if not rows:
+                del values[value]
+
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        with self._lock:
+            if not vectors:
+                return
+            values = np.asarray([v['values'] for v in vectors], dtype=np.float32)
+            if values.ndim != 2 or values.shape[1] != self.dimension:
+                raise ValueError(f"Expected vectors of dimension {self.dimension}, got shape {values.shape}")
+            values = self._normalize(values)
+            rows = np.empty(len(vectors), dtype=np.int64)
+            for i, (v, normalized) in enumerate(zip(vectors, values)):
+                row = self._allocate_row(v['id'])
+                rows[i] = row
+                self._live[row] = True
+                previous = self.id_to_metadata.get(v['id'])
+                if previous is not None:
+                    self._unindex_metadata(row, previous)
+                metadata = v.get('metadata', {})
+                self.id_to_metadata[v['id']] = metadata
+                self._index_metadata(row, metadata)
+            self._codec.encode(rows, values)
+            if self._ann is not None:
+                self._update_ann(rows, values)
+
+    def _live_rows(self) -> np.ndarray:
+        return np.nonzero(self._live[:len(self._row_ids)])[0]
+
+    def _update_ann(self, rows: np.ndarray, values: np.ndarray):
+        live = len(self._id_to_row)
+        if not self._ann.is_trained:
+            if live >= self.ann_min_train_size:
+                self._ann.train(self._live_rows(), self._codec.decode)
+        elif live >= 2 * self._ann.trained_size:
+            self._ann.train(self._live_rows(), self._codec.decode)
+        else:
+            self._ann.add(rows, values)
+
+    def _matches_filter(self, metadata: Dict[str, Any], filter_query: Optional[Dict[str, Any]]) -> bool:
+        return matches_filter(metadata, filter_query)
+
+    def _candidate_rows(self, filter: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Rows eligible for scoring, or None to score every live row"""
+        if not filter:
+            return None
+        row_sets = []
+        residual = {}
+        for key, cond in filter.items():
+            value = cond["$eq"] if isinstance(cond, dict) and "$eq" in cond else cond
+            if key in self.NON_INDEXED_FIELDS or not isinstance(value, Hashable):
+                residual[key] = cond
+                continue
+            rows = self._metadata_index.get(key, {}).get(value)
+            if not rows:
+                return np.empty(0, dtype=np.int64)
+            row_sets.append(rows)
+
+        if row_sets:
+            row_sets.sort(key=len)
+            candidates = row_sets[0].intersection(*row_sets[1:])
+        else:
+            candidates = self._id_to_row.values()
+        if residual:
+            candidates = [
+                row for row in candidates
+                if self._matches_filter(self.id_to_metadata[self._row_ids[row]], residual)
+            ]
+        return np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+
+    def _top_k(self, scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Positions of the top_k highest scores, best first"""
+        k = min(top_k, scores.shape[0])
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.shape[0])
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def _search(self, q: np.ndarray, top_k: int, rows: Optional[np.ndarray]):
+        """Rows and scores of the best top_k candidates for a normalized query"""
+        candidate_count = len(self._id_to_row) if rows is None else rows.size
+        if self._use_ann(candidate_count):
+            ann_rows = self._ann.search_rows(q)
+            if rows is not None:
+                ann_rows = np.intersect1d(ann_rows, rows, assume_unique=True)
+            # Too few probed hits inside the filter: answer exactly instead
+            if ann_rows.size >= top_k or rows is None:
+                rows = ann_rows
+
+        if rows is None:
+            used = len(self._row_ids)
+            scores = self._codec.score(q, used=used)
+            scores[~self._live[:used]] = -np.inf
+            rows = np.arange(used)
+        else:
+            scores = self._codec.score(q, rows)
+        return self._select(q, rows, scores, top_k)
+
+    def _use_ann(self, candidate_count: int) -> bool:
+        return (self._ann is not None and self._ann.is_trained
+                and candidate_count > self.exact_search_threshold)
+
+    def _select(self, q: np.ndarray, rows: np.ndarray, scores: np.ndarray, top_k: int):
+        """Top_k rows by score, with the codec's exact re-rank if it has one"""
+        top_k = min(top_k, len(self._id_to_row))
+        if self._codec.rerank_factor:
+            # Shortlist on approximate scores, then re-score the shortlist exactly
+            top = self._top_k(scores, top_k * self._codec.rerank_factor)
+            top = top[np.isfinite(scores[top])]
+            rows = rows[top]
+            scores = self._codec.exact_score(q, rows)
+        top = self._top_k(scores, top_k)
+        top = top[np.isfinite(scores[top])]
+        return rows[top], scores[top]
+
+    def _to_result(self, rows: np.ndarray, scores: np.ndarray, include_metadata: bool) -> QueryResult:
+        matches = []
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            vid = self._row_ids[row]
+            md = self.id_to_metadata.get(vid, {}) if include_metadata else {}
+            matches.append(VectorMatch(vid, score, md))
+        return QueryResult(matches)
+
+    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = True, filter: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            if not self._id_to_row or top_k <= 0:
+                return QueryResult([])
+            q = self._normalize(np.asarray(vector, dtype=np.float32))
+            rows, scores = self._search(q, top_k, self._candidate_rows(filter))
+            return self._to_result(rows, scores, include_metadata)
+
+    def query_batch(self, vectors: List[List[float]], top_k: int = 5, include_metadata: bool = True,
+                    filter: Optional[Dict[str, Any]] = None) -> List[QueryResult]:
+        """
+        Run several queries against the same filter. Candidate rows are resolved
+        once and, for exact search, all queries are scored with one
+        matrix-matrix product.
+        """
+        with self._lock:
+            if not vectors:
+                return []
+            if not self._id_to_row or top_k <= 0:
+                return [QueryResult([]) for _ in vectors]
+            queries = self._normalize(np.asarray(vectors, dtype=np.float32))
+            rows = self._candidate_rows(filter)
+            candidate_count = len(self._id_to_row) if rows is None else rows.size
+            if self._use_ann(candidate_count):
+                return [self._to_result(*self._search(q, top_k, rows), include_metadata) for q in queries]
+
+            if rows is None:
+                used = len(self._row_ids)
+                scores = self._codec.score_many(queries, used=used)
+                scores[~self._live[:used]] = -np.inf
+                rows = np.arange(used)
+            else:
+                scores = self._codec.score_many(queries, rows)
+            return [
+                self._to_result(*self._select(q, rows, scores[:, j], top_k), include_metadata)
+                for j, q in enumerate(queries)
+            ]
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[Dict[str, Any]] = None):
+        """
+        Delete vectors by ID and/or by metadata filter. Filtered deletes are
+        resolved through the metadata index, so they cost O(vectors removed).
+        """
+        with self._lock:
+            ids = list(ids or [])
+            if filter:
+                ids.extend(self._row_ids[row] for row in self._candidate_rows(filter))
+            for vid in ids:
+                row = self._id_to_row.pop(vid, None)
+                if row is None:
+                    continue
+                self._live[row] = False
+                if self._ann is not None:
+                    self._ann.remove([row])
+                self._row_ids[row] = None
+                self._free_rows.append(row)
+                metadata = self.id_to_metadata.pop(vid, None)
+                if metadata is not None:
+                    self._unindex_metadata(row, metadata)
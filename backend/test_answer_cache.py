@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test the answer cache: keys, eviction, invalidation, and LLMService integration.
+"""
+
+import os
+import time
+
+os.environ["GOOGLE_API_KEY"] = ""
+
+from services.answer_cache import AnswerCache
+from services.llm_service import LLMService
+
+
+class CountingModel:
+    """Stands in for the Gemini model: counts calls, answers in JSON"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        text = '{"answer": "30 days", "justification": "Clause 4", "matched_clauses": [], "confidence": 0.9}'
+        return type("Response", (), {"text": text})()
+
+
+def test_answer_cache():
+    print("🧪 Testing AnswerCache...")
+    cache = AnswerCache(max_entries=2, ttl_seconds=60)
+    chunks = ["Waiting period is 30 days.", "Maternity is covered after 9 months."]
+    key = cache.key("gemini", "What is the waiting period?", chunks, "Policy Wordings")
+    assert key == cache.key("gemini", "  what is the WAITING period ", chunks, "Policy Wordings")
+    assert key != cache.key("gemini", "What is the waiting period?", chunks[::-1], "Policy Wordings")
+    assert key != cache.key("gemini", "What is the waiting period?", chunks, "Legal Documents")
+    assert key != cache.key("gemini-pro", "What is the waiting period?", chunks, "Policy Wordings")
+    print("✅ Keys normalize the question and depend on context order, type and model")
+
+    cache.put(key, {"answer": "30 days"}, ["doc-a", "doc-b"])
+    started = time.perf_counter()
+    for _ in range(1000):
+        assert cache.get(key)["answer"] == "30 days"
+    per_hit_us = (time.perf_counter() - started) * 1e6 / 1000
+    assert per_hit_us < 100, f"{per_hit_us:.1f}us per hit"
+    print(f"✅ Hits served in {per_hit_us:.1f}us")
+
+    cache.put("k2", {"answer": "b"}, ["doc-c"])
+    cache.get(key)
+    cache.put("k3", {"answer": "c"}, ["doc-c"])
+    assert cache.get("k2") is None and cache.get(key) is not None
+    assert cache.invalidate_document("doc-b") == 1 and cache.get(key) is None
+    cache.ttl_seconds = 0
+    assert cache.get("k3") is None
+    stats = cache.stats()
+    assert stats["entries"] == 0 and stats["evictions"] == 2 and stats["invalidations"] == 1
+    assert 0 < stats["hit_rate"] < 1
+    print(f"✅ LRU, TTL and per-document invalidation: {stats}")
+
+
+def test_llm_service_uses_answer_cache():
+    print("🧪 Testing LLMService answer caching...")
+    service = LLMService()
+    service.api_available, service.model = True, CountingModel()
+    chunks = ["The waiting period for pre-existing diseases is 30 days."]
+
+    first = service.generate_answer("Waiting period?", chunks, "Policy Wordings", document_ids=["doc-1"])
+    second = service.generate_answer("waiting period", chunks, "Policy Wordings", document_ids=["doc-1"])
+    assert first == second and first["answer"] == "30 days" and service.model.calls == 1
+    service.answer_cache.invalidate_document("doc-1")
+    service.generate_answer("Waiting period?", chunks, "Policy Wordings", document_ids=["doc-1"])
+    assert service.model.calls == 2
+    print("✅ Repeat question answered from the cache; invalidation forces a new call")
+
+
+if __name__ == "__main__":
+    test_answer_cache()
+    test_llm_service_uses_answer_cache()
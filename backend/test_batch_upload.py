@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test the bulk upload endpoint: parallel processing, shared embedding, per-file results.
+"""
+
+import io
+import os
+import zipfile
+
+os.environ["GOOGLE_API_KEY"] = ""
+os.environ["PINECONE_API_KEY"] = ""
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+
+from fastapi.testclient import TestClient
+
+from test_docx_extraction import _make_docx
+from test_pdf_extraction import _make_pdf
+
+
+def test_batch_upload():
+    print("🧪 Testing bulk upload...")
+    import main
+    from routers import document_router
+
+    embed_calls = []
+    get_embeddings = document_router.get_embedding_service().get_embeddings
+
+    def counting_get_embeddings(texts):
+        embed_calls.append(len(texts))
+        return get_embeddings(texts)
+
+    document_router.get_embedding_service().get_embeddings = counting_get_embeddings
+    client = TestClient(main.app)
+    report = _make_pdf([f"Blood report {i}: patient haemoglobin and diagnosis" for i in range(6)])
+    discharge = _make_pdf([f"Discharge summary {i}: treatment at hospital" for i in range(6)])
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("folder/prescription.docx", _make_docx(50))
+        zf.writestr("folder/report_copy.pdf", report)
+        zf.writestr("folder/notes.txt", b"not a document")
+        zf.writestr("__MACOSX/._report_copy.pdf", b"")
+
+    try:
+        response = client.post("/documents/upload-batch/", data={"session_id": "session_batch"}, files=[
+            ("files", ("report.pdf", report)),
+            ("files", ("discharge.pdf", discharge)),
+            ("files", ("claim.eml", b"Subject: Claim\n\nPlease process the hospital claim.\n")),
+            ("files", ("scan.png", b"\x89PNG")),
+            ("files", ("folder.zip", archive.getvalue())),
+        ])
+        assert response.status_code == 200, response.text
+        body = response.json()
+        results = {entry["filename"]: entry for entry in body["files"]}
+        assert list(results) == ["report.pdf", "discharge.pdf", "claim.eml", "scan.png",
+                                 "folder.zip/folder/prescription.docx", "folder.zip/folder/report_copy.pdf",
+                                 "folder.zip/folder/notes.txt"]
+        assert body["status"] == "partial" and body["failed"] == 2
+        assert results["scan.png"]["status"] == results["folder.zip/folder/notes.txt"]["status"] == "error"
+        copy = results["folder.zip/folder/report_copy.pdf"]
+        assert copy["duplicate"] and copy["document_id"] == results["report.pdf"]["document_id"]
+        assert body["documents_processed"] == 4
+        assert embed_calls == [body["chunks_processed"]]
+        print(f"✅ {len(results)} files: 4 processed, 1 duplicate, 2 rejected; one shared embedding call")
+
+        matches = document_router.get_embedding_service().search_similar(
+            "hospital", user_id="default_user", top_k=500, session_id="session_batch"
+        )
+        assert len(matches) == body["chunks_processed"]
+        print(f"✅ All {len(matches)} chunks searchable in the session; timings {body['timings']}")
+
+        # A batch of only duplicates still changes the session if it embeds a never-embedded upload
+        lab = _make_pdf([f"Lab report {i}: cholesterol and glucose" for i in range(3)])
+        response = client.post("/documents/upload/?session_id=session_batch", files={"file": ("lab.pdf", lab)})
+        assert response.status_code == 200, response.text
+        scope = document_router.get_semantic_cache().scope("session_batch", None, "unknown")
+        document_router.get_semantic_cache().add(scope, [1.0] * 768, {"answer": "no lab report"})
+        response = client.post("/documents/upload-batch/", data={"session_id": "session_batch"},
+                               files=[("files", ("lab.pdf", lab))])
+        assert response.status_code == 200 and response.json()["duplicates"] == 1, response.text
+        assert document_router.get_semantic_cache().lookup(scope, [1.0] * 768) is None
+        print("✅ Embedding duplicates invalidates the session's semantic cache")
+    finally:
+        document_router.get_embedding_service().get_embeddings = get_embeddings
+        document_router.close_services()
+
+
+if __name__ == "__main__":
+    test_batch_upload()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test the offset-based chunk table against LangChain Document chunks.
+"""
+
+import gc
+import random
+import tracemalloc
+
+from services.document_processor import DocumentProcessor
+
+
+def _sample_text(paragraphs: int = 300, seed: int = 3) -> str:
+    rng = random.Random(seed)
+    words = "policy covers hospitalization premium claim waiting period insured benefit the of and".split()
+    return "\n\n".join(
+        " ".join(rng.choice(words) for _ in range(rng.randint(20, 120))) for _ in range(paragraphs)
+    )
+
+
+def _allocated_bytes(build):
+    """Bytes still allocated by the object build() returns"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def test_chunk_table_matches_documents():
+    print("🧪 Testing ChunkTable...")
+    processor = DocumentProcessor()
+    text = _sample_text()
+    chunks = processor.text_splitter.split_text(text)
+    table = processor.chunk_text(text, "doc-1")
+    documents = table.to_documents()
+
+    assert len(table) == len(documents) == len(chunks)
+    for i, (view, document) in enumerate(zip(table, documents)):
+        assert view.page_content == document.page_content == chunks[i]
+        assert view.metadata == document.metadata
+        assert view.metadata["chunk_id"] == i and view.metadata["total_chunks"] == len(chunks)
+    assert table[-1].to_document().page_content == chunks[-1]
+
+    # The table retains the text itself; Documents retain a copy per chunk plus objects
+    documents_bytes = _allocated_bytes(lambda: table.to_documents())
+    table_bytes = table.nbytes()
+    assert table_bytes * 1.5 < documents_bytes
+    print(f"✅ {len(table)} chunks; retained size {documents_bytes} -> {table_bytes} bytes")
+
+
+def test_streaming_spans_index_into_text():
+    print("🧪 Testing streaming chunk spans...")
+    processor = DocumentProcessor()
+    text = _sample_text(seed=5)
+    pieces = [text[i:i + 777] for i in range(0, len(text), 777)]
+    spans = list(processor.iter_chunk_spans(pieces))
+    assert spans and all(text[start:end] == chunk for start, end, chunk in spans)
+    assert all(a[0] < b[0] for a, b in zip(spans, spans[1:]))
+    assert all(len(chunk) <= 1000 for _, _, chunk in spans)
+    print(f"✅ {len(spans)} streamed chunks map back onto the text")
+
+
+if __name__ == "__main__":
+    test_chunk_table_matches_documents()
+    test_streaming_spans_index_into_text()
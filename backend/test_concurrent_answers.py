@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test that /hackrx/run answers questions concurrently, in order, with isolated failures.
+"""
+
+import asyncio
+import os
+import time
+
+os.environ["GOOGLE_API_KEY"] = ""
+os.environ["PINECONE_API_KEY"] = ""
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+os.environ["HACKRX_ANSWER_CONCURRENCY"] = "4"
+
+
+class SlowLLM:
+    """Stands in for LLMService: a blocking 0.2s call per question"""
+
+    def generate_answer(self, question, context_chunks, document_type="unknown", document_ids=None):
+        time.sleep(0.2)
+        if "fail" in question:
+            raise RuntimeError("Gemini quota exceeded")
+        return {"answer": f"{question} -> {' '.join(context_chunks)}"}
+
+
+def test_concurrent_answers():
+    print("🧪 Testing concurrent question answering...")
+    from app.main import answer_question
+
+    questions = [f"question {i}" for i in range(7)] + ["please fail", "no context"]
+    retrieved = [[{"text": f"chunk {i}"}] for i in range(8)] + [RuntimeError("search failed")]
+    llm = SlowLLM()
+
+    async def answer_all():
+        return await asyncio.gather(*(answer_question(llm, q, chunks) for q, chunks in zip(questions, retrieved)))
+
+    started = time.perf_counter()
+    answers = asyncio.run(answer_all())
+    elapsed = time.perf_counter() - started
+
+    assert answers[:7] == [f"question {i} -> chunk {i}" for i in range(7)]
+    assert answers[7] == "Error: Gemini quota exceeded"
+    assert answers[8] == "Error: search failed"
+    # 8 LLM calls, 4 at a time: two rounds instead of eight
+    assert elapsed < 0.2 * 8 / 2, f"took {elapsed:.2f}s"
+    print(f"✅ {len(answers)} answers in order in {elapsed:.2f}s (sequential would be {0.2 * 8:.1f}s)")
+
+
+if __name__ == "__main__":
+    test_concurrent_answers()
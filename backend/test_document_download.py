@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Test streamed document downloads and /hackrx/run on the shared services.
+"""
+
+import asyncio
+import hashlib
+import os
+
+os.environ["GOOGLE_API_KEY"] = ""
+os.environ["PINECONE_API_KEY"] = ""
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+os.environ["API_KEY"] = "test-key"
+
+import httpx
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from test_pdf_extraction import _make_pdf
+from utils import http_client
+from utils.file_utils import FileUtils
+
+PDF = _make_pdf([f"Page {i}: the policy covers hospitalization up to the sum insured" for i in range(3)])
+
+
+async def _chunks():
+    yield PDF[:100]
+    yield PDF[100:]
+
+
+requests_seen = []
+# Called while a conditional GET is in flight, before its 304 is returned
+on_revalidate = []
+
+
+def _serve(request: httpx.Request) -> httpx.Response:
+    requests_seen.append(request)
+    if request.url.path == "/policy.pdf":
+        if request.headers.get("if-none-match") == '"v1"':
+            for callback in on_revalidate:
+                callback()
+            return httpx.Response(304)
+        return httpx.Response(200, content=PDF, headers={"ETag": '"v1"'})
+    if request.url.path == "/chunked.pdf":
+        # No Content-Length: the limit must be enforced while streaming
+        return httpx.Response(200, content=_chunks())
+    return httpx.Response(404)
+
+
+def test_download_to_file():
+    print("🧪 Testing streamed downloads...")
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(_serve))
+        path, content_hash, _ = await FileUtils.download_to_file(client, "https://docs.example/policy.pdf", suffix=".pdf")
+        with open(path, "rb") as f:
+            assert f.read() == PDF
+        assert content_hash == hashlib.sha256(PDF).hexdigest()
+        os.remove(path)
+        for url in ("https://docs.example/policy.pdf", "https://docs.example/chunked.pdf"):
+            try:
+                await FileUtils.download_to_file(client, url, max_bytes=len(PDF) - 1)
+                assert False, "download should exceed the limit"
+            except HTTPException as e:
+                assert e.status_code == 413
+        try:
+            await FileUtils.download_to_file(client, "https://docs.example/missing.pdf")
+            assert False, "404 should raise"
+        except httpx.HTTPStatusError:
+            pass
+        await client.aclose()
+
+    asyncio.run(run())
+    print("✅ Downloads stream to disk and stop at the size limit")
+
+
+def test_hackrx_document_cache():
+    print("🧪 Testing /hackrx/run document cache...")
+    from app.main import app, document_cache
+    from routers import document_router
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(_serve))
+    client = TestClient(app)
+    processed = []
+    process_file = document_router.get_processing_pool().process_file
+
+    async def counting_process_file(*args, **kwargs):
+        processed.append(args[1])
+        return await process_file(*args, **kwargs)
+
+    def ask(url):
+        response = client.post(
+            "/hackrx/run",
+            json={"documents": url, "questions": ["What is covered?", "What is the sum insured?"]},
+            headers={"Authorization": "Bearer test-key"}
+        )
+        assert response.status_code == 200, response.text
+        assert len(response.json()["answers"]) == 2
+
+    def stored_vectors():
+        return document_router.get_embedding_service().search_similar("hospitalization", user_id="hackrx", top_k=10)
+
+    document_router.get_processing_pool().process_file = counting_process_file
+    try:
+        requests_seen.clear()
+        ask("https://docs.example/policy.pdf?sv=2023&sig=abc")
+        ask("https://docs.example/policy.pdf?sv=2023&sig=abc")
+        assert len(requests_seen) == 1 and len(processed) == 1
+        assert document_cache.stats()["hits"] == 1 and stored_vectors()
+        print("✅ Repeat URL answered from the cache without downloading or processing")
+
+        ask("https://docs.example/policy.pdf?sv=2024&sig=def")
+        assert len(requests_seen) == 2 and len(processed) == 1
+        document_cache.revalidate_seconds = 0
+        ask("https://docs.example/policy.pdf?sv=2024&sig=def")
+        assert requests_seen[-1].headers["if-none-match"] == '"v1"' and len(processed) == 1
+        assert document_cache.stats()["documents"] == 1 and document_cache.stats()["urls"] == 2
+        print("✅ Re-signed URL matched by content hash; stale entry revalidated with a 304")
+
+        def evict_all():
+            ttl, document_cache.ttl_seconds = document_cache.ttl_seconds, 0
+            document_cache.expire()
+            document_cache.ttl_seconds = ttl
+
+        on_revalidate.append(evict_all)
+        ask("https://docs.example/policy.pdf?sv=2024&sig=def")
+        on_revalidate.clear()
+        assert "if-none-match" not in requests_seen[-1].headers and len(processed) == 2
+        assert document_cache.stats()["documents"] == 1 and stored_vectors()
+        print("✅ Entry evicted during its revalidation is downloaded and ingested again")
+
+        document_cache.max_entries = 0
+        ask("https://docs.example/chunked.pdf")
+        assert document_cache.stats()["documents"] == 0 and not stored_vectors()
+        print("✅ Evicted documents have their vectors deleted")
+    finally:
+        document_router.get_processing_pool().process_file = process_file
+        asyncio.run(http_client.close_http_client())
+        document_router.close_services()
+
+
+def test_document_cache_eviction():
+    print("🧪 Testing DocumentCache eviction...")
+    from services.document_cache import CachedDocument, DocumentCache
+
+    cache = DocumentCache(ttl_seconds=60, max_entries=3, max_bytes=250)
+    documents = [CachedDocument(f"hash{i}", f"doc{i}", f"session{i}", None, nbytes=100) for i in range(3)]
+    assert cache.add("url0", documents[0]) == [] and cache.add("url1", documents[1]) == []
+    cache.hit(cache.lookup("url0"))
+    assert cache.add("url2", documents[2]) == [documents[1]]  # over the byte budget: LRU goes
+    assert cache.lookup("url1") is None and cache.lookup("url0") is documents[0]
+    cache.acquire(documents[0])
+    cache.acquire(documents[2])
+    cache.ttl_seconds = 0
+    assert set(cache.expire()) == {documents[0], documents[2]}
+    assert cache.stats()["bytes"] == 0 and cache.stats()["evictions"] == 3
+    print("✅ LRU, memory budget and TTL eviction")
+
+    # Evicted entries are only handed back for cleanup once no request uses them
+    assert cache.release(documents[2]) == [documents[1], documents[2]]
+    assert cache.stats()["retired"] == 1
+    assert cache.release(documents[0]) == [documents[0]] and cache.stats()["retired"] == 0
+    print("✅ Vectors of evicted documents outlive the requests still answering from them")
+
+
+def test_services_built_on_first_use():
+    print("🧪 Testing lazy service construction...")
+    import subprocess
+    import sys
+
+    script = (
+        "import main, app.main\n"
+        "from routers import document_router as r\n"
+        "getters = [r.get_embedding_service, r.get_llm_service, r.get_processing_pool,\n"
+        "           r.get_ingest_pipeline, r.get_ingest_jobs, r.get_semantic_cache]\n"
+        "assert not any(g.cache_info().currsize for g in getters)\n"
+        "r.close_services()\n"
+        "assert not any(g.cache_info().currsize for g in getters)\n"
+        "assert r.get_ingest_pipeline().embedding_service is r.get_embedding_service()\n"
+        "r.close_services()\n"
+    )
+    done = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                          capture_output=True, text=True, timeout=120)
+    assert done.returncode == 0, done.stderr
+    print("✅ Importing both entry points builds no services; getters share one instance each")
+
+
+if __name__ == "__main__":
+    test_download_to_file()
+    test_hackrx_document_cache()
+    test_document_cache_eviction()
+    test_services_built_on_first_use()
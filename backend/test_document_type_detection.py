@@ -3,7 +3,10 @@
 Test script to verify document type detection functionality
 """
 
-from services.document_processor import DocumentProcessor
+import random
+
+from services.document_processor import DocumentProcessor, DOCUMENT_TYPE_KEYWORDS
+from utils.keyword_matcher import KeywordMatcher
 
 def test_document_type_detection():
     """Test automatic document type detection"""
@@ -59,5 +62,36 @@ def test_document_type_detection():
     print("\n" + "=" * 50)
     print("🎯 Document Type Detection Test Completed!")
 
+def test_keyword_matcher_matches_substring_scan():
+    """The single-pass matcher must agree with `keyword in text.lower()`"""
+    print("🧪 Testing KeywordMatcher against substring scans")
+    matcher = KeywordMatcher(DOCUMENT_TYPE_KEYWORDS)
+    # Small blocks so keywords straddle block boundaries
+    matcher.BLOCK_CHARS = 37
+    keywords = sorted({k for category in DOCUMENT_TYPE_KEYWORDS.values() for k in category})
+    fragments = keywords + ["holder", "Income", "POLICY", "lawn", "flaw", "tax", " ", "\n", "xyz", "medic"]
+    rng = random.Random(7)
+    for _ in range(300):
+        text = "".join(rng.choice(fragments) for _ in range(rng.randint(0, 60)))
+        max_chars = rng.choice([None, rng.randint(0, len(text) + 5)])
+        bounded = text if max_chars is None else text[:max_chars]
+        expected = {k for k in keywords if k in bounded.lower()}
+        assert matcher.find(text, max_chars) == expected, (text, max_chars)
+    print("✅ KeywordMatcher matches substring scans on 300 random texts")
+
+def test_process_document_samples_type():
+    """process_document classifies from the same bounded prefix as the streaming pipeline"""
+    print("🧪 Testing document type sample limit")
+    processor = DocumentProcessor()
+    processor.type_sample_chars = 2000
+    clinical = "Patient diagnosis and treatment plan, medication prescribed by the physician. "
+    late = ("Subject: Notes\r\n\r\n" + "Lorem ipsum dolor sit amet. " * 100 + clinical).encode()
+    early = ("Subject: Notes\r\n\r\n" + clinical + "Lorem ipsum dolor sit amet. " * 100).encode()
+    assert processor.process_document(late, "notes.eml", "email")["document_type"] == "unknown"
+    assert processor.process_document(early, "notes.eml", "email")["document_type"] == "Medical Documents"
+    print("✅ Keywords past type_sample_chars do not affect the detected type")
+
 if __name__ == "__main__":
     test_document_type_detection()
+    test_keyword_matcher_matches_substring_scan()
+    test_process_document_samples_type()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the two-tier embedding cache
+"""
+
+import os
+import tempfile
+
+from services.embedding_cache import EmbeddingCache
+
+
+def test_embedding_cache():
+    """Test memory hits, disk hits after restart and LRU eviction"""
+
+    print("🧪 Testing Embedding Cache")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "embeddings.sqlite")
+        cache = EmbeddingCache(path=path, memory_items=2, max_disk_entries=3)
+
+        texts = ["hemoglobin 13.5 g/dL", "platelets normal", "glucose fasting 92"]
+        vectors = [[float(i)] * 4 for i in range(len(texts))]
+        assert cache.get_many("model-a", texts) == [None, None, None]
+        cache.put_many("model-a", texts, vectors)
+
+        assert cache.get_many("model-a", texts[2:]) == [vectors[2]]
+        assert cache.get_many("model-b", texts[2:]) == [None]
+        stats = cache.stats()
+        assert stats["memory_hits"] == 1 and stats["misses"] == 4
+        assert stats["memory_entries"] == 2 and stats["memory_evictions"] == 1
+        print("   ✅ Memory tier serves hits and is keyed by model")
+
+        reopened = EmbeddingCache(path=path, memory_items=2, max_disk_entries=3)
+        assert reopened.get_many("model-a", texts) == vectors
+        assert reopened.stats()["disk_hits"] == 3
+        print("   ✅ Disk tier survives a restart")
+
+        reopened.put_many("model-a", ["new chunk"], [[9.0] * 4])
+        stats = reopened.stats()
+        assert stats["disk_entries"] == 3 and stats["disk_evictions"] == 1
+        print("   ✅ Disk tier evicts least recently used entries")
+
+    print("\n" + "=" * 50)
+    print("🎯 Embedding Cache Test Completed!")
+
+
+if __name__ == "__main__":
+    test_embedding_cache()
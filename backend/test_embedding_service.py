@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Test EmbeddingService against fake Pinecone/Gemini backends
+"""
+
+import os
+import time
+import threading
+
+os.environ["GOOGLE_API_KEY"] = ""
+os.environ["PINECONE_API_KEY"] = ""
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+
+from types import SimpleNamespace
+
+from google.api_core import exceptions as google_exceptions
+from pinecone.exceptions import PineconeApiException
+
+import services.embedding_service as embedding_module
+from services.embedding_service import EmbeddingService, PINECONE_UPSERT_BATCH_SIZE, GEMINI_EMBED_BATCH_LIMIT
+from services.chunk_table import ChunkTable
+from utils.rate_limiter import TokenBucket
+
+SERVERLESS_BODY = '{"code":3,"message":"Serverless and Starter indexes do not support deleting with metadata filtering"}'
+SERVERLESS_ERROR = "(400) Reason: Bad Request HTTP response body: " + SERVERLESS_BODY
+
+
+def _api_error(status: int, body: str) -> PineconeApiException:
+    error = PineconeApiException(status=status, reason="Bad Request" if status == 400 else "Error")
+    error.body = body
+    return error
+
+
+class FakePineconeIndex:
+    """Pinecone index stub: filtered delete raises delete_error, ID listing/fetch work"""
+
+    def __init__(self, vectors, delete_error=None):
+        self.vectors = dict(vectors)
+        self.delete_error = delete_error
+
+    def delete(self, ids=None, filter=None):
+        if filter is not None:
+            raise self.delete_error
+        for vid in ids:
+            self.vectors.pop(vid, None)
+
+    def list(self, prefix):
+        yield [vid for vid in self.vectors if vid.startswith(prefix)]
+
+    def fetch(self, ids):
+        return SimpleNamespace(vectors={
+            vid: SimpleNamespace(metadata=self.vectors[vid]) for vid in ids if vid in self.vectors
+        })
+
+
+class FakeGenAI:
+    """Stands in for google.generativeai: records each request, fails the first `failures` with `error`"""
+
+    def __init__(self, failures: int = 0, error: Exception = None):
+        self.failures = failures
+        self.error = error or Exception("503 The service is currently unavailable")
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def embed_content(self, model, content):
+        with self._lock:
+            self.requests.append(list(content))
+            if self.failures:
+                self.failures -= 1
+                raise self.error
+        return {"embedding": [[float(len(text))] + [0.0] * 767 for text in content]}
+
+
+def _gemini_service(fake: FakeGenAI, batch_size: int = 3, max_retries: int = 2) -> EmbeddingService:
+    service = EmbeddingService()
+    service.google_api_available = True
+    service.embedding_batch_size = batch_size
+    service.embedding_max_retries = max_retries
+    service.embedding_retry_backoff = 0.001
+    service.rate_limiter = TokenBucket(rate=10000, capacity=100)
+    embedding_module.genai = fake
+    return service
+
+
+def _pinecone_service(index: FakePineconeIndex) -> EmbeddingService:
+    service = EmbeddingService()
+    service.index = index
+    service.using_local = False
+    return service
+
+
+def test_filtered_delete_fallback():
+    """Only the serverless rejection falls back to listing IDs; other errors surface"""
+
+    print("🧪 Testing filtered delete fallback")
+    print("=" * 50)
+
+    vectors = {
+        "s1_doc_0": {"session_id": "s1", "user_id": "u1"},
+        "s1_doc_1": {"session_id": "s1", "user_id": "u1"},
+        "s1_other_0": {"session_id": "s1", "user_id": "u2"},
+        "s2_doc_0": {"session_id": "s2", "user_id": "u1"}
+    }
+    index = FakePineconeIndex(vectors, delete_error=Exception(SERVERLESS_ERROR))
+    service = _pinecone_service(index)
+    try:
+        assert service.delete_session_vectors("s1", "u1")
+        assert sorted(index.vectors) == ["s1_other_0", "s2_doc_0"]
+        print("   ✅ Serverless indexes delete by listing and fetching IDs")
+
+        index = FakePineconeIndex(vectors, delete_error=_api_error(400, SERVERLESS_BODY))
+        service.index = index
+        assert service.delete_session_vectors("s1", "u1")
+        assert sorted(index.vectors) == ["s1_other_0", "s2_doc_0"]
+        for error in (_api_error(400, '{"code":3,"message":"Invalid filter"}'), _api_error(500, SERVERLESS_BODY)):
+            assert not service._is_filtered_delete_unsupported(error)
+        print("   ✅ PineconeApiException is classified by its status before its body")
+
+        index = FakePineconeIndex(vectors, delete_error=Exception("(401) Reason: Unauthorized"))
+        service.index = index
+        assert not service.delete_session_vectors("s1", "u1")
+        assert len(index.vectors) == 4
+        try:
+            service._delete_by_filter({"session_id": {"$eq": "s1"}}, "s1_")
+            assert False, "auth errors must not be swallowed"
+        except Exception as e:
+            assert "Unauthorized" in str(e)
+        print("   ✅ Other errors are reported instead of falling back")
+    finally:
+        service.close()
+
+    print("\n" + "=" * 50)
+    print("🎯 Filtered Delete Test Completed!")
+
+
+def test_embedding_batches():
+    """Test batch splitting, retries on transient errors and the rate limiter"""
+
+    print("🧪 Testing embedding batches")
+    print("=" * 50)
+
+    genai = embedding_module.genai
+    try:
+        fake = FakeGenAI()
+        service = _gemini_service(fake, batch_size=3)
+        texts = [f"chunk {'x' * i}" for i in range(8)]
+        embeddings = service.get_embeddings(texts + texts[:2])
+        assert sorted(len(request) for request in fake.requests) == [2, 3, 3]
+        assert sorted(t for request in fake.requests for t in request) == sorted(texts)
+        assert [e[0] for e in embeddings] == [float(len(t)) for t in texts + texts[:2]]
+        print("   ✅ Misses are split into batches of embedding_batch_size, duplicates sent once")
+
+        assert service.get_embeddings(texts) == embeddings[:8] and len(fake.requests) == 3
+        print("   ✅ Repeated texts are served from the cache")
+
+        fake = FakeGenAI(failures=2)
+        service = _gemini_service(fake, max_retries=2)
+        assert service.get_embeddings(["transient"])[0][0] == float(len("transient"))
+        assert len(fake.requests) == 3
+        print("   ✅ Transient errors are retried")
+
+        fake = FakeGenAI(failures=10)
+        service = _gemini_service(fake, max_retries=2)
+        try:
+            service.get_embeddings(["always failing"])
+            assert False, "should give up after max_retries"
+        except Exception as e:
+            assert "Error generating embeddings" in str(e) and "503" in str(e)
+        assert len(fake.requests) == 3
+        print("   ✅ Gives up after embedding_max_retries retries")
+
+        fake = FakeGenAI(failures=1, error=google_exceptions.ResourceExhausted("Quota exceeded"))
+        service = _gemini_service(fake, max_retries=2)
+        service.get_embeddings(["rate limited"])
+        assert len(fake.requests) == 2
+        for error in (google_exceptions.InvalidArgument("Request payload size exceeds the limit"),
+                      Exception("400 API key not valid")):
+            fake = FakeGenAI(failures=1, error=error)
+            service = _gemini_service(fake, max_retries=2)
+            try:
+                service.get_embeddings(["bad request"])
+                assert False, "client errors must not be retried"
+            except Exception as e:
+                assert "Error generating embeddings" in str(e)
+            assert len(fake.requests) == 1
+        print("   ✅ Rate limits are retried; client errors fail without retrying")
+
+        fake = FakeGenAI()
+        service = _gemini_service(fake, batch_size=250)
+        acquired = []
+        acquire = service.rate_limiter.acquire
+        service.rate_limiter.acquire = lambda: (acquired.append(1), acquire())
+        service.get_embeddings([f"text {i}" for i in range(250)])
+        assert sorted(len(request) for request in fake.requests) == [50, GEMINI_EMBED_BATCH_LIMIT, GEMINI_EMBED_BATCH_LIMIT]
+        assert len(acquired) == len(fake.requests)
+        print("   ✅ Batches are capped at the API limit, one rate limiter token per request")
+
+        fake = FakeGenAI()
+        service = _gemini_service(fake, batch_size=1)
+        service.rate_limiter = TokenBucket(rate=20, capacity=1)
+        started = time.monotonic()
+        service.get_embeddings(["a", "b", "c", "d"])
+        elapsed = time.monotonic() - started
+        # One token up front, then each further request waits 1/20 s
+        assert elapsed >= 0.14, elapsed
+        print(f"   ✅ Requests over the rate limit wait for tokens ({elapsed:.2f}s for 4 at 20/s)")
+    finally:
+        embedding_module.genai = genai
+
+    print("\n" + "=" * 50)
+    print("🎯 Embedding Batches Test Completed!")
+
+
+def test_local_bulk_upsert():
+    """A local batch reaches the store in one upsert; only Pinecone requests are split"""
+
+    print("🧪 Testing bulk upsert")
+    print("=" * 50)
+
+    service = EmbeddingService()
+    calls = []
+    upsert = service.index.upsert
+
+    def counting_upsert(vectors):
+        calls.append(len(vectors))
+        upsert(vectors)
+
+    service.index.upsert = counting_upsert
+    text = " ".join(f"word{i}" for i in range(6000))
+    chunks = ChunkTable("doc-bulk", text, range(0, 6000, 40), range(40, 6040, 40))
+    assert len(chunks) > PINECONE_UPSERT_BATCH_SIZE
+    stored = service.store_embeddings_bulk([(chunks, "unknown")], user_id="tester", session_id="bulk")
+    assert stored == [len(chunks)] and calls == [len(chunks)]
+    print(f"   ✅ {len(chunks)} vectors written to the local store in one upsert")
+
+    index = FakePineconeIndex({})
+    index.upserts = []
+    index.upsert = lambda vectors: index.upserts.append(len(vectors))
+    service = _pinecone_service(index)
+    service.store_embeddings_bulk([(chunks, "unknown")], user_id="tester", session_id="bulk")
+    assert max(index.upserts) == PINECONE_UPSERT_BATCH_SIZE and sum(index.upserts) == len(chunks)
+    print(f"   ✅ Pinecone upserts are split into {len(index.upserts)} requests")
+
+    print("\n" + "=" * 50)
+    print("🎯 Bulk Upsert Test Completed!")
+
+
+if __name__ == "__main__":
+    test_filtered_delete_fallback()
+    test_embedding_batches()
+    test_local_bulk_upsert()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test background ingestion jobs: progress reporting, queue limits and failures.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+os.environ["GOOGLE_API_KEY"] = ""
+os.environ["PINECONE_API_KEY"] = ""
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+
+from services.embedding_service import EmbeddingService
+from services.ingest_jobs import IngestJob, IngestJobQueue, IngestQueueFull
+from services.ingest_pipeline import StreamingIngestPipeline
+
+
+def _wait(job, timeout=30):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.finished, f"job still {job.status}"
+
+
+def test_ingest_job_progress():
+    print("🧪 Testing ingestion job progress...")
+    embedding_service = EmbeddingService()
+    pipeline = StreamingIngestPipeline(embedding_service, batch_size=2, max_inflight_batches=1)
+    queue = IngestJobQueue(max_workers=1)
+    email = ("Subject: Claim\r\n\r\n" + "\n\n".join(
+        f"Paragraph {i}: the patient was admitted to hospital for treatment " * 8 for i in range(30)
+    )).encode()
+    snapshots = []
+
+    def work(job):
+        def progress(stage, created, embedded):
+            job.report(stage, created, embedded)
+            snapshots.append(job.to_dict()["progress"])
+        result = pipeline.run(email, "claim.eml", "email", session_id="session_jobs", progress=progress)
+        return {"document_id": result["document_id"], "chunks_processed": result["vectors_stored"]}
+
+    try:
+        job = queue.submit(IngestJob("claim.eml", "session_jobs"), work)
+        _wait(job)
+        status = job.to_dict()
+        assert status["status"] == status["stage"] == "completed", status
+        assert status["document_id"] == status["result"]["document_id"]
+        total = status["result"]["chunks_processed"]
+        assert status["progress"]["chunks_embedded"] == status["progress"]["chunks_total"] == total > 2
+        assert status["progress"]["fraction"] == 1.0
+        assert all(s["chunks_total"] is not None for s in snapshots if s["fraction"] is not None)
+        assert [s["chunks_embedded"] for s in snapshots] == sorted(s["chunks_embedded"] for s in snapshots)
+        assert status["timings"]["run_ms"] is not None and status["timings"]["total_ms"] >= status["timings"]["run_ms"]
+        print(f"✅ Job completed: {total} chunks, {len(snapshots)} progress updates, {status['timings']}")
+    finally:
+        queue.shutdown()
+        pipeline.shutdown()
+
+
+def test_ingest_job_limits():
+    print("🧪 Testing ingestion queue limits...")
+    queue = IngestJobQueue(max_workers=1, max_pending=2, history=1)
+    release = threading.Event()
+
+    def blocked(job):
+        release.wait(10)
+        return {"document_id": "doc-" + job.filename}
+
+    def failing(job):
+        raise Exception("Error ingesting document: boom")
+
+    try:
+        first = queue.submit(IngestJob("a"), blocked)
+        second = queue.submit(IngestJob("b"), failing)
+        try:
+            queue.submit(IngestJob("c"), blocked)
+            assert False, "queue should be full"
+        except IngestQueueFull:
+            pass
+        assert queue.metrics()["rejected"] == 1 and queue.metrics()["queued"] == 1
+        print("✅ Submissions beyond max_pending rejected")
+
+        release.set()
+        _wait(first)
+        _wait(second)
+        assert first.document_id == "doc-a"
+        assert second.status == "failed" and "boom" in second.error
+        assert queue.metrics()["completed"] == 1 and queue.metrics()["failed"] == 1
+        assert len([job for job in (queue.get(first.job_id), queue.get(second.job_id)) if job]) == 1
+        print("✅ Failures recorded and finished jobs evicted beyond history")
+    finally:
+        release.set()
+        queue.shutdown()
+
+
+def test_job_registers_on_event_loop():
+    print("🧪 Testing /documents/jobs/ registration...")
+    from fastapi.testclient import TestClient
+    import main
+    from routers import document_router
+
+    register = document_router._register_document
+    invalidate_session = document_router.get_semantic_cache().invalidate_session
+    on_loop = []
+
+    def checking(fn):
+        def call(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return fn(*args, **kwargs)
+        return call
+
+    def submit(client, name, content):
+        response = client.post("/documents/jobs/", data={"session_id": "session_job_loop"},
+                               files={"file": (name, content)})
+        assert response.status_code == 202, response.text
+        job = document_router.get_ingest_jobs().get(response.json()["job_id"])
+        _wait(job)
+        return job
+
+    document_router._register_document = checking(register)
+    document_router.get_semantic_cache().invalidate_session = checking(invalidate_session)
+    pool = document_router.get_processing_pool()
+    max_queue = pool.max_queue
+    try:
+        with TestClient(main.app) as client:
+            email = b"Subject: Claim\r\n\r\nThe patient was admitted to hospital for treatment.\r\n"
+            completed = pool.completed
+            job = submit(client, "claim.eml", email)
+            assert job.status == "completed", job.error
+            assert pool.completed == completed + 1
+            listed = client.get("/documents/list/", params={"session_id": "session_job_loop"}).json()
+            assert job.document_id in str(listed)
+            print("✅ Job worker registered its document on the event loop, admitted by the pool")
+
+            # Duplicate of an upload that was never embedded: embedded by the job, marked on the loop
+            report = b"Subject: Report\r\n\r\nHaemoglobin within the reference range.\r\n"
+            response = client.post("/documents/upload/?session_id=session_job_loop",
+                                   files={"file": ("report.eml", report)})
+            document_id = response.json()["document_id"]
+            on_loop.clear()
+            job = submit(client, "report.eml", report)
+            assert job.status == "completed" and job.result["duplicate"], job.error
+            assert document_router.document_store[document_id]["embedded"]
+            assert on_loop and all(on_loop)
+            print("✅ Duplicate jobs update the stores and caches on the event loop")
+
+            pool.max_queue = 0
+            job = submit(client, "other.eml", b"Subject: Other\r\n\r\nDischarge summary.\r\n")
+            assert job.status == "failed" and "queue is full" in job.error
+            print("✅ Jobs are subject to the processing pool's backpressure")
+    finally:
+        pool.max_queue = max_queue
+        document_router._register_document = register
+        document_router.get_semantic_cache().invalidate_session = invalidate_session
+
+
+if __name__ == "__main__":
+    test_ingest_job_progress()
+    test_ingest_job_limits()
+    test_job_registers_on_event_loop()
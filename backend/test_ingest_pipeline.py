@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test the streaming ingest pipeline: every chunk is embedded and upserted,
+batches stay bounded, and the result matches the batch ingest path.
+"""
+
+import os
+
+os.environ["GOOGLE_API_KEY"] = ""
+os.environ["PINECONE_API_KEY"] = ""
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+
+from services.document_processor import DocumentProcessor
+from services.embedding_service import EmbeddingService
+from services.ingest_pipeline import StreamingIngestPipeline
+from services.pdf_extractor import ParallelPDFExtractor
+from test_pdf_extraction import _make_pdf
+
+
+def test_streaming_ingest():
+    print("🧪 Testing StreamingIngestPipeline...")
+    page_texts = [f"Section {i} the policy covers hospitalization and the premium is due {i}" * 3 for i in range(60)]
+    pdf = _make_pdf(page_texts)
+
+    embedding_service = EmbeddingService()
+    extractor = ParallelPDFExtractor(max_workers=2)
+    pipeline = StreamingIngestPipeline(
+        embedding_service,
+        DocumentProcessor(pdf_extractor=extractor),
+        batch_size=4,
+        max_inflight_batches=2,
+        type_sample_chars=2000
+    )
+    try:
+        result = pipeline.run(pdf, "annual_policy.pdf", "pdf", user_id="tester", session_id="session_stream")
+        chunks = result["chunks"]
+        assert result["total_chunks"] == len(chunks) > 8
+        assert result["vectors_stored"] == len(chunks)
+        assert result["ingest_stats"]["batches"] == -(-len(chunks) // 4)
+        assert result["document_type"] == "Policy Wordings"
+        assert [c.metadata["chunk_id"] for c in chunks] == list(range(len(chunks)))
+        assert all(c.metadata["total_chunks"] == len(chunks) for c in chunks)
+
+        joined = " ".join(c.page_content for c in chunks)
+        assert all(text in joined for text in page_texts)
+        print(f"✅ {len(chunks)} chunks streamed in {result['ingest_stats']['batches']} batches")
+
+        matches = embedding_service.search_similar(
+            "hospitalization", user_id="tester", top_k=100, document_id=result["document_id"]
+        )
+        assert len(matches) == len(chunks)
+        assert {m["document_type"] for m in matches} == {"Policy Wordings"}
+        print(f"✅ All chunks searchable; first upsert after {result['ingest_stats']['time_to_first_upsert_ms']} ms")
+
+        # Below the parallel threshold pages are extracted inline, never in the pool
+        small = ParallelPDFExtractor(max_workers=2, min_pages=100)
+        small.iter_pages = None
+        pieces = list(DocumentProcessor(pdf_extractor=small).iter_text(pdf, "annual_policy.pdf", "pdf"))
+        assert len(pieces) == len(page_texts) and all(text in "".join(pieces) for text in page_texts)
+        print("✅ Small PDFs are extracted inline")
+    finally:
+        pipeline.shutdown()
+        extractor.shutdown()
+
+
+def _email(paragraphs):
+    return ("Subject: Lab report\r\n\r\n" + "\n\n".join(paragraphs)).encode()
+
+
+def test_incremental_reingest():
+    print("🧪 Testing incremental re-ingest...")
+    paragraphs = [f"Result {i}: " + f"haemoglobin level {i} within the reference range. " * 12 for i in range(40)]
+    revised = list(paragraphs)
+    revised[10] = "Result 10: haemoglobin level revised after repeat test. " * 12
+    del revised[30]
+
+    processor = DocumentProcessor()
+    embedding_service = EmbeddingService()
+    v1 = processor.process_document(_email(paragraphs), "lab.eml", "email")
+    v2 = processor.process_document(_email(revised), "lab.eml", "email", document_id=v1["document_id"])
+    assert v2["document_id"] == v1["document_id"]
+
+    embedding_service.store_embeddings(v1["chunks"], user_id="tester", document_type="unknown", session_id="versions")
+    update = embedding_service.update_document_embeddings(
+        v2["chunks"], user_id="tester", document_type="unknown", session_id="versions",
+        previous_chunks=v1["chunks"], previous_document_type="unknown"
+    )
+    assert 0 < update["vectors_stored"] <= 4, update
+    assert 0 < update["vectors_deleted"] <= 4, update
+    assert update["vectors_unchanged"] == len(v2["chunks"]) - update["vectors_stored"]
+
+    stored = {vid for vid, md in embedding_service.index.id_to_metadata.items() if md.get("session_id") == "versions"}
+    expected = {f"versions_{v2['document_id']}_{key}" for key in v2["chunks"].chunk_keys()}
+    assert stored == expected
+    print(f"✅ Re-ingest embedded {update['vectors_stored']} of {len(v2['chunks'])} chunks, "
+          f"deleted {update['vectors_deleted']} stale vectors")
+
+    # A chunk inserted at the front shifts every later chunk: their reported positions follow
+    front = ["Summary: " + "patient fasting glucose normal, no follow-up needed. " * 12] + revised
+    v3 = processor.process_document(_email(front), "lab.eml", "email", document_id=v1["document_id"])
+    update = embedding_service.update_document_embeddings(
+        v3["chunks"], user_id="tester", document_type="unknown", session_id="versions",
+        previous_chunks=v2["chunks"], previous_document_type="unknown"
+    )
+    assert update["vectors_moved"] > 0 and update["vectors_stored"] <= 3, update
+    last = v3["chunks"][len(v3["chunks"]) - 1]
+    matches = embedding_service.search_similar(
+        last.page_content, user_id="tester", top_k=len(v3["chunks"]), session_id="versions",
+        document_id=v3["document_id"]
+    )
+    reported = {m["text"]: m["chunk_id"] for m in matches}
+    assert reported[last.page_content] == len(v3["chunks"]) - 1
+    assert all(reported[c.page_content] == c.metadata["chunk_id"] for c in v3["chunks"] if c.page_content in reported)
+    print(f"✅ {update['vectors_moved']} moved chunks report their new positions")
+
+
+if __name__ == "__main__":
+    test_streaming_ingest()
+    test_incremental_reingest()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test page-parallel PDF extraction against serial extraction.
+"""
+
+from services.document_processor import DocumentProcessor
+from services.pdf_extractor import ParallelPDFExtractor
+
+
+def _make_pdf(page_texts):
+    """Minimal PDF with one line of Helvetica text per page"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+def test_parallel_pdf_extraction():
+    print("🧪 Testing page-parallel PDF extraction...")
+    page_texts = [f"Page {i} covers hospitalization benefit {i * 7}" for i in range(40)]
+    pdf = _make_pdf(page_texts)
+
+    serial = DocumentProcessor(pdf_extractor=ParallelPDFExtractor(max_workers=1))
+    parallel = DocumentProcessor(pdf_extractor=ParallelPDFExtractor(max_workers=2, min_pages=10))
+    try:
+        assert parallel.pdf_extractor.should_parallelize(40)
+        expected = serial.process_pdf(pdf, "policy.pdf")
+        result = parallel.process_pdf(pdf, "policy.pdf")
+
+        assert result["pages"] == expected["pages"] == 40
+        assert result["text"] == expected["text"]
+        assert result["page_offsets"] == expected["page_offsets"]
+        for i, offset in enumerate(result["page_offsets"]):
+            assert result["text"].startswith(page_texts[i], offset)
+        print(f"✅ {result['pages']} pages extracted in parallel, identical to serial extraction")
+    finally:
+        parallel.pdf_extractor.shutdown()
+
+
+if __name__ == "__main__":
+    test_parallel_pdf_extraction()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test the document processing pool: results match in-process processing,
+uploads run concurrently, and the queue bound is enforced.
+"""
+
+import asyncio
+
+from services.document_processor import DocumentProcessor
+from services.pdf_extractor import ParallelPDFExtractor
+from services.processing_pool import DocumentProcessingPool, ProcessingQueueFull
+
+EMAIL = (
+    b"Subject: Policy renewal\r\n"
+    b"From: insurer@example.com\r\n\r\n"
+    + b"The policy covers hospitalization expenses and a waiting period applies. " * 40
+)
+
+
+async def _run_pool_checks():
+    pool = DocumentProcessingPool(max_workers=2, max_queue=3)
+    try:
+        expected = DocumentProcessor().process_document(EMAIL, "renewal.eml", "email")
+
+        results = await asyncio.gather(*[
+            pool.process_document(EMAIL, f"renewal_{i}.eml", "email") for i in range(3)
+        ])
+        for result in results:
+            assert result["document_type"] == expected["document_type"]
+            assert result["total_chunks"] == expected["total_chunks"]
+            assert [c.page_content for c in result["chunks"]] == [c.page_content for c in expected["chunks"]]
+        print(f"✅ {len(results)} documents processed in worker processes")
+
+        tasks = [asyncio.create_task(pool.process_document(EMAIL, "renewal.eml", "email")) for _ in range(4)]
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        rejected = [o for o in outcomes if isinstance(o, ProcessingQueueFull)]
+        assert len(rejected) == 1, outcomes
+
+        metrics = pool.metrics()
+        assert metrics["in_flight"] == 0
+        assert metrics["completed"] == 6 and metrics["rejected"] == 1
+        assert metrics["peak_in_flight"] == 3
+        print(f"✅ Queue bound enforced: {metrics}")
+    finally:
+        pool.shutdown()
+
+
+def _worker_extract_workers():
+    from services.processing_pool import _get_worker_processor
+    return _get_worker_processor().pdf_extractor.max_workers
+
+
+def test_processing_pool():
+    print("🧪 Testing DocumentProcessingPool...")
+    asyncio.run(_run_pool_checks())
+
+
+def test_shared_pool_is_lazy():
+    print("🧪 Testing the pool shared with the PDF extractor...")
+    pool = DocumentProcessingPool(max_workers=1)
+    extractor = ParallelPDFExtractor(max_workers=1, get_executor=pool.get_executor)
+    try:
+        assert pool._executor is None
+        assert pool.get_executor().submit(_worker_extract_workers).result() == 1
+        print("✅ Workers extract PDFs serially instead of spawning nested pools")
+
+        extractor.shutdown()
+        assert extractor._get_executor() is pool.get_executor()
+        pool.shutdown()
+        assert extractor._get_executor() is pool.get_executor() is not None
+        print("✅ Pool created on first use, left to its owner, recreated after shutdown")
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    test_processing_pool()
+    test_shared_pool_is_lazy()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test the semantic answer cache: paraphrases within a scope reuse answers.
+"""
+
+import os
+
+os.environ["GOOGLE_API_KEY"] = ""
+os.environ["PINECONE_API_KEY"] = ""
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+
+from fastapi.testclient import TestClient
+
+from services.semantic_cache import SemanticAnswerCache
+from test_pdf_extraction import _make_pdf
+
+TOPICS = ["hemoglobin", "cholesterol", "waiting", "hospital"]
+
+
+class CountingModel:
+    """Stands in for the Gemini model: counts calls, answers in the /query/ response shape"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        text = ('{"answer": "30 days", "justification": "Clause 4", "matched_clauses": [], "confidence": 0.9, '
+                '"score_details": {"document_type": "unknown", "question_weight": 2.0, "document_weight": 2.0, "score": 4.0}}')
+        return type("Response", (), {"text": text})()
+
+
+def _embed(texts):
+    """Stands in for Gemini embeddings: paraphrases about one topic point the same way"""
+    vectors = []
+    for text in texts:
+        vector = [0.1] + [0.0] * 767
+        for i, topic in enumerate(TOPICS):
+            vector[i + 1] = float(text.lower().count(topic))
+        vectors.append(vector)
+    return vectors
+
+
+def test_semantic_cache():
+    print("🧪 Testing SemanticAnswerCache...")
+    cache = SemanticAnswerCache(threshold=0.9, max_entries=3, max_entries_per_scope=2)
+    session = cache.scope("s1", None, "Medical Documents")
+    hemoglobin, cholesterol, waiting = _embed(["hemoglobin", "cholesterol", "waiting"])
+    cache.add(session, hemoglobin, {"answer": "13.5 g/dL"}, ["doc-1"])
+    assert cache.lookup(session, _embed(["what's my hemoglobin"])[0])["answer"] == "13.5 g/dL"
+    assert cache.lookup(session, cholesterol) is None
+    assert cache.lookup(cache.scope("s2", None, "Medical Documents"), hemoglobin) is None
+    assert cache.lookup(cache.scope("s1", None, "unknown"), hemoglobin) is None
+    print("✅ Paraphrase served; other topics and other scopes miss")
+
+    cache.add(session, cholesterol, {"answer": "180 mg/dL"}, ["doc-2"])
+    cache.lookup(session, hemoglobin)
+    cache.add(session, waiting, {"answer": "30 days"}, ["doc-2"])
+    assert cache.lookup(session, cholesterol) is None and cache.lookup(session, hemoglobin) is not None
+    document = cache.scope(None, "doc-3", "unknown")
+    cache.add(document, cholesterol, {"answer": "190 mg/dL"})
+    cache.add(cache.scope("s2", None, "unknown"), waiting, {"answer": "15 days"})
+    assert cache.stats()["entries"] == 3 and cache.lookup(session, waiting) is None
+    print("✅ Per-scope and total size bounds evict least recently used answers")
+
+    assert cache.invalidate_document("doc-1") == 1 and cache.lookup(session, hemoglobin) is None
+    assert cache.invalidate_document("doc-3") == 1 and cache.lookup(document, cholesterol) is None
+    assert cache.invalidate_session("s2") == 1 and cache.stats()["entries"] == 0
+    print(f"✅ Invalidation by document and session: {cache.stats()}")
+
+    cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60)
+    cache.add(session, _embed(["hemoglobin"])[0], {"answer": "stale"})
+    cache.add(session, _embed(["hemoglobin hemoglobin hemoglobin cholesterol"])[0], {"answer": "fresh"})
+    cache.add(session, cholesterol, {"answer": "stale too"})
+    for entry in cache._scopes[session].entries:
+        if entry["answer"]["answer"].startswith("stale"):
+            entry["created_at"] -= 120
+    assert cache.lookup(session, hemoglobin)["answer"] == "fresh"
+    assert cache.stats()["entries"] == 1 and cache.stats()["evictions"] == 2
+    print("✅ Expired answers are pruned before matching, so a stale best match does not hide a fresh one")
+
+
+def test_query_uses_semantic_cache():
+    print("🧪 Testing /documents/query/ semantic caching...")
+    import main
+    from routers import document_router
+
+    embedding_service, llm_service = document_router.get_embedding_service(), document_router.get_llm_service()
+    get_embeddings = embedding_service.get_embeddings
+    embedding_service.get_embeddings, embedding_service.google_api_available = _embed, True
+    llm_service.api_available, llm_service.model = True, CountingModel()
+    client = TestClient(main.app)
+
+    def upload(name, text):
+        response = client.post("/documents/upload/?session_id=session_semantic",
+                               files={"file": (name, _make_pdf([text]))})
+        assert response.status_code == 200, response.text
+        document_id = response.json()["document_id"]
+        response = client.post("/documents/embed/", json={"document_id": document_id, "session_id": "session_semantic"})
+        assert response.status_code == 200, response.text
+        return document_id
+
+    def ask(question):
+        response = client.post("/documents/query/", json={"question": question, "session_id": "session_semantic"})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    try:
+        client.post("/documents/session/create", json={"session_id": "session_semantic"})
+        document_id = upload("blood.pdf", "Hemoglobin 13.5 g/dL, cholesterol 180 mg/dL")
+        first = ask("What's my hemoglobin?")
+        assert ask("hemoglobin level?") == first and llm_service.model.calls == 1
+        ask("And my cholesterol?")
+        assert llm_service.model.calls == 2
+        print("✅ Paraphrase answered without retrieval or an LLM call")
+
+        upload("followup.pdf", "Hemoglobin rechecked at the hospital")
+        ask("hemoglobin level?")
+        assert llm_service.model.calls == 3
+        client.delete(f"/documents/{document_id}/")
+        assert document_router.get_semantic_cache().lookup(
+            SemanticAnswerCache.scope("session_semantic", None, "unknown"), _embed(["cholesterol"])[0]
+        ) is None
+        print(f"✅ New and deleted documents invalidate the session: {document_router.get_semantic_cache().stats()}")
+    finally:
+        embedding_service.get_embeddings, embedding_service.google_api_available = get_embeddings, False
+        llm_service.api_available, llm_service.model = False, None
+        document_router.close_services()
+
+
+if __name__ == "__main__":
+    test_semantic_cache()
+    test_query_uses_semantic_cache()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test spooled uploads: size limits while streaming, and parsing from disk.
+"""
+
+import io
+import os
+import tempfile
+
+from docx import Document
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from services.document_processor import DocumentProcessor
+from services.pdf_extractor import ParallelPDFExtractor
+from test_pdf_extraction import _make_pdf
+from utils.file_utils import FileUtils, UploadSizeLimitMiddleware, MAX_BATCH_REQUEST_BYTES
+
+
+def _write_temp(content: bytes, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        f.write(content)
+        return f.name
+
+
+def test_process_file_matches_bytes():
+    print("🧪 Testing memory-mapped parsing of spooled files...")
+    processor = DocumentProcessor(pdf_extractor=ParallelPDFExtractor(max_workers=2, min_pages=10))
+    docx_buffer = io.BytesIO()
+    doc = Document()
+    for i in range(20):
+        doc.add_paragraph(f"Clause {i}: the insurer shall pay the sum insured for hospitalization")
+    doc.save(docx_buffer)
+    samples = {
+        "pdf": _make_pdf([f"Page {i} lists the deductible for room rent" for i in range(30)]),
+        "docx": docx_buffer.getvalue(),
+        "email": b"Subject: Claim update\n\nYour claim has been approved.\n",
+    }
+    try:
+        for file_type, content in samples.items():
+            path = _write_temp(content, f".{file_type}")
+            try:
+                expected = processor.process_document(content, f"sample.{file_type}", file_type, "doc-1")
+                result = processor.process_file(path, f"sample.{file_type}", file_type, "doc-1")
+            finally:
+                os.remove(path)
+            assert result["text"] == expected["text"]
+            assert result["chunks"].chunk_keys() == expected["chunks"].chunk_keys()
+            print(f"✅ {file_type}: {result['total_chunks']} chunks, identical to in-memory parsing")
+    finally:
+        processor.pdf_extractor.shutdown()
+
+
+def test_upload_size_limits():
+    print("🧪 Testing upload size limits...")
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, max_bytes=64 * 1024)
+
+    @app.post("/spool/")
+    async def spool(file: UploadFile = File(...)):
+        async with FileUtils.spooled_upload(file) as (path, content_hash):
+            return {"size": os.path.getsize(path), "sha256": content_hash, "path": path}
+
+    client = TestClient(app)
+    response = client.post("/spool/", files={"file": ("a.pdf", b"x" * 1000)})
+    assert response.status_code == 200 and response.json()["size"] == 1000
+    assert not os.path.exists(response.json()["path"])
+    print("✅ Small upload spooled, hashed and cleaned up")
+
+    response = client.post("/spool/", files={"file": ("b.pdf", b"x" * 48 * 1024)})
+    assert response.status_code == 200 and response.json()["size"] == 48 * 1024
+    print("✅ Uploads under the request limit are not checked again while spooling")
+
+    def chunked_body():
+        yield b"x" * 128 * 1024
+
+    response = client.post("/spool/", content=chunked_body(),
+                           headers={"content-type": "multipart/form-data; boundary=abc"})
+    assert response.status_code == 413
+    response = client.post("/spool/", files={"file": ("c.pdf", b"x" * 128 * 1024)})
+    assert response.status_code == 413
+    print("✅ Request bodies over the request limit rejected by the middleware")
+
+    assert UploadSizeLimitMiddleware(app).path_limits["/documents/upload-batch/"] == MAX_BATCH_REQUEST_BYTES
+    assert not hasattr(FileUtils, "read_file_content")
+    print("✅ Batch uploads get the batch request limit by default")
+
+
+if __name__ == "__main__":
+    test_process_file_matches_bytes()
+    test_upload_size_limits()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the local vector store against a brute-force reference
+"""
+
+import os
+import random
+import tempfile
+
+from services.vector_store import LocalVectorStore
+from services.vector_codecs import VectorCodec
+from services.persistent_vector_store import PersistentVectorStore
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = sum(x * x for x in a) ** 0.5
+    norm_b = sum(x * x for x in b) ** 0.5
+    if norm_a == 0 or norm_b == 0:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+def _random_vectors(count, dimension, seed=7):
+    rng = random.Random(seed)
+    return [[rng.uniform(-1, 1) for _ in range(dimension)] for _ in range(count)]
+
+
+def test_local_vector_store():
+    """Test top-k search, filtering and row recycling on the local store"""
+
+    print("🧪 Testing Local Vector Store")
+    print("=" * 50)
+
+    dimension = 16
+    vectors = _random_vectors(200, dimension)
+    store = LocalVectorStore(dimension=dimension, initial_capacity=8)
+    store.upsert([
+        {
+            "id": f"vec_{i}",
+            "values": values,
+            "metadata": {"user_id": "u1", "session_id": f"s{i % 4}", "chunk_id": i}
+        }
+        for i, values in enumerate(vectors)
+    ])
+
+    query = _random_vectors(1, dimension, seed=11)[0]
+    expected = sorted(range(len(vectors)), key=lambda i: _cosine(query, vectors[i]), reverse=True)[:5]
+    result = store.query(vector=query, top_k=5)
+    assert [m.id for m in result.matches] == [f"vec_{i}" for i in expected]
+    assert abs(result.matches[0].score - _cosine(query, vectors[expected[0]])) < 1e-4
+    print("   ✅ Unfiltered top-k matches brute force")
+
+    session_ids = [i for i in range(len(vectors)) if i % 4 == 2]
+    expected = sorted(session_ids, key=lambda i: _cosine(query, vectors[i]), reverse=True)[:3]
+    result = store.query(vector=query, top_k=3, filter={"user_id": {"$eq": "u1"}, "session_id": {"$eq": "s2"}})
+    assert [m.id for m in result.matches] == [f"vec_{i}" for i in expected]
+    assert all(m.metadata["session_id"] == "s2" for m in result.matches)
+    print("   ✅ Filtered top-k matches brute force")
+
+    store.delete([f"vec_{i}" for i in range(0, 200, 2)])
+    assert len(store) == 100
+    result = store.query(vector=query, top_k=200)
+    assert len(result.matches) == 100
+    assert all(int(m.id.split("_")[1]) % 2 == 1 for m in result.matches)
+    print("   ✅ Deleted vectors are never returned")
+
+    store.upsert([{"id": "new", "values": query, "metadata": {"user_id": "u2"}}])
+    result = store.query(vector=query, top_k=1)
+    assert result.matches[0].id == "new"
+    assert abs(result.matches[0].score - 1.0) < 1e-5
+    assert result.matches[0]["metadata"] == {"user_id": "u2"}
+    print("   ✅ Recycled rows hold new vectors")
+
+    store.delete(filter={"user_id": {"$eq": "u1"}, "session_id": {"$eq": "s1"}})
+    assert len(store) == 51
+    result = store.query(vector=query, top_k=200, filter={"session_id": "s1"})
+    assert result.matches == []
+    assert store.query(vector=query, top_k=1).matches[0].id == "new"
+    print("   ✅ Delete by filter removes only the matching scope")
+
+    queries = _random_vectors(4, dimension, seed=13)
+    batched = store.query_batch(vectors=queries, top_k=5, filter={"user_id": "u1"})
+    for q, result in zip(queries, batched):
+        single = store.query(vector=q, top_k=5, filter={"user_id": "u1"})
+        assert [m.id for m in result.matches] == [m.id for m in single.matches]
+    print("   ✅ Batched queries match individual queries")
+
+    print("\n" + "=" * 50)
+    print("🎯 Local Vector Store Test Completed!")
+
+
+
+def test_ivf_index_mode():
+    """Test that the IVF index agrees with exact search when probing every list"""
+
+    print("🧪 Testing IVF Index Mode")
+    print("=" * 50)
+
+    dimension = 16
+    vectors = _random_vectors(400, dimension, seed=3)
+    flat = LocalVectorStore(dimension=dimension)
+    ivf = LocalVectorStore(dimension=dimension, index_mode="ivf", ivf_lists=8, ivf_probes=8,
+                           ann_min_train_size=100, exact_search_threshold=0)
+    for start in range(0, len(vectors), 50):
+        batch = [
+            {"id": f"vec_{i}", "values": vectors[i], "metadata": {"session_id": f"s{i % 2}"}}
+            for i in range(start, start + 50)
+        ]
+        flat.upsert(batch)
+        ivf.upsert(batch)
+    assert ivf._ann.is_trained
+    print("   ✅ Index trains once enough vectors are stored")
+
+    deleted = [f"vec_{i}" for i in range(0, 400, 5)]
+    flat.delete(deleted)
+    ivf.delete(deleted)
+    for seed in range(5):
+        query = _random_vectors(1, dimension, seed=100 + seed)[0]
+        expected = [m.id for m in flat.query(vector=query, top_k=10).matches]
+        assert [m.id for m in ivf.query(vector=query, top_k=10).matches] == expected
+        expected = [m.id for m in flat.query(vector=query, top_k=5, filter={"session_id": "s1"}).matches]
+        assert [m.id for m in ivf.query(vector=query, top_k=5, filter={"session_id": "s1"}).matches] == expected
+    print("   ✅ Full probing matches exact search, tombstones are skipped")
+
+    print("\n" + "=" * 50)
+    print("🎯 IVF Index Mode Test Completed!")
+
+
+
+def test_vector_codecs():
+    """Test that every codec finds stored vectors and reports its memory usage"""
+
+    print("🧪 Testing Vector Codecs")
+    print("=" * 50)
+
+    dimension = 16
+    vectors = _random_vectors(600, dimension, seed=5)
+    for codec in ("float32", "float16", "int8", "pq"):
+        options = {"subspaces": 4, "train_size": 300} if codec == "pq" else None
+        store = LocalVectorStore(dimension=dimension, initial_capacity=64, codec=codec, codec_options=options)
+        store.upsert([{"id": f"vec_{i}", "values": values} for i, values in enumerate(vectors)])
+        store.delete(["vec_1"])
+        for i in (0, 17, 599):
+            assert store.query(vector=vectors[i], top_k=1).matches[0].id == f"vec_{i}"
+        assert all(m.id != "vec_1" for m in store.query(vector=vectors[1], top_k=50).matches)
+        usage = store.memory_usage()
+        # Only PQ spills (its exact vectors), and the spill is not counted as resident
+        assert (usage["spill_bytes"] > 0) == (codec == "pq")
+        assert usage["bytes_per_vector"] < dimension * 4 or codec == "float32"
+        print(f"   ✅ {codec}: {usage['bytes_per_vector']:.0f} bytes/vector, "
+              f"{usage['spill_bytes_per_vector']:.0f} spilled")
+
+    try:
+        VectorCodec(dimension, 8)
+        assert False, "VectorCodec is abstract"
+    except TypeError:
+        print("   ✅ Codec base classes are abstract")
+
+    print("\n" + "=" * 50)
+    print("🎯 Vector Codecs Test Completed!")
+
+
+
+def test_persistent_vector_store():
+    """Test that vectors survive a crash (WAL replay) and a clean checkpoint"""
+
+    print("🧪 Testing Persistent Vector Store")
+    print("=" * 50)
+
+    dimension = 16
+    vectors = _random_vectors(300, dimension, seed=9)
+    with tempfile.TemporaryDirectory() as directory:
+        store = PersistentVectorStore(directory, dimension=dimension)
+        store.upsert([
+            {"id": f"vec_{i}", "values": values, "metadata": {"session_id": f"s{i % 3}"}}
+            for i, values in enumerate(vectors[:200])
+        ])
+        store.compact()
+        store.upsert([
+            {"id": f"vec_{i}", "values": vectors[i], "metadata": {"session_id": f"s{i % 3}"}}
+            for i in range(200, 300)
+        ])
+        store.delete(filter={"session_id": "s0"})
+        expected = [m.id for m in store.query(vector=vectors[4], top_k=5).matches]
+
+        # Reopen without closing, as after a crash: checkpoint + WAL replay
+        reopened = PersistentVectorStore(directory, dimension=dimension)
+        assert len(reopened) == 200
+        assert [m.id for m in reopened.query(vector=vectors[4], top_k=5).matches] == expected
+        assert reopened.query(vector=vectors[3], top_k=5, filter={"session_id": "s0"}).matches == []
+        print("   ✅ WAL replay restores writes after the last checkpoint")
+
+        reopened.close()
+        reopened = PersistentVectorStore(directory, dimension=dimension)
+        assert not any(name.endswith(".pkl") for _, _, files in os.walk(directory) for name in files)
+        # Nothing is decoded on open: metadata and postings load on first use
+        postings = reopened._metadata_index["session_id"]
+        assert not reopened.id_to_metadata.changed and dict.__len__(postings) == 0
+        matches = reopened.query(vector=vectors[4], top_k=5, filter={"session_id": "s1"}).matches
+        assert matches[0].id == "vec_4" and matches[0].metadata == {"session_id": "s1"}
+        assert dict.__len__(postings) == 1 and len(postings) == 2
+        assert [m.id for m in reopened.query(vector=vectors[4], top_k=5).matches] == expected
+        reopened.close()
+        print("   ✅ Clean shutdown checkpoints the store; reopening decodes lazily")
+
+        reopened = PersistentVectorStore(directory, dimension=dimension)
+        reopened.upsert([{"id": "vec_0", "values": vectors[0], "metadata": {"session_id": "s0"}}])
+        reopened.upsert([{"id": "vec_3", "values": vectors[3], "metadata": {"session_id": "s0"}}])
+        wal_path = os.path.join(directory, PersistentVectorStore.WAL_FILE)
+        with open(wal_path, "r+b") as f:
+            # Corrupt the last record's payload and add a torn header after it
+            f.seek(-1, os.SEEK_END)
+            f.write(b"\x00")
+            f.seek(0, os.SEEK_END)
+            f.write(b"\x07\x00")
+        reopened = PersistentVectorStore(directory, dimension=dimension)
+        assert len(reopened) == 201 and "vec_0" in reopened.id_to_metadata
+        assert "vec_3" not in reopened.id_to_metadata
+        reopened.close()
+        print("   ✅ Corrupt and torn WAL records are discarded")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = PersistentVectorStore(directory, dimension=dimension, index_mode="ivf", ivf_lists=4,
+                                      ann_min_train_size=100, exact_search_threshold=0)
+        store.upsert([{"id": f"vec_{i}", "values": values} for i, values in enumerate(vectors)])
+        expected = [m.id for m in store.query(vector=vectors[7], top_k=5).matches]
+        store.close()
+        reopened = PersistentVectorStore(directory, dimension=dimension, index_mode="ivf", ivf_lists=4,
+                                         ann_min_train_size=100, exact_search_threshold=0)
+        assert reopened._ann.is_trained
+        assert [m.id for m in reopened.query(vector=vectors[7], top_k=5).matches] == expected
+        reopened.close()
+        print("   ✅ Trained IVF index is restored from its arrays")
+
+    print("\n" + "=" * 50)
+    print("🎯 Persistent Vector Store Test Completed!")
+
+
+if __name__ == "__main__":
+    test_local_vector_store()
+    test_ivf_index_mode()
+    test_vector_codecs()
+    test_persistent_vector_store()
@@ -1,7 +1,71 @@
 import os
-from typing import Optional
+import hashlib
+import asyncio
+import tempfile
+import zipfile
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple, AsyncIterator
 from fastapi import UploadFile, HTTPException
 
+# Upload size limit (MAX_UPLOAD_SIZE_MB, default 10); also caps each zip member uncompressed
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_SIZE_MB", "10")) * 1024 * 1024)
+# Room for multipart framing and form fields on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Whole request body limit, enforced by UploadSizeLimitMiddleware (the only upload size check)
+MAX_REQUEST_BYTES = (int(float(os.getenv("MAX_REQUEST_SIZE_MB", "0")) * 1024 * 1024)
+                     or MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES)
+SPOOL_CHUNK_BYTES = 1024 * 1024
+# Bulk uploads: whole request limit and files per batch
+MAX_BATCH_UPLOAD_BYTES = int(float(os.getenv("MAX_BATCH_UPLOAD_SIZE_MB", "100")) * 1024 * 1024)
+MAX_BATCH_REQUEST_BYTES = MAX_BATCH_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "100"))
+# Paths whose request limit differs from MAX_REQUEST_BYTES
+UPLOAD_PATH_LIMITS = {"/documents/upload-batch/": MAX_BATCH_REQUEST_BYTES}
+
+def _size_error(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File too large. Maximum size is {max_bytes / (1024 * 1024):g}MB")
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware that rejects request bodies larger than max_bytes with a
+    413 while they stream in, before they are parsed or spooled: up front from
+    Content-Length when present, otherwise as soon as the running byte count
+    passes the limit. path_limits overrides the limit for specific paths.
+
+    This is the one place upload sizes are checked: handlers spool what
+    gets past it without counting bytes again.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BYTES, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = UPLOAD_PATH_LIMITS if path_limits is None else path_limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        max_bytes = self.path_limits.get(scope.get("path"), self.max_bytes)
+        content_length = dict(scope.get("headers") or []).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            await send({"type": "http.response.start", "status": 413,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b'{"detail":"Request body too large"}'})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise _size_error(max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
 class FileUtils:
     ALLOWED_EXTENSIONS = {
         "pdf": "application/pdf",
@@ -26,25 +90,129 @@ class FileUtils:
                 detail=f"Unsupported file type. Allowed types: {', '.join(FileUtils.ALLOWED_EXTENSIONS.keys())}"
             )
         
-        # Check file size (max 10MB)
-        file.file.seek(0, 2)  # Seek to end
-        file_size = file.file.tell()
-        file.file.seek(0)  # Reset to beginning
-        
-        if file_size > 10 * 1024 * 1024:  # 10MB
-            raise HTTPException(status_code=400, detail="File too large. Maximum size is 10MB")
-        
+        # File size is enforced by UploadSizeLimitMiddleware as the body streams in
         return file_extension
     
     @staticmethod
-    async def read_file_content(file: UploadFile) -> bytes:
-        """Read file content as bytes"""
+    def _spool(source, destination, max_bytes: Optional[int] = None) -> str:
+        """Copy source to destination in chunks, enforcing max_bytes if given; returns the sha256"""
+        digest = hashlib.sha256()
+        size = 0
+        while True:
+            chunk = source.read(SPOOL_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise _size_error(max_bytes)
+            digest.update(chunk)
+            destination.write(chunk)
+        destination.flush()
+        return digest.hexdigest()
+    
+    @staticmethod
+    async def spool_upload(file: UploadFile) -> Tuple[str, str]:
+        """
+        Spool an upload to a named temp file in fixed-size chunks, never holding
+        the whole body in memory. Returns (path, sha256 of the content); the
+        caller owns the file and must remove it. The size was already bounded
+        by UploadSizeLimitMiddleware.
+        """
+        suffix = os.path.splitext(file.filename or "")[1]
+        spool = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
         try:
-            content = await file.read()
-            return content
+            with spool:
+                await file.seek(0)
+                content_hash = await asyncio.to_thread(FileUtils._spool, file.file, spool)
+            return spool.name, content_hash
         except Exception as e:
+            os.remove(spool.name)
+            if isinstance(e, HTTPException):
+                raise
             raise HTTPException(status_code=400, detail=f"Error reading file: {str(e)}")
     
+    @staticmethod
+    @asynccontextmanager
+    async def spooled_upload(file: UploadFile) -> AsyncIterator[Tuple[str, str]]:
+        """spool_upload as a context manager: yields (path, sha256), removes the file on exit"""
+        path, content_hash = await FileUtils.spool_upload(file)
+        try:
+            yield path, content_hash
+        finally:
+            os.remove(path)
+    
+    @staticmethod
+    async def download_to_file(client, url: str, max_bytes: int = MAX_UPLOAD_BYTES, suffix: str = "",
+                               headers: Optional[Dict[str, str]] = None) -> Tuple[Optional[str], Optional[str], Dict[str, str]]:
+        """
+        Stream a document from url into a named temp file with a pooled httpx
+        AsyncClient, rejecting it with a 413 as soon as it passes max_bytes.
+        Returns (path, sha256 of the content, response headers); the caller
+        owns the file and must remove it. For a conditional request (headers
+        with If-None-Match / If-Modified-Since) answered 304, path and hash
+        are None.
+        """
+        spool = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+        try:
+            with spool:
+                async with client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304:
+                        os.remove(spool.name)
+                        return None, None, dict(response.headers)
+                    response.raise_for_status()
+                    content_length = response.headers.get("content-length")
+                    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+                        raise _size_error(max_bytes)
+                    digest = hashlib.sha256()
+                    size = 0
+                    async for chunk in response.aiter_bytes(SPOOL_CHUNK_BYTES):
+                        size += len(chunk)
+                        if size > max_bytes:
+                            raise _size_error(max_bytes)
+                        digest.update(chunk)
+                        spool.write(chunk)
+            return spool.name, digest.hexdigest(), dict(response.headers)
+        except Exception:
+            if os.path.exists(spool.name):
+                os.remove(spool.name)
+            raise
+    
+    @staticmethod
+    def extract_zip(path: str, max_bytes: int = MAX_UPLOAD_BYTES, max_files: int = MAX_BATCH_FILES
+                    ) -> List[Tuple[str, Optional[str], Optional[str], Optional[str]]]:
+        """
+        Spool the supported documents in a zip archive to temp files, one at a
+        time and each capped at max_bytes uncompressed. Returns (member name,
+        temp path, sha256, error) per document, with path None when the member
+        was rejected; the caller owns the temp files. Folders and hidden files
+        are skipped.
+        """
+        members = []
+        spooled = 0
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                basename = os.path.basename(name)
+                if info.is_dir() or not basename or basename.startswith(".") or name.startswith("__MACOSX/"):
+                    continue
+                extension = basename.rsplit(".", 1)[-1].lower() if "." in basename else ""
+                if extension not in FileUtils.ALLOWED_EXTENSIONS:
+                    members.append((name, None, None, f"Unsupported file type: {extension or 'none'}"))
+                    continue
+                if spooled >= max_files:
+                    members.append((name, None, None, f"Too many files; at most {max_files} per batch"))
+                    continue
+                spool = tempfile.NamedTemporaryFile(suffix=f".{extension}", delete=False)
+                try:
+                    with spool, archive.open(info) as source:
+                        content_hash = FileUtils._spool(source, spool, max_bytes)
+                    members.append((name, spool.name, content_hash, None))
+                    spooled += 1
+                except Exception as e:
+                    os.remove(spool.name)
+                    members.append((name, None, None, e.detail if isinstance(e, HTTPException) else str(e)))
+        return members
+    
     @staticmethod
     def get_file_type_from_extension(extension: str) -> str:
         """Get standardized file type from extension"""
@@ -0,0 +1,70 @@
+import re
+from typing import Dict, List, Optional, Set
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    """Regex for a character trie; "" marks the end of a keyword"""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    # Greedy: prefer the longest keyword that starts here
+    return f"(?:{body})?" if "" in node else body
+
+
+class KeywordMatcher:
+    """
+    Scores several keyword categories in one pass over the text.
+
+    All keywords are compiled into a single trie-shaped regex inside a
+    lookahead, so every text position is tried once against every keyword at
+    the same time and matches may overlap. At each position the longest
+    keyword is captured; shorter keywords that are prefixes of it are implied.
+    The result is exactly `keyword in text.lower()` for every keyword.
+
+    Text is lowercased in blocks rather than copied whole, the scan stops as
+    soon as every keyword has been seen, and max_chars bounds it to a prefix.
+    """
+
+    BLOCK_CHARS = 65536
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = {name: [k.lower() for k in keywords] for name, keywords in categories.items()}
+        keywords = {k for category in self.categories.values() for k in category}
+        trie: Dict[str, dict] = {}
+        for keyword in keywords:
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+        self._pattern = re.compile(f"(?=({_trie_pattern(trie)}))")
+        self._implied = {
+            keyword: {other for other in keywords if keyword.startswith(other)}
+            for keyword in keywords
+        }
+        self._keyword_count = len(keywords)
+        self._overlap = max((len(k) for k in keywords), default=1) - 1
+
+    def find(self, text: str, max_chars: Optional[int] = None) -> Set[str]:
+        """Keywords occurring in text (or its first max_chars characters), case-insensitively"""
+        end = len(text) if max_chars is None else min(len(text), max_chars)
+        found: Set[str] = set()
+        for start in range(0, end, self.BLOCK_CHARS):
+            block_end = min(start + self.BLOCK_CHARS, end)
+            # Extend by the longest keyword so matches straddling blocks are seen
+            segment = text[start:min(block_end + self._overlap, end)].lower()
+            limit = block_end - start
+            for match in self._pattern.finditer(segment):
+                if match.start() >= limit:
+                    break
+                keyword = match.group(1)
+                if keyword not in found:
+                    found |= self._implied[keyword]
+            if len(found) == self._keyword_count:
+                break
+        return found
+
+    def scores(self, text: str, max_chars: Optional[int] = None) -> Dict[str, int]:
+        """Number of distinct keywords of each category present in the text"""
+        found = self.find(text, max_chars)
+        return {name: sum(1 for k in keywords if k in found) for name, keywords in self.categories.items()}